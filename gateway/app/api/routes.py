@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import List, Dict
+from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 from pydantic import BaseModel, EmailStr
 
@@ -13,6 +14,8 @@ from app.database.models import (
     ActionStatus
 )
 from app.services.provisioning_service import ProvisioningService
+from app.services.batch_provisioning_service import get_batch_provisioning_service
+from app.core.config import settings
 from app.connectors.base import MockConnector
 
 router = APIRouter(prefix="/api/v1", tags=["provisioning"])
@@ -40,6 +43,13 @@ class UserProvisionRequest(BaseModel):
         }
 
 
+class BatchProvisionRequest(BaseModel):
+    """Modèle de requête pour le provisioning d'un lot d'utilisateurs."""
+    users: List[UserProvisionRequest]
+    applications: Optional[List[str]] = None  # Vide = plan complet par utilisateur
+    dry_run: bool = False
+
+
 # ========== Endpoints ==========
 
 @router.get("/ping")
@@ -78,22 +88,22 @@ async def get_provisioning_stats(db: Session = Depends(get_db)):
         ProvisioningOperation.started_at >= datetime.combine(today, datetime.min.time())
     ).count()
     
-    # 3. Success Rate & Failures
-    completed_ops = db.query(ProvisioningOperation).filter(
-        ProvisioningOperation.status.in_([
+    # 3. Success Rate & Failures (comptage par statut sur l'index, sans charger les lignes)
+    counts = dict(
+        db.query(ProvisioningOperation.status, func.count())
+        .filter(ProvisioningOperation.status.in_([
             OperationStatus.SUCCESS.value,
             OperationStatus.PARTIAL.value,
             OperationStatus.FAILED.value
-        ])
-    ).all()
-    
-    failures = db.query(ProvisioningOperation).filter(
-        ProvisioningOperation.status == OperationStatus.FAILED.value
-    ).count()
+        ]))
+        .group_by(ProvisioningOperation.status)
+        .all()
+    )
+    completed_ops = sum(counts.values())
+    failures = counts.get(OperationStatus.FAILED.value, 0)
     
     if completed_ops:
-        success_ops = [op for op in completed_ops if op.status == OperationStatus.SUCCESS.value]
-        success_rate = round((len(success_ops) / len(completed_ops)) * 100, 1)
+        success_rate = round((counts.get(OperationStatus.SUCCESS.value, 0) / completed_ops) * 100, 1)
     else:
         success_rate = 100.0
     
@@ -154,12 +164,68 @@ async def get_all_users(
     ]
 
 
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+# Colonnes lues pour les listes d'opérations (tuples, sans objets ORM)
+OPERATION_COLUMNS = (
+    ProvisioningOperation.id,
+    ProvisioningOperation.status,
+    ProvisioningOperation.trigger,
+    ProvisioningOperation.started_at,
+    ProvisioningOperation.completed_at,
+    ProvisioningOperation.total_actions,
+    ProvisioningOperation.successful_actions,
+    ProvisioningOperation.failed_actions,
+    ProvisionedUser.email,
+    ProvisionedUser.first_name,
+    ProvisionedUser.last_name,
+    ProvisionedUser.job_title,
+    ProvisionedUser.department,
+)
+
+
+def _operation_to_dict(row) -> Dict:
+    return {
+        "id": row.id,
+        "user": {
+            "email": row.email,
+            "first_name": row.first_name,
+            "last_name": row.last_name,
+            "job_title": row.job_title
+        },
+        "status": row.status,
+        "trigger": row.trigger,
+        "started_at": _iso(row.started_at),
+        "completed_at": _iso(row.completed_at),
+        "total_actions": row.total_actions,
+        "successful_actions": row.successful_actions,
+        "failed_actions": row.failed_actions,
+    }
+
+
+def _actions_by_operation(db: Session, operation_ids: List[int], *columns) -> Dict[int, List]:
+    """Actions de plusieurs opérations en une requête, dans l'ordre d'exécution"""
+    actions: Dict[int, List] = {op_id: [] for op_id in operation_ids}
+    if not operation_ids:
+        return actions
+    rows = db.query(ProvisioningAction.operation_id, *columns).filter(
+        ProvisioningAction.operation_id.in_(operation_ids)
+    ).order_by(ProvisioningAction.operation_id, ProvisioningAction.executed_at.asc())
+    for row in rows:
+        actions[row.operation_id].append(row)
+    return actions
+
+
 @router.get("/operations/recent")
 async def get_recent_operations(limit: int = 10, db: Session = Depends(get_db)):
     """
     📋 Recent Operations
     
     Retourne les N dernières opérations de provisioning avec leurs détails.
+    Deux requêtes quel que soit `limit` : opérations jointes à leur
+    utilisateur, puis actions de toutes ces opérations.
     
     Args:
         limit (int): Nombre maximum d'opérations à retourner (défaut: 10)
@@ -167,43 +233,31 @@ async def get_recent_operations(limit: int = 10, db: Session = Depends(get_db)):
     Returns:
         list: Liste des opérations avec user, statut, et compteurs d'actions
     """
-    operations = db.query(ProvisioningOperation).order_by(
+    operations = db.query(*OPERATION_COLUMNS).join(
+        ProvisionedUser, ProvisionedUser.id == ProvisioningOperation.user_id
+    ).order_by(
         ProvisioningOperation.started_at.desc()
     ).limit(limit).all()
     
+    actions = _actions_by_operation(
+        db, [op.id for op in operations],
+        ProvisioningAction.application,
+        ProvisioningAction.status,
+        ProvisioningAction.message
+    )
+    
     results = []
     for op in operations:
-        user = db.query(ProvisionedUser).filter(ProvisionedUser.id == op.user_id).first()
-        
-        # Récupérer les actions associées
-        actions = db.query(ProvisioningAction).filter(
-            ProvisioningAction.operation_id == op.id
-        ).order_by(ProvisioningAction.executed_at.asc()).all()
-        
-        results.append({
-            "id": op.id,
-            "user": {
-                "email": user.email,
-                "first_name": user.first_name,
-                "last_name": user.last_name,
-                "job_title": user.job_title
-            },
-            "status": op.status,
-            "trigger": op.trigger,
-            "started_at": op.started_at.isoformat() if op.started_at else None,
-            "completed_at": op.completed_at.isoformat() if op.completed_at else None,
-            "total_actions": op.total_actions,
-            "successful_actions": op.successful_actions,
-            "failed_actions": op.failed_actions,
-            "actions": [
-                {
-                    "application": action.application,
-                    "status": action.status,
-                    "message": action.message,
-                }
-                for action in actions
-            ]
-        })
+        operation = _operation_to_dict(op)
+        operation["actions"] = [
+            {
+                "application": action.application,
+                "status": action.status,
+                "message": action.message,
+            }
+            for action in actions[op.id]
+        ]
+        results.append(operation)
     
     return results
 
@@ -225,48 +279,95 @@ async def get_operation_detail(operation_id: int, db: Session = Depends(get_db))
     Raises:
         HTTPException: 404 si l'opération n'existe pas
     """
-    operation = db.query(ProvisioningOperation).filter(
+    operation = db.query(*OPERATION_COLUMNS).join(
+        ProvisionedUser, ProvisionedUser.id == ProvisioningOperation.user_id
+    ).filter(
         ProvisioningOperation.id == operation_id
     ).first()
     
     if not operation:
         raise HTTPException(status_code=404, detail="Operation not found")
     
-    user = db.query(ProvisionedUser).filter(ProvisionedUser.id == operation.user_id).first()
-    actions = db.query(ProvisioningAction).filter(
-        ProvisioningAction.operation_id == operation_id
-    ).order_by(ProvisioningAction.executed_at.asc()).all()
+    actions = _actions_by_operation(
+        db, [operation_id],
+        ProvisioningAction.id,
+        ProvisioningAction.action_type,
+        ProvisioningAction.application,
+        ProvisioningAction.target_user,
+        ProvisioningAction.status,
+        ProvisioningAction.message,
+        ProvisioningAction.details,
+        ProvisioningAction.executed_at
+    )[operation_id]
     
-    return {
-        "id": operation.id,
-        "user": {
-            "email": user.email,
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-            "job_title": user.job_title,
-            "department": user.department
-        },
-        "status": operation.status,
-        "trigger": operation.trigger,
-        "started_at": operation.started_at.isoformat() if operation.started_at else None,
-        "completed_at": operation.completed_at.isoformat() if operation.completed_at else None,
-        "total_actions": operation.total_actions,
-        "successful_actions": operation.successful_actions,
-        "failed_actions": operation.failed_actions,
-        "actions": [
-            {
-                "id": action.id,
-                "action_type": action.action_type,
-                "application": action.application,
-                "target_user": action.target_user,
-                "status": action.status,
-                "message": action.message,
-                "details": action.details,
-                "executed_at": action.executed_at.isoformat() if action.executed_at else None
-            }
-            for action in actions
-        ]
-    }
+    result = _operation_to_dict(operation)
+    result["user"]["department"] = operation.department
+    result["actions"] = [
+        {
+            "id": action.id,
+            "action_type": action.action_type,
+            "application": action.application,
+            "target_user": action.target_user,
+            "status": action.status,
+            "message": action.message,
+            "details": action.details,
+            "executed_at": _iso(action.executed_at)
+        }
+        for action in actions
+    ]
+    return result
+
+
+@router.post("/provision/batch", status_code=202)
+async def provision_batch(request: BatchProvisionRequest):
+    """
+    📦 Batch Provisioning
+    
+    Planifie le provisioning d'un lot d'utilisateurs (vague d'onboarding).
+    Les utilisateurs sont traités en parallèle par un pool de workers borné,
+    avec une limite d'appels simultanés vers MidPoint.
+    
+    Returns:
+        dict: ID du lot à interroger via GET /provision/batch/{batch_id}
+        
+    Raises:
+        HTTPException: 400 si le lot est vide, trop volumineux ou contient
+            des emails en double
+    """
+    if not request.users:
+        raise HTTPException(status_code=400, detail="Lot vide")
+    if len(request.users) > settings.PROVISIONING_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Lot trop volumineux (max {settings.PROVISIONING_BATCH_MAX_SIZE} utilisateurs)"
+        )
+    
+    try:
+        batch = get_batch_provisioning_service().submit(
+            users=[user.model_dump() for user in request.users],
+            trigger="batch",
+            dry_run=request.dry_run,
+            selected_applications=request.applications
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return batch.to_dict(include_items=False)
+
+
+@router.get("/provision/batch/{batch_id}")
+async def get_batch_status(batch_id: str):
+    """
+    📈 Batch Status
+    
+    Retourne l'avancement d'un lot et le résultat par utilisateur.
+    
+    Raises:
+        HTTPException: 404 si le lot est inconnu
+    """
+    batch = get_batch_provisioning_service().get(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch.to_dict()
 
 
 # ========== DÉSACTIVÉ: Création d'utilisateur ==========
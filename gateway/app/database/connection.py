@@ -1,19 +1,181 @@
 """
 Database Connection & Session Management
-Gère la connexion SQLAlchemy et fournit les sessions DB
+Engine SQLAlchemy unique de l'application et fabrique de sessions
+
+Tous les routers, services et modèles partagent cet engine (un seul pool de
+connexions par processus). Deux profils selon DATABASE_URL :
+- PostgreSQL (production) : pool borné, pre-ping, recyclage des connexions,
+  pool LIFO pour laisser expirer les connexions inutilisées ;
+- SQLite : connexions partagées entre threads (FastAPI, workers de jobs),
+  pool statique pour une base en mémoire. Chaque connexion reçoit les
+  PRAGMA de performance (WAL, synchronous=NORMAL, busy_timeout, cache,
+  mmap, temp_store) et les transactions d'écriture du processus passent
+  une à une (WriteGate) : les threads attendent leur tour dans Python
+  plutôt que de boucler sur SQLITE_BUSY.
+
+L'écho SQL est désactivé par défaut (DB_ECHO), indépendamment de DEBUG.
 """
-from sqlalchemy import create_engine
+import sqlite3
+import threading
+import logging
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from sqlalchemy.pool import StaticPool
+from typing import Dict, Generator, Optional
 
 from app.core.config import settings
 
-# Engine SQLite avec check_same_thread=False pour FastAPI
-engine = create_engine(
-    settings.DATABASE_URL, 
-    connect_args={"check_same_thread": False},
-    echo=False  # Set to True for SQL debugging
-)
+logger = logging.getLogger(__name__)
+
+# Instructions qui prennent le verrou d'écriture SQLite
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE", "REPLACE", "CREATE", "ALTER", "DROP")
+
+
+class WriteGate:
+    """
+    Un seul écrivain SQLite à la fois dans le processus.
+
+    Une connexion entre dans la porte à sa première instruction d'écriture
+    et en sort au commit/rollback. Un thread qui écrit déjà via une autre
+    connexion n'attend pas (pas d'interblocage) ; au-delà de `timeout`,
+    l'écriture est tentée quand même et SQLite applique son busy_timeout.
+    """
+
+    def __init__(self, timeout: float = 5.0):
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._owner: Optional[sqlite3.Connection] = None
+        self._owner_thread: Optional[int] = None
+
+    def enter(self, connection: sqlite3.Connection) -> None:
+        with self._cond:
+            if self._owner is connection or self._owner_thread == threading.get_ident():
+                return
+            if not self._cond.wait_for(lambda: self._owner is None, timeout=self.timeout):
+                logger.warning(f"Attente d'écriture SQLite > {self.timeout}s, écriture non sérialisée")
+                return
+            self._owner = connection
+            self._owner_thread = threading.get_ident()
+
+    def leave(self, connection: sqlite3.Connection) -> None:
+        with self._cond:
+            if self._owner is connection:
+                self._owner = None
+                self._owner_thread = None
+                self._cond.notify()
+
+
+class _GatedCursor(sqlite3.Cursor):
+    """Curseur qui fait entrer sa connexion dans la porte avant une écriture"""
+
+    def execute(self, sql, *args):
+        self.connection._before_statement(sql)
+        return super().execute(sql, *args)
+
+    def executemany(self, sql, *args):
+        self.connection._before_statement(sql)
+        return super().executemany(sql, *args)
+
+
+class _GatedConnection(sqlite3.Connection):
+    """Connexion sqlite3 libérant la porte après commit, rollback ou fermeture"""
+
+    gate: WriteGate
+
+    def cursor(self, factory=_GatedCursor):
+        return super().cursor(factory)
+
+    def _before_statement(self, sql: str) -> None:
+        if sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+            self.gate.enter(self)
+
+    def commit(self):
+        try:
+            super().commit()
+        finally:
+            self.gate.leave(self)
+
+    def rollback(self):
+        try:
+            super().rollback()
+        finally:
+            self.gate.leave(self)
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self.gate.leave(self)
+
+
+def _sqlite_pragmas() -> Dict:
+    """PRAGMA appliqués à chaque connexion SQLite (voir SQLITE_* dans la config)"""
+    return {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT,
+        "cache_size": settings.SQLITE_CACHE_SIZE,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "temp_store": settings.SQLITE_TEMP_STORE,
+    }
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Applique le profil de performance SQLite à une nouvelle connexion"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in _sqlite_pragmas().items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def _sqlite_options(url) -> Dict:
+    """Profil SQLite : fichier local ou base en mémoire"""
+    connect_args: Dict = {
+        "check_same_thread": False,
+        "timeout": settings.SQLITE_BUSY_TIMEOUT / 1000,
+    }
+    if settings.SQLITE_SERIALIZE_WRITES:
+        # Une porte par engine (donc par fichier de base)
+        gate = WriteGate(timeout=settings.SQLITE_BUSY_TIMEOUT / 1000)
+        connect_args["factory"] = type("GatedConnection", (_GatedConnection,), {"gate": gate})
+    options: Dict = {"connect_args": connect_args}
+    if url.database in (None, "", ":memory:"):
+        # Une base en mémoire n'existe que dans sa connexion : elle est partagée
+        options["poolclass"] = StaticPool
+    else:
+        options["pool_size"] = settings.DB_POOL_SIZE
+        options["max_overflow"] = settings.DB_MAX_OVERFLOW
+        options["pool_timeout"] = settings.DB_POOL_TIMEOUT
+    return options
+
+
+def _server_options() -> Dict:
+    """Profil serveur (PostgreSQL) : pool borné et connexions vérifiées"""
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_use_lifo": True,
+    }
+
+
+def create_db_engine(database_url: str = settings.DATABASE_URL) -> Engine:
+    """Crée un engine configuré selon le profil de la base"""
+    url = make_url(database_url)
+    if url.get_backend_name() != "sqlite":
+        return create_engine(url, echo=settings.DB_ECHO, **_server_options())
+
+    engine = create_engine(url, echo=settings.DB_ECHO, **_sqlite_options(url))
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
+engine = create_db_engine()
 
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -22,12 +184,12 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 def get_db() -> Generator[Session, None, None]:
     """
     Dependency pour obtenir une session DB dans les routes FastAPI.
-    
+
     Usage:
         @router.get("/users")
         def get_users(db: Session = Depends(get_db)):
             return db.query(User).all()
-    
+
     Yields:
         Session: Session SQLAlchemy qui sera fermée automatiquement
     """
@@ -36,3 +198,8 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+def close_engine() -> None:
+    """Ferme les connexions du pool (arrêt de l'application)"""
+    engine.dispose()
@@ -0,0 +1,307 @@
+"""
+Migrations de la base - Schéma versionné et migrations de données par lots
+
+`create_all` ne crée que les tables absentes. Toute évolution d'une table
+existante est une migration versionnée, enregistrée dans `schema_migrations`
+et appliquée une seule fois :
+
+- migrations de schéma (SCHEMA_MIGRATIONS) : appliquées par `init_db()` au
+  démarrage. Elles doivent être idempotentes et rapides : ajout de colonne
+  nullable (métadonnées seules), index créé en ligne (CONCURRENTLY sous
+  PostgreSQL) ;
+- migrations de données (DATA_MIGRATIONS) : backfills parcourant une table
+  par lots de clé primaire croissante. Chaque lot est une transaction courte
+  qui enregistre aussi le point de reprise ; une pause entre les lots laisse
+  passer les autres écritures. Une exécution interrompue (arrêt, `max_seconds`)
+  reprend au dernier lot validé. Lancées par `scripts/migrate.py` ou le job
+  "db.backfill", jamais implicitement au démarrage (sauf
+  MIGRATION_BACKFILL_ON_STARTUP).
+"""
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import logging
+
+from sqlalchemy import Table, exists, insert, inspect, select, text, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.core.config import settings
+from app.database.connection import engine
+from app.database.models import (
+    Base,
+    SchemaMigration,
+    ProvisionedUser,
+    ProvisioningOperation,
+    OperationStatus,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Migration:
+    """Migration de schéma : `upgrade()` idempotent, appliqué au démarrage"""
+    version: str
+    name: str
+    upgrade: Callable[[], None]
+
+
+@dataclass
+class DataMigration:
+    """
+    Backfill par lots sur `table` (parcours par `id` croissant)
+
+    `process(conn, ids)` traite les lignes du lot dans la transaction du lot
+    et renvoie le nombre de lignes modifiées ; `where()` restreint le parcours.
+    """
+    version: str
+    name: str
+    table: Table
+    process: Callable[[Connection, List[int]], int]
+    where: Optional[Callable[[], ColumnElement]] = None
+
+
+# ========== Helpers DDL en ligne ==========
+
+def add_column(table: str, name: str, ddl: str) -> bool:
+    """Ajoute une colonne si absente (nullable sans défaut : métadonnées seules)"""
+    inspector = inspect(engine)
+    if not inspector.has_table(table):
+        return False
+    if name in {col["name"] for col in inspector.get_columns(table)}:
+        return False
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+    logger.info(f"Colonne {table}.{name} ajoutée")
+    return True
+
+
+def create_index(index) -> bool:
+    """
+    Crée un index déclaré dans les modèles s'il est absent.
+
+    PostgreSQL : CREATE INDEX CONCURRENTLY (hors transaction), les écritures
+    sur la table continuent pendant la construction.
+    """
+    inspector = inspect(engine)
+    table = index.table.name
+    if not inspector.has_table(table):
+        return False
+    if index.name in {ix["name"] for ix in inspector.get_indexes(table)}:
+        return False
+
+    if engine.dialect.name == "postgresql":
+        columns = ", ".join(col.name for col in index.columns)
+        unique = "UNIQUE " if index.unique else ""
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(
+                f"CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {index.name} ON {table} ({columns})"
+            ))
+    else:
+        index.create(bind=engine, checkfirst=True)
+    logger.info(f"Index {index.name} créé")
+    return True
+
+
+# ========== Migrations ==========
+
+def _add_content_hash():
+    add_column("provisioned_users", "content_hash", "VARCHAR(64)")
+
+
+def _create_declared_indexes():
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            create_index(index)
+
+
+def _backfill_odoo_operations(conn: Connection, ids: List[int]) -> int:
+    """Crée une opération de provisioning pour les utilisateurs Odoo qui n'en ont aucune"""
+    users = conn.execute(
+        select(ProvisionedUser.id, ProvisionedUser.created_at).where(
+            ProvisionedUser.id.in_(ids),
+            ~exists().where(ProvisioningOperation.user_id == ProvisionedUser.id)
+        )
+    ).all()
+    if users:
+        now = datetime.utcnow()
+        conn.execute(insert(ProvisioningOperation), [
+            {
+                "user_id": user_id,
+                "status": OperationStatus.SUCCESS.value,
+                "trigger": "odoo_sync",
+                "started_at": created_at or now,
+                "completed_at": created_at or now,
+                "total_actions": 1,
+                "successful_actions": 1,
+                "failed_actions": 0,
+            }
+            for user_id, created_at in users
+        ])
+    return len(users)
+
+
+SCHEMA_MIGRATIONS: List[Migration] = [
+    Migration("0001", "provisioned_users.content_hash", _add_content_hash),
+    Migration("0002", "index des requêtes dashboard / audit / sync", _create_declared_indexes),
+]
+
+DATA_MIGRATIONS: List[DataMigration] = [
+    DataMigration(
+        "0003", "opérations pour les utilisateurs Odoo existants",
+        table=ProvisionedUser.__table__,
+        process=_backfill_odoo_operations,
+        where=lambda: ProvisionedUser.source == "odoo_sync",
+    ),
+]
+
+
+# ========== Suivi (table schema_migrations) ==========
+
+def _states() -> Dict[str, Dict]:
+    with engine.connect() as conn:
+        rows = conn.execute(select(SchemaMigration.__table__)).mappings().all()
+    return {row["version"]: dict(row) for row in rows}
+
+
+def _save_state(conn: Connection, version: str, **values) -> None:
+    table = SchemaMigration.__table__
+    if conn.execute(update(table).where(table.c.version == version).values(**values)).rowcount == 0:
+        conn.execute(insert(table).values(version=version, **values))
+
+
+def get_migration_status() -> List[Dict]:
+    """État de chaque migration connue (appliquée, en cours, en attente)"""
+    states = _states()
+    status = []
+    for migration in [*SCHEMA_MIGRATIONS, *DATA_MIGRATIONS]:
+        state = states.get(migration.version, {})
+        status.append({
+            "version": migration.version,
+            "name": migration.name,
+            "kind": "data" if isinstance(migration, DataMigration) else "schema",
+            "status": state.get("status", "pending"),
+            "processed": state.get("processed", 0),
+            "checkpoint": state.get("checkpoint"),
+            "finished_at": state.get("finished_at"),
+            "error": state.get("error"),
+        })
+    return status
+
+
+def pending_data_migrations() -> List[DataMigration]:
+    states = _states()
+    return [m for m in DATA_MIGRATIONS if states.get(m.version, {}).get("status") != "done"]
+
+
+# ========== Exécution ==========
+
+def run_schema_migrations() -> List[str]:
+    """Applique les migrations de schéma en attente (appelé par init_db)"""
+    states = _states()
+    applied = []
+    for migration in SCHEMA_MIGRATIONS:
+        if states.get(migration.version, {}).get("status") == "done":
+            continue
+        start = time.monotonic()
+        try:
+            migration.upgrade()
+        except Exception as e:
+            logger.error(f"❌ Migration {migration.version} ({migration.name}) échouée: {e}")
+            with engine.begin() as conn:
+                _save_state(conn, migration.version, name=migration.name, kind="schema",
+                            status="failed", error=str(e))
+            raise
+        with engine.begin() as conn:
+            _save_state(conn, migration.version, name=migration.name, kind="schema", status="done",
+                        error=None, finished_at=datetime.utcnow())
+        logger.info(f"✅ Migration {migration.version} ({migration.name}) "
+                    f"appliquée en {time.monotonic() - start:.2f}s")
+        applied.append(migration.version)
+    return applied
+
+
+def run_data_migration(
+    migration: DataMigration,
+    batch_size: Optional[int] = None,
+    throttle: Optional[float] = None,
+    max_seconds: Optional[float] = None
+) -> Dict:
+    """
+    Exécute (ou reprend) un backfill par lots
+
+    Args:
+        batch_size: Lignes parcourues par transaction
+        throttle: Pause entre deux lots (secondes)
+        max_seconds: Arrêt après ce délai, reprise au prochain appel
+
+    Returns:
+        Dict: version, status (done | partial | failed), processed, checkpoint, batches
+    """
+    batch_size = batch_size or settings.MIGRATION_BATCH_SIZE
+    throttle = settings.MIGRATION_THROTTLE if throttle is None else throttle
+    state = _states().get(migration.version, {})
+    if state.get("status") == "done":
+        return {"version": migration.version, "status": "done", "processed": state.get("processed", 0),
+                "checkpoint": state.get("checkpoint"), "batches": 0}
+
+    checkpoint = state.get("checkpoint") or 0
+    processed = state.get("processed") or 0
+    key = migration.table.c.id
+    start = time.monotonic()
+    batches = 0
+
+    with engine.begin() as conn:
+        _save_state(conn, migration.version, name=migration.name, kind="data", status="running",
+                    checkpoint=checkpoint, processed=processed, error=None)
+    logger.info(f"Migration {migration.version} ({migration.name}) à partir de id > {checkpoint}")
+
+    try:
+        while True:
+            query = select(key).where(key > checkpoint).order_by(key).limit(batch_size)
+            if migration.where is not None:
+                query = query.where(migration.where())
+            with engine.connect() as conn:
+                ids = list(conn.execute(query).scalars())
+
+            if not ids:
+                with engine.begin() as conn:
+                    _save_state(conn, migration.version, status="done", finished_at=datetime.utcnow())
+                logger.info(f"✅ Migration {migration.version} terminée: {processed} lignes modifiées")
+                return {"version": migration.version, "status": "done", "processed": processed,
+                        "checkpoint": checkpoint, "batches": batches}
+
+            # Lot et point de reprise dans la même transaction courte
+            with engine.begin() as conn:
+                processed += migration.process(conn, ids)
+                checkpoint = ids[-1]
+                _save_state(conn, migration.version, checkpoint=checkpoint, processed=processed)
+            batches += 1
+
+            if max_seconds is not None and time.monotonic() - start >= max_seconds:
+                logger.info(f"Migration {migration.version} interrompue à id {checkpoint}, reprise au prochain lancement")
+                return {"version": migration.version, "status": "partial", "processed": processed,
+                        "checkpoint": checkpoint, "batches": batches}
+            if throttle:
+                time.sleep(throttle)
+    except Exception as e:
+        logger.error(f"❌ Migration {migration.version} échouée à id > {checkpoint}: {e}")
+        with engine.begin() as conn:
+            _save_state(conn, migration.version, status="failed", error=str(e))
+        return {"version": migration.version, "status": "failed", "processed": processed,
+                "checkpoint": checkpoint, "batches": batches, "error": str(e)}
+
+
+def run_data_migrations(version: Optional[str] = None, **options) -> Dict:
+    """Exécute les backfills en attente (ou celui de `version`)"""
+    results = [
+        run_data_migration(migration, **options)
+        for migration in pending_data_migrations()
+        if version is None or migration.version == version
+    ]
+    return {
+        "success": all(r["status"] != "failed" for r in results),
+        "migrations": results
+    }
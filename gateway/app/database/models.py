@@ -5,7 +5,6 @@ from typing import Optional
 from enum import Enum
 
 from sqlalchemy import (
-    create_engine, 
     Column, 
     Integer, 
     String, 
@@ -13,24 +12,16 @@ from sqlalchemy import (
     Text, 
     Enum as SQLEnum,
     ForeignKey,
+    Index,
     Boolean,
     JSON,
 )
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship, sessionmaker
+from sqlalchemy.orm import relationship
 
-from app.core.config import settings
+# Engine et sessions partagés (réexportés pour les imports existants)
+from app.database.connection import engine, SessionLocal, get_db  # noqa: F401
 
-# Configuration de la base de données
-DATABASE_URL = settings.DATABASE_URL
-
-engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
-    echo=settings.DEBUG,
-)
-
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
@@ -43,6 +34,14 @@ class OperationStatus(str, Enum):
     PARTIAL = "partial"
 
 
+class JobStatus(str, Enum):
+    """Statut d'un job de la file de traitement."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
 class ActionStatus(str, Enum):
     """Statut d'une action."""
     PENDING = "pending"
@@ -60,10 +59,11 @@ class ProvisionedUser(Base):
     first_name = Column(String(100), nullable=False)
     last_name = Column(String(100), nullable=False)
     job_title = Column(String(200))
-    department = Column(String(100))
+    department = Column(String(100), index=True)
     role = Column(String(100), nullable=True)  # Rôle métier (Developer, Manager, etc.)
     status = Column(String(50), default=OperationStatus.PENDING.value)
     source = Column(String(50), default="api")  # Source: "api", "odoo_sync", "manual", etc.
+    content_hash = Column(String(64), nullable=True)  # Empreinte des données source (voir employee_fingerprint)
     
     created_at = Column(DateTime, default=datetime.utcnow)
     last_modified = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -72,6 +72,11 @@ class ProvisionedUser(Base):
     
     # Relations
     operations = relationship("ProvisioningOperation", back_populates="user")
+    
+    __table_args__ = (
+        # Filtre par source (/users) et désactivation des absents Odoo (source + statut)
+        Index("ix_provisioned_users_source_status", "source", "status"),
+    )
 
 
 class ProvisioningOperation(Base):
@@ -79,12 +84,12 @@ class ProvisioningOperation(Base):
     __tablename__ = "provisioning_operations"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("provisioned_users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("provisioned_users.id"), nullable=False, index=True)
     
-    status = Column(String(50), default=OperationStatus.IN_PROGRESS.value)
+    status = Column(String(50), default=OperationStatus.IN_PROGRESS.value, index=True)
     trigger = Column(String(50), default="api")
     
-    started_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, default=datetime.utcnow, index=True)
     completed_at = Column(DateTime, nullable=True)
     
     total_actions = Column(Integer, default=0)
@@ -114,6 +119,11 @@ class ProvisioningAction(Base):
     
     # Relations
     operation = relationship("ProvisioningOperation", back_populates="actions")
+    
+    __table_args__ = (
+        # Actions d'une opération dans l'ordre d'exécution
+        Index("ix_provisioning_actions_operation_executed", "operation_id", "executed_at"),
+    )
 
 
 class AuditLog(Base):
@@ -129,17 +139,69 @@ class AuditLog(Base):
     level = Column(String(20), default="INFO")
     source_ip = Column(String(50), nullable=True)
     details = Column(JSON, nullable=True)
+    
+    __table_args__ = (
+        # Filtres du journal d'audit, triés par date décroissante
+        Index("ix_audit_logs_level_timestamp", "level", "timestamp"),
+        Index("ix_audit_logs_action_timestamp", "action", "timestamp"),
+        Index("ix_audit_logs_target_timestamp", "target", "timestamp"),
+    )
+
+
+class Job(Base):
+    """Job persistant (synchronisation, export CSV...) exécuté par la file de traitement."""
+    __tablename__ = "jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    job_type = Column(String(50), nullable=False, index=True)
+    status = Column(String(20), default=JobStatus.QUEUED.value, nullable=False, index=True)
+    payload = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    idempotency_key = Column(String(255), unique=True, nullable=True)
+    
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=3, nullable=False)
+    run_after = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Bail du worker qui exécute le job (repris si le worker disparaît)
+    lease_owner = Column(String(100), nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class SyncState(Base):
+    """Point de reprise d'une synchronisation incrémentale (watermark)."""
+    __tablename__ = "sync_state"
+    
+    name = Column(String(100), primary_key=True)
+    watermark = Column(String(50), nullable=True)  # Ex: write_date Odoo du dernier enregistrement traité
+    last_full_sync_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class SchemaMigration(Base):
+    """Migration de schéma ou de données appliquée (voir database/migrations.py)."""
+    __tablename__ = "schema_migrations"
+    
+    version = Column(String(20), primary_key=True)
+    name = Column(String(200), nullable=False)
+    kind = Column(String(10), nullable=False)  # schema | data
+    status = Column(String(20), nullable=False)  # running | done | failed
+    checkpoint = Column(Integer, nullable=True)  # Dernier id traité (migrations de données)
+    processed = Column(Integer, default=0, nullable=False)
+    error = Column(Text, nullable=True)
+    
+    started_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
 
 
 def init_db():
     """Initialize database."""
+    from app.database.migrations import run_schema_migrations
+    
     Base.metadata.create_all(bind=engine)
-
-
-def get_db():
-    """Get database session."""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+    run_schema_migrations()
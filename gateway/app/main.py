@@ -17,7 +17,16 @@ from app.routers.audit import router as audit_router
 from app.routers.midpoint import router as midpoint_router
 from app.routers.connectors import router as connectors_router
 from app.routers.notifications import router as notifications_router
+from app.routers.jobs import router as jobs_router
 from app.database.models import init_db
+from app.database.connection import close_engine
+from app.database.migrations import pending_data_migrations
+from app.services.midpoint_service import close_midpoint_service
+from app.services.midpoint_async_service import close_async_midpoint_service
+from app.services.midpoint_repository import close_midpoint_repository
+from app.services.odoo_service import close_odoo_service
+from app.services.batch_provisioning_service import shutdown_batch_provisioning_service
+from app.services.job_queue import get_job_queue, start_job_queue, stop_job_queue
 
 # Création de l'application FastAPI
 app = FastAPI(
@@ -42,8 +51,23 @@ app.add_middleware(
 # Initialisation de la base de données au démarrage
 @app.on_event("startup")
 async def startup_event():
-    """Initialise la base de données au démarrage."""
+    """Initialise la base de données et démarre les workers de jobs."""
     init_db()
+    start_job_queue()
+    if settings.MIGRATION_BACKFILL_ON_STARTUP and pending_data_migrations():
+        get_job_queue().enqueue("db.backfill", coalesce=True)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Arrête les workers et ferme proprement les pools de connexions."""
+    stop_job_queue()
+    shutdown_batch_provisioning_service()
+    close_midpoint_service()
+    await close_async_midpoint_service()
+    close_midpoint_repository()
+    close_odoo_service()
+    close_engine()
 
 # Inclusion des routes API
 app.include_router(api_router)
@@ -53,6 +77,7 @@ app.include_router(audit_router, prefix="/api/v1")
 app.include_router(midpoint_router, prefix="/api/v1")
 app.include_router(connectors_router, prefix="/api/v1")
 app.include_router(notifications_router, prefix="/api/v1")
+app.include_router(jobs_router, prefix="/api/v1")
 
 
 @app.get("/health", tags=["Health"])
@@ -10,7 +10,7 @@ from sqlalchemy.orm import Session
 from typing import Optional, List
 from datetime import datetime
 
-from ..database.models import get_db
+from ..database.connection import get_db
 from ..services.audit_service import get_audit_service
 from pydantic import BaseModel
 
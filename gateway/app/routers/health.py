@@ -2,11 +2,12 @@
 Routes de santé et monitoring
 """
 from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from datetime import datetime
 
 from ..services.odoo_service import get_odoo_service
-from ..services.midpoint_service import get_midpoint_service
+from ..services.midpoint_async_service import get_async_midpoint_service
 
 router = APIRouter(tags=["Health"])
 
@@ -23,10 +24,11 @@ async def health_check():
     Health check complet de la gateway et ses dépendances
     """
     odoo = get_odoo_service()
-    midpoint = get_midpoint_service()
+    midpoint = get_async_midpoint_service()
     
-    odoo_ok = odoo.connect()
-    midpoint_ok = midpoint.test_connection()
+    # Odoo (XML-RPC) reste synchrone : exécuté dans le threadpool
+    odoo_ok = await run_in_threadpool(odoo.ping)
+    midpoint_ok = await midpoint.test_connection()
     
     all_ok = odoo_ok and midpoint_ok
     
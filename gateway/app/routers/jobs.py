@@ -0,0 +1,32 @@
+"""
+Routes API pour le suivi des jobs en arrière-plan
+
+Endpoints:
+- GET /jobs : Liste les jobs récents
+- GET /jobs/{job_id} : Statut, tentatives et résultat d'un job
+"""
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+
+from ..services.job_queue import get_job_queue
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+@router.get("")
+def list_jobs(
+    status: Optional[str] = None,
+    job_type: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500)
+):
+    """Liste les jobs les plus récents (filtrables par statut et type)"""
+    return get_job_queue().list_jobs(status=status, job_type=job_type, limit=limit)
+
+
+@router.get("/{job_id}")
+def get_job(job_id: int):
+    """Retourne le statut d'un job"""
+    job = get_job_queue().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} introuvable")
+    return job
@@ -1,13 +1,16 @@
 """
 Routes API pour MidPoint
 """
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict
+from typing import List, Dict, AsyncIterator
 from sqlalchemy.orm import Session
+import json
 import logging
 
-from ..services.midpoint_service import get_midpoint_service
+from ..services.midpoint_async_service import get_async_midpoint_service
 from ..services.provisioning_service import ProvisioningService
 from ..database.connection import get_db
 
@@ -47,29 +50,54 @@ async def get_available_applications():
         }
 
 
+async def _users_as_json(users: AsyncIterator[Dict]) -> AsyncIterator[str]:
+    """
+    Sérialise les utilisateurs en JSON fragmenté (mêmes clés que la réponse classique)
+
+    Le statut est écrit après la liste : une erreur en cours de lecture donne
+    "status": "error" et "truncated": true plutôt qu'une liste partielle
+    présentée comme complète.
+    """
+    yield '{"users": ['
+    count = 0
+    try:
+        async for user in users:
+            yield ("," if count else "") + json.dumps(user)
+            count += 1
+    except Exception as e:
+        logger.error(f"Erreur récupération utilisateurs MidPoint: {e}")
+        yield f'], "count": {count}, "status": "error", "error": {json.dumps(str(e))}, "truncated": true}}'
+        return
+    yield f'], "count": {count}, "status": "success"}}'
+
+
+async def _users_as_ndjson(users: AsyncIterator[Dict]) -> AsyncIterator[str]:
+    """Sérialise les utilisateurs en NDJSON (un objet JSON par ligne, `{"error": ...}` final si tronqué)"""
+    try:
+        async for user in users:
+            yield json.dumps(user) + "\n"
+    except Exception as e:
+        logger.error(f"Erreur récupération utilisateurs MidPoint: {e}")
+        yield json.dumps({"error": str(e), "truncated": True}) + "\n"
+
+
 @router.get("/users")
-async def get_midpoint_users():
+async def get_midpoint_users(
+    format: str = Query("json", pattern="^(json|ndjson)$", description="json ou ndjson")
+):
     """
     Récupère tous les utilisateurs de MidPoint.
     
     Ces utilisateurs peuvent être provisionnés vers les applications métiers.
+    La réponse est streamée page par page : la mémoire reste constante quel
+    que soit le nombre d'identités.
     """
-    try:
-        service = get_midpoint_service()
-        users = service.get_all_users()
-        
-        return {
-            "status": "success",
-            "count": len(users),
-            "users": users
-        }
-        
-    except Exception as e:
-        logger.error(f"Erreur récupération utilisateurs MidPoint: {e}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Erreur lors de la récupération des utilisateurs: {str(e)}"
-        )
+    service = get_async_midpoint_service()
+    users = service.iter_users()
+    
+    if format == "ndjson":
+        return StreamingResponse(_users_as_ndjson(users), media_type="application/x-ndjson")
+    return StreamingResponse(_users_as_json(users), media_type="application/json")
 
 
 @router.post("/provision")
@@ -84,11 +112,10 @@ async def provision_from_midpoint(
     """
     try:
         # Récupérer l'utilisateur depuis MidPoint
-        midpoint_service = get_midpoint_service()
+        midpoint_service = get_async_midpoint_service()
         
-        # Pour l'instant, on récupère tous les users et on filtre
-        all_users = midpoint_service.get_all_users()
-        user = next((u for u in all_users if u['oid'] == request.user_oid), None)
+        # Lecture directe par OID (coût indépendant de la taille de l'annuaire)
+        user = await midpoint_service.get_user_by_oid(request.user_oid)
         
         if not user:
             raise HTTPException(
@@ -110,9 +137,10 @@ async def provision_from_midpoint(
             "department": user.get('department', 'General'),
         }
         
-        # Provisionner via le service avec session DB
+        # Provisionner via le service avec session DB (synchrone : hors boucle d'événements)
         provisioning_service = ProvisioningService(db)
-        operation = provisioning_service.provision_user(
+        operation = await run_in_threadpool(
+            provisioning_service.provision_user,
             user_data=user_data,
             trigger="midpoint",
             dry_run=False,
@@ -144,8 +172,8 @@ async def provision_from_midpoint(
 async def check_midpoint_health():
     """Vérifie la connexion à MidPoint"""
     try:
-        service = get_midpoint_service()
-        is_connected = service.test_connection()
+        service = get_async_midpoint_service()
+        is_connected = await service.test_connection()
         
         return {
             "status": "healthy" if is_connected else "unhealthy",
@@ -6,7 +6,8 @@ Endpoints:
 - POST /odoo/sync : Synchronise tous les employés vers la base locale
 - POST /odoo/webhook : Webhook pour synchronisation temps réel
 """
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional, Dict, List
 from datetime import datetime
@@ -17,7 +18,9 @@ logger = logging.getLogger(__name__)
 
 from ..services.odoo_sync_service import get_odoo_sync_service
 from ..services.odoo_service import get_odoo_service
-from ..database.models import get_db
+from ..services.job_queue import get_job_queue
+from ..core.config import settings
+from ..database.connection import get_db
 
 router = APIRouter(prefix="/odoo", tags=["Odoo Integration"])
 
@@ -72,14 +75,15 @@ async def get_odoo_employees():
 @router.post("/sync", response_model=SyncResponse)
 async def sync_odoo_employees(
     background: bool = False,
-    background_tasks: BackgroundTasks = None,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     db: Session = Depends(get_db)
 ):
     """
     Synchronise tous les employés Odoo vers la base Aegis Gateway
     
     Args:
-        background: Si True, exécute la sync en arrière-plan
+        background: Si True, planifie la sync dans la file de jobs
+            (suivi via GET /api/v1/jobs/{job_id})
         
     Returns:
         Statistiques de synchronisation (créés, mis à jour, ignorés)
@@ -88,21 +92,22 @@ async def sync_odoo_employees(
         POST /api/v1/odoo/sync
         POST /api/v1/odoo/sync?background=true
     """
-    sync_service = get_odoo_sync_service(db)
-    
-    if background and background_tasks:
-        # Exécution asynchrone
-        background_tasks.add_task(sync_service.sync_all_employees)
+    if background:
+        # Exécution asynchrone via la file de jobs persistante
+        job, created = get_job_queue().enqueue(
+            "odoo.sync", idempotency_key=idempotency_key, coalesce=True
+        )
         
         return SyncResponse(
             success=True,
-            message="Synchronisation lancée en arrière-plan",
+            message="Synchronisation planifiée en arrière-plan" if created
+                    else f"Synchronisation déjà planifiée (job {job['id']})",
             timestamp=datetime.now().isoformat(),
-            stats={"status": "running"}
+            stats={"status": job["status"], "job_id": job["id"]}
         )
     else:
         # Exécution synchrone
-        result = sync_service.sync_all_employees()
+        result = get_odoo_sync_service(db).sync_all_employees()
         
         if not result.get("success"):
             raise HTTPException(
@@ -120,29 +125,29 @@ async def sync_odoo_employees(
 
 
 @router.post("/sync-csv")
-async def sync_odoo_to_csv_endpoint(background_tasks: BackgroundTasks):
+async def sync_odoo_to_csv_endpoint(
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     """
     Déclenche manuellement la mise à jour du fichier hr_clean.csv depuis Odoo.
     Met à jour le fichier utilisé par MidPoint pour la réconciliation.
     """
-    odoo = get_odoo_service()
-    
-    # On exécute en background
-    background_tasks.add_task(odoo.update_csv)
+    # On exécute via la file de jobs (une seule régénération en attente à la fois)
+    job, _ = get_job_queue().enqueue(
+        "odoo.csv", idempotency_key=idempotency_key, coalesce=True
+    )
     
     return {
         "success": True,
-        "message": "Mise à jour du fichier hr_clean.csv lancée en arrière-plan",
+        "message": "Mise à jour du fichier hr_clean.csv planifiée en arrière-plan",
+        "job_id": job["id"],
+        "job_status": job["status"],
         "timestamp": datetime.now().isoformat()
     }
 
 
-@router.post("/webhook")
-async def odoo_webhook(
-    payload: WebhookPayload,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
-):
+@router.post("/webhook", status_code=202)
+def odoo_webhook(payload: WebhookPayload):
     """
     Webhook pour synchronisation temps réel depuis Odoo
     
@@ -153,6 +158,11 @@ async def odoo_webhook(
     - update: Employé modifié dans Odoo
     - delete: Employé désactivé dans Odoo
     
+    Les événements sont regroupés pendant ODOO_WEBHOOK_DEBOUNCE_SECONDS :
+    une modification en masse dans Odoo donne une seule lecture des
+    employés concernés et une seule régénération du CSV. La réponse est
+    immédiate (202), le traitement est suivi via GET /api/v1/jobs/{job_id}.
+    
     Usage depuis Odoo/n8n:
         POST /api/v1/odoo/webhook
         {
@@ -161,45 +171,28 @@ async def odoo_webhook(
             "data": {...}
         }
     """
-    sync_service = get_odoo_sync_service(db)
-    
-    # 🔄 Mise à jour du CSV partagé à chaque changement
-    odoo = get_odoo_service()
-    background_tasks.add_task(odoo.update_csv)
-    
-    if payload.event in ["create", "update"]:
-        # Synchroniser l'employé spécifique (best-effort)
-        try:
-            result = sync_service.sync_single_employee(payload.employee_id)
-            sync_success = result.get("success", False)
-            action = result.get("action", "synced")
-        except Exception as e:
-            logger.warning(f"Sync failed for employee {payload.employee_id}: {e}")
-            sync_success = False
-            action = "csv_updated_only"
-        
-        return {
-            "success": True,
-            "message": f"Employé {payload.employee_id}: CSV mis à jour",
-            "action": action,
-            "sync_success": sync_success,
-            "timestamp": datetime.now().isoformat()
-        }
-    
-    elif payload.event == "delete":
-        # Marquer l'utilisateur comme inactif
-        return {
-            "success": True,
-            "message": f"Employé {payload.employee_id}: Marqué inactif, CSV mis à jour",
-            "action": "deactivated_csv_updated",
-            "timestamp": datetime.now().isoformat()
-        }
-    
-    else:
+    if payload.event not in ["create", "update", "delete"]:
         raise HTTPException(
             status_code=400,
             detail=f"Événement non supporté: {payload.event}"
         )
+    
+    job, created = get_job_queue().enqueue_debounced(
+        "odoo.webhook",
+        field="employee_ids",
+        values=[payload.employee_id],
+        window=settings.ODOO_WEBHOOK_DEBOUNCE_SECONDS
+    )
+    
+    return {
+        "success": True,
+        "accepted": True,
+        "message": f"Employé {payload.employee_id}: synchronisation et CSV planifiés",
+        "action": payload.event,
+        "job_id": job["id"],
+        "pending_employees": len(job["payload"].get("employee_ids", [])),
+        "timestamp": datetime.now().isoformat()
+    }
 
 
 @router.get("/sync/status")
@@ -221,7 +214,7 @@ async def get_sync_status(db: Session = Depends(get_db)):
     
     # Tester la connexion Odoo
     odoo = get_odoo_service()
-    odoo_connected = odoo.connect()
+    odoo_connected = await run_in_threadpool(odoo.ping)
     
     return {
         "odoo_connected": odoo_connected,
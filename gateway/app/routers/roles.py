@@ -6,7 +6,7 @@ from pydantic import BaseModel
 from typing import List, Optional
 import logging
 
-from ..services.midpoint_role_service import get_role_service
+from ..services.midpoint_async_service import get_async_midpoint_service
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/roles", tags=["Roles"])
@@ -123,14 +123,14 @@ async def list_roles():
     Tente de récupérer depuis MidPoint, sinon retourne les rôles par défaut.
     """
     try:
-        service = get_role_service()
-        roles = service.get_all_roles()
+        service = get_async_midpoint_service()
+        roles = await service.get_all_roles()
         
         if roles:
-            # Enrichir avec le nombre de membres
+            # Enrichir avec le nombre de membres (un seul comptage pour tous les rôles)
+            member_counts = await service.get_role_member_counts()
             for role in roles:
-                members = service.get_role_members(role.get('oid', ''))
-                role['memberCount'] = len(members)
+                role['memberCount'] = member_counts.get(role.get('oid', ''), 0)
             
             logger.info(f"Récupéré {len(roles)} rôles depuis MidPoint")
             return roles
@@ -147,11 +147,11 @@ async def list_roles():
 async def get_role(role_oid: str):
     """Récupère un rôle par son OID"""
     try:
-        service = get_role_service()
-        role = service.get_role_by_oid(role_oid)
+        service = get_async_midpoint_service()
+        role = await service.get_role_by_oid(role_oid)
         
         if role:
-            members = service.get_role_members(role_oid)
+            members = await service.get_role_members(role_oid)
             role['memberCount'] = len(members)
             role['members'] = members
             return role
@@ -174,8 +174,8 @@ async def get_role(role_oid: str):
 async def get_role_members(role_oid: str):
     """Récupère les membres d'un rôle"""
     try:
-        service = get_role_service()
-        members = service.get_role_members(role_oid)
+        service = get_async_midpoint_service()
+        members = await service.get_role_members(role_oid)
         return members
         
     except Exception as e:
@@ -187,8 +187,8 @@ async def get_role_members(role_oid: str):
 async def assign_role(request: AssignRoleRequest):
     """Assigne un rôle à un utilisateur"""
     try:
-        service = get_role_service()
-        success = service.assign_role_to_user(request.user_oid, request.role_oid)
+        service = get_async_midpoint_service()
+        success = await service.assign_role_to_user(request.user_oid, request.role_oid)
         
         if success:
             return {
@@ -209,8 +209,8 @@ async def assign_role(request: AssignRoleRequest):
 async def unassign_role(request: AssignRoleRequest):
     """Retire un rôle d'un utilisateur"""
     try:
-        service = get_role_service()
-        success = service.unassign_role_from_user(request.user_oid, request.role_oid)
+        service = get_async_midpoint_service()
+        success = await service.unassign_role_from_user(request.user_oid, request.role_oid)
         
         if success:
             return {
@@ -273,13 +273,16 @@ async def refresh_roles_from_midpoint():
     Vide le cache et récupère les rôles à jour.
     """
     try:
-        # Vider le cache du role_mapper
+        # Vider le cache du role_mapper et l'index nom → OID du provisioning
         from ..core.role_mapper import clear_roles_cache
+        from ..services.midpoint_service import get_midpoint_service
         clear_roles_cache()
+        get_midpoint_service().role_index.invalidate()
         
-        # Récupérer les nouveaux rôles
-        service = get_role_service()
-        roles = service.get_all_roles()
+        # Récupérer les nouveaux rôles (compteurs de membres recalculés)
+        service = get_async_midpoint_service()
+        service.invalidate_member_counts()
+        roles = await service.get_all_roles()
         
         logger.info(f"Rôles rechargés depuis MidPoint: {len(roles)} rôles")
         
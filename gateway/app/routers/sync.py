@@ -1,12 +1,14 @@
 """
 Routes API pour la synchronisation Odoo → MidPoint
 """
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Header, Response
 from pydantic import BaseModel
 from typing import Optional, Dict
 from datetime import datetime
 
+from ..core.config import settings
 from ..services.sync_service import get_sync_service
+from ..services.job_queue import get_job_queue
 
 router = APIRouter(prefix="/sync", tags=["Synchronization"])
 
@@ -26,7 +28,7 @@ class StatusResponse(BaseModel):
 
 
 @router.get("/status", response_model=StatusResponse)
-async def get_sync_status():
+def get_sync_status():
     """
     Retourne le statut de la synchronisation
     
@@ -39,7 +41,7 @@ async def get_sync_status():
 
 
 @router.post("/odoo-to-csv", response_model=SyncResponse)
-async def export_odoo_to_csv():
+def export_odoo_to_csv():
     """
     Exporte les employés Odoo vers le fichier CSV
     
@@ -56,15 +58,37 @@ async def export_odoo_to_csv():
     )
 
 
+@router.get("/import-task")
+def get_import_task_status():
+    """
+    État de la tâche d'import HR dans MidPoint
+    
+    - État d'exécution, statut du résultat, progression
+    - Compteurs d'objets traités / en erreur
+    - Run en cours de suivi par la gateway
+    """
+    return get_sync_service().get_import_task_status()
+
+
 @router.post("/csv-to-midpoint", response_model=SyncResponse)
-async def trigger_midpoint_import():
+def trigger_midpoint_import(response: Response, wait: bool = True):
     """
     Déclenche l'import MidPoint depuis le CSV
     
     Étape 2 du pipeline de synchronisation
+    
+    Args:
+        wait: Attend la fin de l'import (métriques réelles) au plus
+            MIDPOINT_TASK_HTTP_TIMEOUT ; au-delà 202, le suivi continue dans
+            le job `import_job_id`. 409 si un import est déjà en cours
     """
     service = get_sync_service()
-    result = service.trigger_midpoint_import()
+    result = service.trigger_midpoint_import(wait=wait, timeout=settings.MIDPOINT_TASK_HTTP_TIMEOUT)
+    if result.get("running"):
+        raise HTTPException(status_code=409, detail=result["message"])
+    if result.get("timeout"):
+        response.status_code = 202
+        result["success"] = True
     
     return SyncResponse(
         success=result.get("success", False),
@@ -75,38 +99,98 @@ async def trigger_midpoint_import():
 
 
 @router.post("/full", response_model=SyncResponse)
-async def full_sync():
+def full_sync(response: Response):
     """
     Synchronisation complète Odoo → CSV → MidPoint
     
     Exécute les deux étapes en séquence:
     1. Export Odoo → CSV
-    2. Import CSV → MidPoint
+    2. Import CSV → MidPoint (attente de la fin de la tâche, au plus
+       MIDPOINT_TASK_HTTP_TIMEOUT ; au-delà 202 et `import_pending`, le
+       suivi continue dans le job `import_job_id`)
+    
+    409 si une synchronisation ou un import MidPoint est déjà en cours.
     """
     service = get_sync_service()
-    result = service.full_sync()
+    result = service.full_sync(import_timeout=settings.MIDPOINT_TASK_HTTP_TIMEOUT)
+    if result.get("running"):
+        raise HTTPException(
+            status_code=409,
+            detail=result.get("error", "Import MidPoint déjà en cours")
+        )
+    if result.get("import_pending"):
+        response.status_code = 202
+        message = f"Synchronisation lancée, import MidPoint suivi par le job {result['import_job_id']}"
+    else:
+        message = f"Synchronisation {'réussie' if result.get('success') else 'échouée'}"
     
     return SyncResponse(
         success=result.get("success", False),
-        message=f"Synchronisation {'réussie' if result.get('success') else 'échouée'}",
+        message=message,
         timestamp=result.get("timestamp", datetime.now().isoformat()),
         details=result
     )
 
 
+@router.post("/push", response_model=SyncResponse)
+def push_to_midpoint(
+    response: Response,
+    background: bool = False,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """
+    Push direct des employés modifiés vers MidPoint (upserts REST)
+    
+    Alternative rapide au pipeline CSV pour les petits deltas ; une
+    réconciliation complète passe toujours par le CSV et la tâche d'import.
+    
+    Args:
+        background: Si True, planifie le push dans la file de jobs
+    """
+    if background:
+        job, created = get_job_queue().enqueue(
+            "sync.push", idempotency_key=idempotency_key, coalesce=True
+        )
+        return SyncResponse(
+            success=True,
+            message="Push planifié en arrière-plan" if created
+                    else f"Push déjà planifié (job {job['id']})",
+            timestamp=datetime.now().isoformat(),
+            details={"async": True, "job_id": job["id"], "status": job["status"]}
+        )
+    
+    result = get_sync_service().push_changes(import_timeout=settings.MIDPOINT_TASK_HTTP_TIMEOUT)
+    if result.get("full_sync", {}).get("import_pending"):
+        # Réconciliation complète : l'import MidPoint continue en arrière-plan
+        response.status_code = 202
+    
+    return SyncResponse(
+        success=result.get("success", False),
+        message=f"Push {'réussi' if result.get('success') else 'échoué'} ({result.get('mode', 'n/a')})",
+        timestamp=datetime.now().isoformat(),
+        details=result
+    )
+
+
 @router.post("/full/async", response_model=SyncResponse)
-async def full_sync_async(background_tasks: BackgroundTasks):
+def full_sync_async(
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     """
     Synchronisation complète en arrière-plan
     
-    Retourne immédiatement, la sync s'exécute en background
+    Retourne immédiatement, la sync est exécutée par la file de jobs.
+    Une sync déjà en attente est réutilisée au lieu d'en planifier une autre.
+    Suivi via GET /api/v1/jobs/{job_id}.
     """
-    service = get_sync_service()
-    background_tasks.add_task(service.full_sync)
+    job, created = get_job_queue().enqueue(
+        "sync.full", idempotency_key=idempotency_key, coalesce=True
+    )
     
     return SyncResponse(
         success=True,
-        message="Synchronisation démarrée en arrière-plan",
+        message="Synchronisation planifiée en arrière-plan" if created
+                else f"Synchronisation déjà planifiée (job {job['id']})",
         timestamp=datetime.now().isoformat(),
-        details={"async": True}
+        details={"async": True, "job_id": job["id"], "status": job["status"]}
     )
@@ -3,10 +3,12 @@ Services Aegis Gateway
 """
 from .odoo_service import OdooService, get_odoo_service
 from .midpoint_service import MidPointService, get_midpoint_service
+from .midpoint_async_service import AsyncMidPointService, get_async_midpoint_service
 from .sync_service import SyncService, get_sync_service
 
 __all__ = [
     "OdooService", "get_odoo_service",
     "MidPointService", "get_midpoint_service",
+    "AsyncMidPointService", "get_async_midpoint_service",
     "SyncService", "get_sync_service"
 ]
@@ -6,6 +6,7 @@ Ce service centralise tous les logs d'audit de l'application.
 import logging
 from datetime import datetime
 from typing import Optional, List, Dict
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from ..database.models import AuditLog
@@ -59,7 +60,13 @@ class AuditService:
         self.db.commit()
         self.db.refresh(audit_log)
         
-        # Log aussi dans les logs Python pour debug
+        self._log_python(action, actor, target, message, level)
+        
+        return audit_log
+    
+    @staticmethod
+    def _log_python(action: str, actor: str, target: Optional[str], message: str, level: str) -> None:
+        """Log aussi dans les logs Python pour debug"""
         log_msg = f"[AUDIT] {action} | {actor} → {target} | {message}"
         if level == "ERROR" or level == "CRITICAL":
             logger.error(log_msg)
@@ -67,8 +74,80 @@ class AuditService:
             logger.warning(log_msg)
         else:
             logger.info(log_msg)
+    
+    def log_bulk(self, entries: List[Dict]) -> int:
+        """
+        Enregistre plusieurs événements d'audit en une seule instruction INSERT.
         
-        return audit_log
+        Contrairement à `log`, ne commit pas : les entrées font partie de la
+        transaction de l'appelant (ex: synchronisation par lots).
+        
+        Args:
+            entries: Dicts avec les mêmes clés que les arguments de `log`
+            
+        Returns:
+            Nombre d'entrées insérées
+        """
+        if not entries:
+            return 0
+        
+        now = datetime.utcnow()
+        rows = [
+            {
+                "timestamp": now,
+                "action": entry["action"],
+                "actor": entry["actor"],
+                "target": entry.get("target"),
+                "message": entry["message"],
+                "level": entry.get("level", "INFO"),
+                "source_ip": entry.get("source_ip"),
+                "details": entry.get("details"),
+            }
+            for entry in entries
+        ]
+        self.db.execute(insert(AuditLog), rows)
+        
+        for row in rows:
+            self._log_python(row["action"], row["actor"], row["target"], row["message"], row["level"])
+        return len(rows)
+    
+    @staticmethod
+    def user_created_entry(
+        user_email: str,
+        user_name: str,
+        source: str,
+        actor: str = "system",
+        source_ip: Optional[str] = None
+    ) -> Dict:
+        """Entrée d'audit de création d'utilisateur (pour `log` ou `log_bulk`)"""
+        return {
+            "action": "USER_CREATED",
+            "actor": actor,
+            "target": f"{user_name} ({user_email})",
+            "message": f"Nouvel utilisateur créé via {source}",
+            "level": "INFO",
+            "source_ip": source_ip,
+            "details": {"email": user_email, "source": source}
+        }
+    
+    @staticmethod
+    def user_updated_entry(
+        user_email: str,
+        user_name: str,
+        changes: Dict,
+        actor: str = "system",
+        source_ip: Optional[str] = None
+    ) -> Dict:
+        """Entrée d'audit de mise à jour d'utilisateur (pour `log` ou `log_bulk`)"""
+        return {
+            "action": "USER_UPDATED",
+            "actor": actor,
+            "target": f"{user_name} ({user_email})",
+            "message": f"Utilisateur mis à jour: {', '.join(changes.keys())}",
+            "level": "INFO",
+            "source_ip": source_ip,
+            "details": {"email": user_email, "changes": changes}
+        }
     
     def log_user_created(
         self, 
@@ -79,15 +158,7 @@ class AuditService:
         source_ip: Optional[str] = None
     ) -> AuditLog:
         """Log création d'utilisateur"""
-        return self.log(
-            action="USER_CREATED",
-            actor=actor,
-            target=f"{user_name} ({user_email})",
-            message=f"Nouvel utilisateur créé via {source}",
-            level="INFO",
-            source_ip=source_ip,
-            details={"email": user_email, "source": source}
-        )
+        return self.log(**self.user_created_entry(user_email, user_name, source, actor, source_ip))
     
     def log_user_updated(
         self,
@@ -98,15 +169,7 @@ class AuditService:
         source_ip: Optional[str] = None
     ) -> AuditLog:
         """Log mise à jour d'utilisateur"""
-        return self.log(
-            action="USER_UPDATED",
-            actor=actor,
-            target=f"{user_name} ({user_email})",
-            message=f"Utilisateur mis à jour: {', '.join(changes.keys())}",
-            level="INFO",
-            source_ip=source_ip,
-            details={"email": user_email, "changes": changes}
-        )
+        return self.log(**self.user_updated_entry(user_email, user_name, changes, actor, source_ip))
     
     def log_sync_started(
         self,
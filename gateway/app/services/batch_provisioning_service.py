@@ -0,0 +1,214 @@
+"""
+Provisioning par lots - Vagues d'onboarding (acquisition, rentrée, etc.)
+
+Les utilisateurs d'un lot sont répartis sur un pool de workers borné ; les
+appels vers chaque cible (MidPoint) sont limités par un sémaphore dédié pour
+ne pas saturer le serveur. Un lot contenant deux fois le même email est
+refusé. L'avancement est consultable via l'ID du lot.
+"""
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+import logging
+
+from ..database.connection import SessionLocal
+from .provisioning_service import ProvisioningService
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchItem:
+    """Résultat du provisioning d'un utilisateur du lot"""
+    email: str
+    status: str = "pending"  # pending | running | success | failed
+    operation_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class Batch:
+    """Lot de provisioning et son avancement"""
+    id: str
+    trigger: str
+    items: List[BatchItem]
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+
+    @property
+    def completed(self) -> int:
+        return sum(1 for item in self.items if item.status in ("success", "failed"))
+
+    @property
+    def status(self) -> str:
+        if self.finished_at:
+            return "completed"
+        return "running" if any(item.status != "pending" for item in self.items) else "pending"
+
+    def to_dict(self, include_items: bool = True) -> Dict:
+        result = {
+            "batch_id": self.id,
+            "status": self.status,
+            "trigger": self.trigger,
+            "total": len(self.items),
+            "completed": self.completed,
+            "successful": sum(1 for item in self.items if item.status == "success"),
+            "failed": sum(1 for item in self.items if item.status == "failed"),
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+        if include_items:
+            result["results"] = [
+                {
+                    "email": item.email,
+                    "status": item.status,
+                    "operation_id": item.operation_id,
+                    "error": item.error,
+                }
+                for item in self.items
+            ]
+        return result
+
+
+class BatchProvisioningService:
+    """Exécution concurrente et bornée des lots de provisioning"""
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        target_limits: Optional[Dict[str, int]] = None,
+        max_retained_batches: int = 100
+    ):
+        """
+        Args:
+            max_workers: Taille du pool de workers
+            target_limits: Appels simultanés maximum par cible (ex: {"midpoint": 4})
+            max_retained_batches: Nombre de lots terminés conservés en mémoire
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch-provision")
+        self.target_limits = {
+            target: threading.BoundedSemaphore(limit)
+            for target, limit in (target_limits or {"midpoint": max_workers}).items()
+        }
+        self.max_retained_batches = max_retained_batches
+        self._batches: Dict[str, Batch] = {}
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        users: List[Dict],
+        trigger: str = "batch",
+        dry_run: bool = False,
+        selected_applications: Optional[List[str]] = None
+    ) -> Batch:
+        """
+        Enregistre un lot et planifie le provisioning de chaque utilisateur
+
+        Raises:
+            ValueError: Email présent plusieurs fois dans le lot (deux workers
+                créeraient le même utilisateur en parallèle)
+        """
+        seen, duplicates = set(), []
+        for user in users:
+            email = (user.get("email") or "").strip().lower()
+            if email in seen and email not in duplicates:
+                duplicates.append(email)
+            seen.add(email)
+        if duplicates:
+            raise ValueError(f"Emails en double dans le lot: {', '.join(duplicates)}")
+
+        batch = Batch(
+            id=str(uuid.uuid4()),
+            trigger=trigger,
+            items=[BatchItem(email=user.get("email", "")) for user in users]
+        )
+        with self._lock:
+            self._batches[batch.id] = batch
+            self._evict_finished()
+
+        remaining = [len(users)]
+        for item, user_data in zip(batch.items, users):
+            self.executor.submit(
+                self._provision_one, batch, item, user_data, remaining,
+                dry_run, selected_applications
+            )
+
+        logger.info(f"Lot {batch.id} planifié: {len(users)} utilisateurs")
+        return batch
+
+    def get(self, batch_id: str) -> Optional[Batch]:
+        """Retourne un lot par son ID"""
+        return self._batches.get(batch_id)
+
+    def _provision_one(
+        self,
+        batch: Batch,
+        item: BatchItem,
+        user_data: Dict,
+        remaining: List[int],
+        dry_run: bool,
+        selected_applications: Optional[List[str]]
+    ) -> None:
+        """Provisionne un utilisateur du lot (exécuté dans un worker)"""
+        item.status = "running"
+        db = SessionLocal()
+        try:
+            # Les limites par cible ne sont tenues que pendant les appels distants
+            operation = ProvisioningService(db, target_limits=self.target_limits).provision_user(
+                user_data=user_data,
+                trigger=batch.trigger,
+                dry_run=dry_run,
+                selected_applications=selected_applications
+            )
+            item.operation_id = operation.id
+            item.status = "success" if operation.status == "success" else "failed"
+        except Exception as e:
+            logger.error(f"Lot {batch.id}: échec provisioning {item.email}: {e}")
+            db.rollback()
+            item.status = "failed"
+            item.error = str(e)
+        finally:
+            db.close()
+            with self._lock:
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    batch.finished_at = datetime.utcnow()
+                    logger.info(f"Lot {batch.id} terminé: {batch.to_dict(include_items=False)}")
+
+    def _evict_finished(self) -> None:
+        """Oublie les lots terminés les plus anciens au-delà de la limite"""
+        finished = sorted(
+            (b for b in self._batches.values() if b.finished_at),
+            key=lambda b: b.finished_at
+        )
+        for batch in finished[:max(0, len(self._batches) - self.max_retained_batches)]:
+            del self._batches[batch.id]
+
+    def shutdown(self) -> None:
+        """Arrête le pool de workers (les utilisateurs non démarrés sont abandonnés)"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Singleton
+_batch_service: Optional[BatchProvisioningService] = None
+
+
+def get_batch_provisioning_service() -> BatchProvisioningService:
+    """Retourne l'instance singleton du service de provisioning par lots"""
+    global _batch_service
+    if _batch_service is None:
+        from ..core.config import settings
+        _batch_service = BatchProvisioningService(
+            max_workers=settings.PROVISIONING_BATCH_WORKERS,
+            target_limits={"midpoint": settings.PROVISIONING_BATCH_MIDPOINT_CONCURRENCY}
+        )
+    return _batch_service
+
+
+def shutdown_batch_provisioning_service() -> None:
+    """Arrête le pool de workers (arrêt de l'application)"""
+    if _batch_service is not None:
+        _batch_service.shutdown()
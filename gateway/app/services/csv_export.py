@@ -0,0 +1,159 @@
+"""
+Export CSV RH - Écriture atomique et différentielle de hr_clean.csv
+
+Le fichier est surveillé par MidPoint (import / live sync) :
+- écriture dans un fichier temporaire du même dossier puis `os.replace`,
+  MidPoint ne voit jamais un fichier à moitié écrit ;
+- ordre stable (tri par personalNumber), un diff ne reflète que les vrais
+  changements ;
+- aucune écriture si l'empreinte globale est inchangée ;
+- optionnellement, un CSV delta ne contenant que les lignes modifiées
+  (les employés retirés y figurent avec le statut 'Inactive').
+
+Les mises à jour (lecture du fichier et de l'index, fusion, écriture) se
+font sous `csv_write_lock` : deux écrivains concurrents (webhook, export
+incrémental, sync complète) perdraient sinon les lignes l'un de l'autre.
+"""
+import csv
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+import logging
+
+from .employee_fingerprint import (
+    employee_fingerprint, snapshot_fingerprint, load_csv_index, save_csv_index
+)
+
+logger = logging.getLogger(__name__)
+
+HR_CSV_FIELDS = ["personalNumber", "givenName", "familyName", "email", "department", "title", "status"]
+
+try:
+    import fcntl
+except ImportError:  # Windows : verrou limité au processus
+    fcntl = None
+
+_write_lock = threading.Lock()
+
+
+@contextmanager
+def csv_write_lock(file_path: str):
+    """
+    Sérialise les lectures-écritures du CSV RH et de son index
+
+    Verrou du processus (threads, jobs) doublé d'un verrou fichier
+    `<fichier>.lock` pour les autres processus (workers, scripts).
+    Non réentrant.
+    """
+    with _write_lock:
+        if fcntl is None:
+            yield
+            return
+        lock_path = Path(f"{file_path}.lock")
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _sort_key(employee: Dict):
+    """Tri numérique des matricules (texte en dernier recours)"""
+    value = str(employee.get("personalNumber", ""))
+    return (0, int(value), "") if value.isdigit() else (1, 0, value)
+
+
+def _atomic_write(path: Path, rows: Iterable[Dict], fieldnames: List[str]) -> None:
+    """Écrit `rows` dans un fichier temporaire puis le substitue à `path`"""
+    # Les permissions de l'ancien fichier sont conservées (lu par le conteneur MidPoint)
+    mode = path.stat().st_mode & 0o777 if path.exists() else 0o644
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_name, mode)
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+
+def _read_rows(path: Path, keys: set) -> Dict[str, Dict]:
+    """Lit les lignes de `path` dont le matricule est dans `keys`"""
+    if not keys or not path.exists():
+        return {}
+    with open(path, newline="", encoding="utf-8") as f:
+        return {row["personalNumber"]: row for row in csv.DictReader(f) if row["personalNumber"] in keys}
+
+
+def write_employees_csv(
+    file_path: str,
+    employees: List[Dict],
+    delta_path: Optional[str] = None,
+    fieldnames: List[str] = HR_CSV_FIELDS
+) -> Dict:
+    """
+    Écrit le CSV RH complet si son contenu a changé.
+
+    Args:
+        file_path: CSV lu par MidPoint
+        employees: Employés actifs (format OdooService)
+        delta_path: Si défini, CSV des seules lignes créées/modifiées/retirées
+        fieldnames: Colonnes du CSV
+
+    Returns:
+        Dict: written (bool), count, changed, removed, delta_path
+    """
+    path = Path(file_path)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+    except PermissionError:
+        logger.warning(f"Impossible de créer le dossier pour {file_path}, tentative d'écriture directe.")
+
+    employees = sorted(employees, key=_sort_key)
+    fingerprints = {str(emp["personalNumber"]): employee_fingerprint(emp) for emp in employees}
+    snapshot = snapshot_fingerprint(fingerprints)
+    index = load_csv_index(file_path)
+
+    if snapshot == index["snapshot"] and path.exists():
+        logger.info(f"{file_path} inchangé ({len(employees)} employés), pas de réécriture")
+        return {"written": False, "count": len(employees), "changed": 0, "removed": 0, "delta_path": None}
+
+    changed = [
+        emp for emp in employees
+        if index["records"].get(str(emp["personalNumber"])) != fingerprints[str(emp["personalNumber"])]
+    ]
+    removed_keys = set(index["records"]) - set(fingerprints)
+
+    # Les lignes retirées sont relues avant le remplacement du fichier
+    removed = []
+    if delta_path and removed_keys:
+        removed = [
+            {**row, "status": "Inactive"}
+            for row in sorted(_read_rows(path, removed_keys).values(), key=_sort_key)
+        ]
+
+    _atomic_write(path, employees, fieldnames)
+    if delta_path:
+        _atomic_write(Path(delta_path), changed + removed, fieldnames)
+    save_csv_index(file_path, fingerprints, snapshot)
+
+    logger.info(f"{file_path} écrit: {len(employees)} employés, {len(changed)} modifiés, "
+                f"{len(removed_keys)} retirés")
+    return {
+        "written": True,
+        "count": len(employees),
+        "changed": len(changed),
+        "removed": len(removed_keys),
+        "delta_path": delta_path
+    }
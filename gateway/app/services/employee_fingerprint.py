@@ -0,0 +1,75 @@
+"""
+Empreinte de contenu des employés - Détection des changements par hash
+
+Chaque employé normalisé a une empreinte stable (SHA-256 des champs métier),
+stockée sur ProvisionedUser et dans un index à côté du CSV RH. Un employé
+dont l'empreinte n'a pas changé est ignoré sans comparer ses champs ; si
+l'empreinte globale du fichier est inchangée, rien n'est réécrit en aval.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_FIELDS = (
+    "personalNumber", "givenName", "familyName",
+    "email", "department", "title", "status"
+)
+
+
+def _normalize(value) -> str:
+    return "" if value is None else str(value).strip()
+
+
+def employee_fingerprint(employee: Dict) -> str:
+    """Empreinte d'un employé (identique qu'il vienne d'Odoo ou du CSV)"""
+    values = [_normalize(employee.get(field)) for field in FINGERPRINT_FIELDS]
+    payload = json.dumps(values, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def snapshot_fingerprint(fingerprints: Dict[str, str]) -> str:
+    """Empreinte d'un ensemble d'employés (indépendante de l'ordre)"""
+    digest = hashlib.sha256()
+    for key in sorted(fingerprints):
+        digest.update(f"{key}:{fingerprints[key]}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def csv_index_path(csv_path: str) -> Path:
+    """Chemin de l'index associé au CSV (ex: hr_clean.csv.index.json)"""
+    return Path(f"{csv_path}.index.json")
+
+
+def load_csv_index(csv_path: str) -> Dict:
+    """
+    Charge l'index du CSV : {"snapshot": ..., "records": {personalNumber: empreinte}}
+    
+    Retourne un index vide si le fichier est absent ou illisible.
+    """
+    path = csv_index_path(csv_path)
+    if not path.exists():
+        return {"snapshot": None, "records": {}}
+    try:
+        with open(path, encoding="utf-8") as f:
+            index = json.load(f)
+        return {"snapshot": index.get("snapshot"), "records": index.get("records", {})}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Index {path} illisible, il sera reconstruit: {e}")
+        return {"snapshot": None, "records": {}}
+
+
+def save_csv_index(csv_path: str, fingerprints: Dict[str, str], snapshot: Optional[str] = None) -> None:
+    """Enregistre l'index du CSV (remplacement atomique)"""
+    path = csv_index_path(csv_path)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "snapshot": snapshot or snapshot_fingerprint(fingerprints),
+            "records": fingerprints
+        }, f)
+    os.replace(tmp_path, path)
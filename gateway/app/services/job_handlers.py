@@ -0,0 +1,133 @@
+"""
+Handlers de la file de jobs - Un handler par type de job
+
+Chaque handler reçoit le payload du job et retourne un dict de résultat ;
+un résultat avec success=False est traité comme un échec (relance).
+"""
+from typing import Dict
+
+from ..database.connection import SessionLocal
+
+
+def _import_wait() -> float:
+    """Attente maximum de l'import MidPoint dans un job : moitié du bail"""
+    from ..core.config import settings
+    return settings.JOB_LEASE_SECONDS / 2
+
+
+def run_full_sync(payload: Dict) -> Dict:
+    """
+    Synchronisation complète Odoo → CSV → MidPoint
+    
+    Un import encore en cours après la moitié du bail est suivi par le job
+    "midpoint.import.wait" (voir SyncService.trigger_midpoint_import).
+    """
+    from .sync_service import get_sync_service
+    return get_sync_service().full_sync(import_timeout=_import_wait())
+
+
+def run_odoo_sync(payload: Dict) -> Dict:
+    """Synchronisation des employés Odoo vers la base locale"""
+    from .odoo_sync_service import get_odoo_sync_service
+    db = SessionLocal()
+    try:
+        return get_odoo_sync_service(db).sync_all_employees()
+    finally:
+        db.close()
+
+
+def run_odoo_csv(payload: Dict) -> Dict:
+    """Régénération du fichier hr_clean.csv depuis Odoo"""
+    from .odoo_service import get_odoo_service
+    return get_odoo_service().update_csv()
+
+
+def run_sync_push(payload: Dict) -> Dict:
+    """Push direct vers MidPoint des employés modifiés"""
+    from .sync_service import get_sync_service
+    return get_sync_service().push_changes(import_timeout=_import_wait())
+
+
+def run_import_wait(payload: Dict) -> Dict:
+    """
+    Suivi d'un import MidPoint lancé par une synchronisation complète
+    
+    Limité à la moitié du bail : un import toujours en cours est replanifié.
+    Si un autre suivi de la tâche est actif, il rapporte lui-même la fin.
+    """
+    from .job_queue import get_job_queue
+    from .sync_service import get_sync_service
+    
+    result = get_sync_service().track_midpoint_import(
+        payload["previous_finish"], payload["started_at"], timeout=_import_wait()
+    )
+    if result.get("timeout"):
+        get_job_queue().enqueue("midpoint.import.wait", payload, coalesce=True)
+        return {**result, "success": True, "import_pending": True}
+    if result.get("running"):
+        return {**result, "success": True}
+    return result
+
+
+def run_db_backfill(payload: Dict) -> Dict:
+    """
+    Migrations de données en attente (backfills par lots)
+    
+    Limité à la moitié du bail du job : un backfill inachevé est replanifié
+    et reprend à son dernier point de reprise.
+    """
+    from ..core.config import settings
+    from ..database.migrations import run_data_migrations
+    from .job_queue import get_job_queue
+    
+    result = run_data_migrations(
+        version=payload.get("version"),
+        max_seconds=settings.JOB_LEASE_SECONDS / 2
+    )
+    if any(m["status"] == "partial" for m in result["migrations"]):
+        get_job_queue().enqueue("db.backfill", payload, coalesce=True)
+    return result
+
+
+def run_odoo_webhook(payload: Dict) -> Dict:
+    """
+    Traite les webhooks Odoo regroupés : une lecture des employés concernés,
+    réutilisée pour la base locale, le push vers MidPoint (si
+    MIDPOINT_PUSH_ENABLED) et la fusion dans le CSV
+    """
+    from ..core.config import settings
+    from .odoo_sync_service import get_odoo_sync_service
+    from .odoo_service import get_odoo_service
+    from .midpoint_push_service import get_midpoint_push_service
+    
+    employee_ids = payload.get("employee_ids", [])
+    odoo = get_odoo_service()
+    employees = odoo.get_employees_by_ids(employee_ids)
+    
+    db = SessionLocal()
+    try:
+        sync_result = get_odoo_sync_service(db).sync_employees(employees)
+    finally:
+        db.close()
+    
+    result = {"employee_ids": employee_ids, "sync": sync_result}
+    success = sync_result.get("success", False)
+    
+    if settings.MIDPOINT_PUSH_ENABLED:
+        result["push"] = get_midpoint_push_service().push(employees)
+        success = success and result["push"]["failed"] == 0
+    
+    result["csv"] = odoo.merge_csv(employees)
+    result["success"] = bool(success and result["csv"].get("success"))
+    return result
+
+
+JOB_HANDLERS = {
+    "sync.full": run_full_sync,
+    "odoo.sync": run_odoo_sync,
+    "odoo.csv": run_odoo_csv,
+    "odoo.webhook": run_odoo_webhook,
+    "sync.push": run_sync_push,
+    "db.backfill": run_db_backfill,
+    "midpoint.import.wait": run_import_wait,
+}
@@ -0,0 +1,490 @@
+"""
+File de jobs persistante - Remplace les BackgroundTasks FastAPI
+
+Les jobs (synchronisation Odoo, export CSV, sync complète...) sont enregistrés
+dans la table `jobs` puis exécutés par des workers qui scrutent la table :
+- un job pris par un worker reçoit un bail (lease), prolongé tant que son
+  handler s'exécute ; si le worker disparaît, le job est repris par un autre
+  une fois le bail expiré ;
+- un échec est relancé avec un délai exponentiel jusqu'à `max_attempts` ;
+- une clé d'idempotence renvoie le job déjà enregistré au lieu d'en créer un ;
+- le nombre de jobs simultanés est limité par type.
+
+La prise d'un job est une mise à jour conditionnelle. Sous SQLite (écritures
+sérialisées) elle suffit ; sous PostgreSQL, les prises d'un même type sont
+sérialisées par un verrou consultatif transactionnel et le job est verrouillé
+par `FOR UPDATE SKIP LOCKED` (seules bases supportées).
+Un redémarrage de l'application ne perd donc plus les traitements planifiés.
+"""
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
+
+from ..database.connection import SessionLocal, engine
+from ..database.models import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict], Optional[Dict]]
+
+# Bases où la prise d'un job respecte la limite par type (voir `_claim`)
+SUPPORTED_DIALECTS = ("sqlite", "postgresql")
+
+
+class JobFailed(Exception):
+    """Le handler a signalé un échec (résultat avec success=False)"""
+
+
+def job_to_dict(job: Job) -> Dict:
+    """Sérialise un job pour l'API"""
+    return {
+        "id": job.id,
+        "job_type": job.job_type,
+        "status": job.status,
+        "payload": job.payload,
+        "result": job.result,
+        "error": job.error,
+        "idempotency_key": job.idempotency_key,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "run_after": job.run_after.isoformat() if job.run_after else None,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+class JobQueue:
+    """File de jobs adossée à la base de données, exécutée par un pool de threads"""
+
+    def __init__(
+        self,
+        handlers: Dict[str, JobHandler],
+        workers: int = 2,
+        poll_interval: float = 1.0,
+        lease_seconds: float = 900.0,
+        max_attempts: int = 3,
+        retry_backoff: float = 30.0,
+        retry_backoff_max: float = 900.0,
+        max_concurrency: Optional[Dict[str, int]] = None,
+        default_concurrency: int = 1,
+        heartbeat_interval: Optional[float] = None
+    ):
+        """
+        Args:
+            handlers: Fonction d'exécution par type de job (payload → résultat)
+            workers: Nombre de threads d'exécution
+            poll_interval: Délai entre deux scrutations quand la file est vide
+            lease_seconds: Durée du bail d'un job en cours
+            max_attempts: Tentatives par défaut avant l'échec définitif
+            retry_backoff: Délai avant la première relance (doublé ensuite)
+            retry_backoff_max: Délai maximum entre deux tentatives
+            max_concurrency: Jobs simultanés maximum par type
+            default_concurrency: Limite pour les types non listés
+            heartbeat_interval: Prolongation du bail d'un job en cours
+                (défaut : tiers du bail)
+        """
+        self.handlers = handlers
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self.max_concurrency = max_concurrency or {}
+        self.default_concurrency = default_concurrency
+        self.heartbeat_interval = heartbeat_interval or lease_seconds / 3
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._enqueue_lock = threading.Lock()
+
+    # ==================== PLANIFICATION ====================
+
+    def enqueue(
+        self,
+        job_type: str,
+        payload: Optional[Dict] = None,
+        idempotency_key: Optional[str] = None,
+        coalesce: bool = False,
+        max_attempts: Optional[int] = None,
+        delay: float = 0.0
+    ) -> Tuple[Dict, bool]:
+        """
+        Enregistre un job.
+
+        Args:
+            job_type: Type de job (doit avoir un handler)
+            payload: Paramètres transmis au handler
+            idempotency_key: Si un job porte déjà cette clé, il est renvoyé tel quel
+            coalesce: Réutilise un job identique encore en attente
+            max_attempts: Tentatives maximum (défaut de la file sinon)
+            delay: Délai avant la première exécution (secondes)
+
+        Returns:
+            (job sérialisé, True si un nouveau job a été créé)
+        """
+        if job_type not in self.handlers:
+            raise ValueError(f"Type de job inconnu: {job_type}")
+
+        payload = payload or {}
+        db = SessionLocal()
+        try:
+            with self._enqueue_lock:
+                if idempotency_key:
+                    existing = db.query(Job).filter(Job.idempotency_key == idempotency_key).first()
+                    if existing:
+                        return job_to_dict(existing), False
+
+                if coalesce:
+                    pending = db.query(Job).filter(
+                        Job.job_type == job_type,
+                        Job.status == JobStatus.QUEUED.value
+                    ).order_by(Job.id).all()
+                    for job in pending:
+                        if (job.payload or {}) == payload:
+                            logger.info(f"Job {job_type} regroupé avec le job {job.id} en attente")
+                            return job_to_dict(job), False
+
+                job = Job(
+                    job_type=job_type,
+                    payload=payload,
+                    idempotency_key=idempotency_key,
+                    max_attempts=max_attempts or self.max_attempts,
+                    run_after=datetime.utcnow() + timedelta(seconds=delay)
+                )
+                db.add(job)
+                try:
+                    db.commit()
+                except IntegrityError:
+                    # Même clé d'idempotence enregistrée par un autre processus
+                    db.rollback()
+                    existing = db.query(Job).filter(Job.idempotency_key == idempotency_key).first()
+                    return job_to_dict(existing), False
+
+                db.refresh(job)
+                logger.info(f"Job {job.id} ({job_type}) planifié")
+                self._wakeup.set()
+                return job_to_dict(job), True
+        finally:
+            db.close()
+
+    def enqueue_debounced(
+        self,
+        job_type: str,
+        field: str,
+        values: List,
+        window: float
+    ) -> Tuple[Dict, bool]:
+        """
+        Ajoute `values` à la liste `payload[field]` du job en attente de ce
+        type, ou crée un job exécuté dans `window` secondes.
+        
+        La fenêtre part du premier événement : un flux continu d'événements
+        ne retarde pas indéfiniment l'exécution.
+        
+        Returns:
+            (job sérialisé, True si un nouveau job a été créé)
+        """
+        if job_type not in self.handlers:
+            raise ValueError(f"Type de job inconnu: {job_type}")
+        
+        db = SessionLocal()
+        try:
+            with self._enqueue_lock:
+                pending = db.query(Job).filter(
+                    Job.job_type == job_type,
+                    Job.status == JobStatus.QUEUED.value,
+                    Job.attempts == 0
+                ).order_by(Job.id).first()
+                
+                if pending is not None:
+                    current = (pending.payload or {}).get(field, [])
+                    merged = current + [value for value in values if value not in current]
+                    # Fusion conditionnelle : échoue si un worker a pris le job entre-temps
+                    updated = db.execute(
+                        update(Job)
+                        .where(Job.id == pending.id, Job.status == JobStatus.QUEUED.value)
+                        .values(payload={**(pending.payload or {}), field: merged})
+                        .execution_options(synchronize_session=False)
+                    ).rowcount
+                    db.commit()
+                    if updated:
+                        db.refresh(pending)
+                        return job_to_dict(pending), False
+        finally:
+            db.close()
+        
+        return self.enqueue(job_type, {field: list(dict.fromkeys(values))}, delay=window)
+    
+    def get(self, job_id: int) -> Optional[Dict]:
+        """Retourne un job par son ID"""
+        db = SessionLocal()
+        try:
+            job = db.query(Job).filter(Job.id == job_id).first()
+            return job_to_dict(job) if job else None
+        finally:
+            db.close()
+
+    def list_jobs(
+        self,
+        status: Optional[str] = None,
+        job_type: Optional[str] = None,
+        limit: int = 50
+    ) -> List[Dict]:
+        """Liste les jobs les plus récents"""
+        db = SessionLocal()
+        try:
+            query = db.query(Job)
+            if status:
+                query = query.filter(Job.status == status)
+            if job_type:
+                query = query.filter(Job.job_type == job_type)
+            return [job_to_dict(job) for job in query.order_by(Job.id.desc()).limit(limit).all()]
+        finally:
+            db.close()
+
+    # ==================== EXÉCUTION ====================
+
+    def _recover_expired_leases(self, db) -> None:
+        """Remet en file (ou en échec) les jobs dont le worker a disparu"""
+        now = datetime.utcnow()
+        expired = db.query(Job).filter(
+            Job.status == JobStatus.RUNNING.value,
+            Job.lease_expires_at < now
+        ).all()
+        for job in expired:
+            logger.warning(f"Job {job.id} ({job.job_type}): bail expiré ({job.lease_owner})")
+            job.lease_owner = None
+            job.lease_expires_at = None
+            job.error = "Bail expiré: worker interrompu"
+            if job.attempts >= job.max_attempts:
+                job.status = JobStatus.FAILED.value
+                job.finished_at = now
+            else:
+                job.status = JobStatus.QUEUED.value
+                job.run_after = now
+        if expired:
+            db.commit()
+
+    def _claim(self, db) -> Optional[Job]:
+        """Prend le prochain job exécutable en respectant les limites par type"""
+        self._recover_expired_leases(db)
+
+        now = datetime.utcnow()
+        candidates = db.query(Job.id, Job.job_type).filter(
+            Job.status == JobStatus.QUEUED.value,
+            Job.run_after <= now
+        ).order_by(Job.run_after, Job.id).limit(20).all()
+
+        running = aliased(Job)
+        postgresql = db.get_bind().dialect.name == "postgresql"
+        for job_id, job_type in candidates:
+            limit = self.max_concurrency.get(job_type, self.default_concurrency)
+            if postgresql:
+                # En READ COMMITTED, deux prises simultanées compteraient chacune
+                # 0 job en cours : verrou par type jusqu'au commit de la prise
+                db.execute(select(func.pg_advisory_xact_lock(func.hashtext(f"jobs:{job_type}"))))
+            locked = db.execute(
+                select(Job.id)
+                .where(Job.id == job_id, Job.status == JobStatus.QUEUED.value)
+                .with_for_update(skip_locked=True)
+            ).first()
+            if locked is None:
+                # Pris (ou en cours de prise) par un autre worker
+                db.rollback()
+                continue
+            running_count = (
+                select(func.count(running.id))
+                .where(running.job_type == job_type, running.status == JobStatus.RUNNING.value)
+                .scalar_subquery()
+            )
+            # Prise conditionnelle : échoue si un autre worker a pris le job
+            # ou si la limite du type est atteinte entre-temps
+            claimed = db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == JobStatus.QUEUED.value, running_count < limit)
+                .values(
+                    status=JobStatus.RUNNING.value,
+                    lease_owner=f"{self.worker_id}:{threading.current_thread().name}",
+                    lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                    attempts=Job.attempts + 1,
+                    started_at=now
+                )
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+            if claimed:
+                return db.query(Job).filter(Job.id == job_id).first()
+        return None
+
+    def _backoff(self, attempts: int) -> float:
+        return min(self.retry_backoff * (2 ** max(0, attempts - 1)), self.retry_backoff_max)
+
+    def _heartbeat(self, job_id: int, owner: str, done: threading.Event) -> None:
+        """Prolonge le bail du job tant que son handler s'exécute"""
+        while not done.wait(self.heartbeat_interval):
+            db = SessionLocal()
+            try:
+                renewed = db.execute(
+                    update(Job)
+                    .where(Job.id == job_id, Job.status == JobStatus.RUNNING.value, Job.lease_owner == owner)
+                    .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=self.lease_seconds))
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                db.commit()
+                if not renewed:
+                    logger.warning(f"Job {job_id}: bail perdu, prolongation arrêtée")
+                    return
+            except Exception as e:
+                logger.error(f"Job {job_id}: prolongation du bail échouée: {e}")
+                db.rollback()
+            finally:
+                db.close()
+
+    def _finish(self, db, job: Job, owner: str, **values) -> bool:
+        """Enregistre l'issue du job, seulement si ce worker en détient encore le bail"""
+        updated = db.execute(
+            update(Job)
+            .where(Job.id == job.id, Job.status == JobStatus.RUNNING.value, Job.lease_owner == owner)
+            .values(lease_owner=None, lease_expires_at=None, **values)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        if not updated:
+            logger.warning(f"Job {job.id} ({job.job_type}): bail repris par un autre worker, résultat ignoré")
+        return bool(updated)
+
+    def _execute(self, db, job: Job) -> None:
+        """Exécute un job et enregistre son résultat"""
+        logger.info(f"Job {job.id} ({job.job_type}) démarré, tentative {job.attempts}/{job.max_attempts}")
+        owner = job.lease_owner
+        done = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(job.id, owner, done),
+            name=f"job-heartbeat-{job.id}", daemon=True
+        )
+        heartbeat.start()
+        try:
+            result = self.handlers[job.job_type](job.payload or {})
+            if isinstance(result, dict) and result.get("success") is False:
+                raise JobFailed(result.get("error") or result.get("message") or "Échec du job")
+        except Exception as e:
+            done.set()
+            heartbeat.join()
+            if job.attempts >= job.max_attempts:
+                if self._finish(db, job, owner, status=JobStatus.FAILED.value, error=str(e),
+                                finished_at=datetime.utcnow()):
+                    logger.error(f"Job {job.id} ({job.job_type}) en échec définitif: {e}")
+            else:
+                delay = self._backoff(job.attempts)
+                if self._finish(db, job, owner, status=JobStatus.QUEUED.value, error=str(e),
+                                run_after=datetime.utcnow() + timedelta(seconds=delay)):
+                    logger.warning(f"Job {job.id} ({job.job_type}) en échec, relance dans {delay:.0f}s: {e}")
+            return
+
+        done.set()
+        heartbeat.join()
+        if self._finish(
+            db, job, owner,
+            status=JobStatus.SUCCEEDED.value,
+            result=result if isinstance(result, dict) else {"result": result},
+            error=None,
+            finished_at=datetime.utcnow()
+        ):
+            logger.info(f"Job {job.id} ({job.job_type}) terminé")
+
+    def run_pending(self) -> bool:
+        """Exécute un job s'il y en a un. Retourne True si un job a été traité."""
+        db = SessionLocal()
+        try:
+            job = self._claim(db)
+            if job is None:
+                return False
+            self._execute(db, job)
+            return True
+        except Exception as e:
+            logger.error(f"Erreur worker de jobs: {e}")
+            db.rollback()
+            return False
+        finally:
+            db.close()
+
+    def _worker_loop(self) -> None:
+        while not self._stop.is_set():
+            if self.run_pending():
+                continue
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        """Démarre les workers"""
+        if self._threads:
+            return
+        dialect = engine.dialect.name
+        if dialect not in SUPPORTED_DIALECTS:
+            raise RuntimeError(
+                f"File de jobs: base {dialect} non supportée (limites par type garanties "
+                f"uniquement sous {', '.join(SUPPORTED_DIALECTS)})"
+            )
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"File de jobs démarrée: {self.workers} workers ({self.worker_id})")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        Arrête les workers. Un job en cours n'est pas interrompu : s'il ne se
+        termine pas à temps, il sera repris à l'expiration de son bail.
+        """
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+
+# Singleton
+_job_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    """Retourne l'instance singleton de la file de jobs"""
+    global _job_queue
+    if _job_queue is None:
+        from ..core.config import settings
+        from .job_handlers import JOB_HANDLERS
+        _job_queue = JobQueue(
+            handlers=JOB_HANDLERS,
+            workers=settings.JOB_WORKERS,
+            poll_interval=settings.JOB_POLL_INTERVAL,
+            lease_seconds=settings.JOB_LEASE_SECONDS,
+            max_attempts=settings.JOB_MAX_ATTEMPTS,
+            retry_backoff=settings.JOB_RETRY_BACKOFF,
+            retry_backoff_max=settings.JOB_RETRY_BACKOFF_MAX,
+            max_concurrency=settings.JOB_MAX_CONCURRENCY
+        )
+    return _job_queue
+
+
+def start_job_queue() -> None:
+    """Démarre les workers (démarrage de l'application)"""
+    from ..core.config import settings
+    if settings.JOB_QUEUE_ENABLED:
+        get_job_queue().start()
+
+
+def stop_job_queue() -> None:
+    """Arrête les workers (arrêt de l'application)"""
+    if _job_queue is not None:
+        _job_queue.stop()
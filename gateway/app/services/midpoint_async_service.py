@@ -0,0 +1,416 @@
+"""
+Service MidPoint asynchrone - Client REST non bloquant pour les routes `async def`
+
+Même surface que MidPointService / MidPointRoleService, mais basé sur
+httpx.AsyncClient : un appel MidPoint lent ne bloque plus la boucle
+d'événements uvicorn.
+"""
+import asyncio
+import httpx
+from typing import List, Dict, Optional, AsyncIterator
+import logging
+import time
+import xml.etree.ElementTree as ET
+
+from .midpoint_service import (
+    _http2_available,
+    get_midpoint_service,
+    oid_from_location,
+    USER_SUMMARY_EXCLUDE,
+)
+from .midpoint_xml import (
+    equal_query,
+    paged_query,
+    role_members_query,
+    user_xml,
+    assignments_modification_xml,
+    first_oid,
+    parse_users,
+    parse_roles,
+    parse_role,
+    parse_members,
+    RoleMemberCounter,
+    ROLE_MEMBER_SEARCH_PARAMS,
+    UserStreamParser,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncMidPointService:
+    """Client asynchrone pour l'API REST MidPoint"""
+
+    def __init__(
+        self,
+        url: str = "http://midpoint:8080/midpoint",
+        username: str = "administrator",
+        password: str = "5ecr3t",
+        timeout: float = 30.0,
+        http2: bool = True,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        member_count_ttl: float = 30.0,
+        page_size: int = 500
+    ):
+        self.url = url
+        self.username = username
+        self.password = password
+        self.auth = (username, password)
+        self.timeout = timeout
+        self.http2 = http2
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.page_size = page_size
+        self._client: Optional[httpx.AsyncClient] = None
+        self.member_count_ttl = member_count_ttl
+        self._member_counts: Optional[Dict[str, int]] = None
+        self._member_counts_at: float = 0.0
+        self._member_counts_lock = asyncio.Lock()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Retourne le client HTTP asynchrone partagé (créé à la première utilisation)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.url,
+                auth=self.auth,
+                headers={
+                    "Content-Type": "application/xml",
+                    "Accept": "application/xml"
+                },
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2 and _http2_available()
+            )
+        return self._client
+
+    async def close(self) -> None:
+        """Ferme le pool de connexions HTTP"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # ========== Utilisateurs ==========
+
+    async def test_connection(self) -> bool:
+        """Teste la connexion à MidPoint"""
+        try:
+            response = await self._get_client().get("/ws/rest/self")
+            return response.status_code == 200
+        except Exception as e:
+            logger.error(f"Erreur connexion MidPoint: {e}")
+            return False
+
+    async def search_users(self, path: str, value: str) -> List[Dict]:
+        """Recherche des utilisateurs par égalité sur un attribut"""
+        try:
+            response = await self._get_client().post(
+                "/ws/rest/users/search",
+                content=equal_query(path, value)
+            )
+            if response.status_code == 200:
+                return parse_users(response.text)
+        except Exception as e:
+            logger.error(f"Erreur recherche utilisateur: {e}")
+        return []
+
+    async def get_user_by_personal_number(self, personal_number: str) -> Optional[Dict]:
+        """Recherche un utilisateur par personalNumber"""
+        try:
+            response = await self._get_client().post(
+                "/ws/rest/users/search",
+                content=equal_query("personalNumber", personal_number)
+            )
+            if response.status_code == 200 and "<user" in response.text:
+                return {"exists": True, "data": response.text}
+            return None
+        except Exception as e:
+            logger.error(f"Erreur recherche utilisateur: {e}")
+            return None
+
+    async def get_all_users(self) -> List[Dict]:
+        """Récupère tous les utilisateurs depuis MidPoint (via PostgreSQL en fallback)"""
+        return [user async for user in self.iter_users()]
+
+    async def iter_users(self, page_size: Optional[int] = None) -> AsyncIterator[Dict]:
+        """
+        Itère sur les utilisateurs MidPoint page par page.
+
+        Chaque page (`offset`/`maxSize`) est lue en streaming et parsée de façon
+        incrémentale : les utilisateurs sont produits au fil de l'eau.
+
+        API REST inaccessible dès la première page : repli sur PostgreSQL.
+        Une erreur après des utilisateurs déjà produits est relevée (la liste
+        serait tronquée).
+        """
+        page_size = page_size or self.page_size
+        offset = 0
+
+        while True:
+            parser = UserStreamParser()
+            try:
+                async with self._get_client().stream(
+                    "POST",
+                    "/ws/rest/users/search",
+                    content=paged_query(offset, page_size)
+                ) as response:
+                    if response.status_code != 200:
+                        raise httpx.HTTPStatusError(
+                            f"HTTP {response.status_code}",
+                            request=response.request,
+                            response=response
+                        )
+                    async for chunk in response.aiter_bytes():
+                        for user in parser.feed(chunk):
+                            yield user
+                parser.close()
+            except Exception as e:
+                if offset == 0 and parser.count == 0:
+                    logger.warning(f"API REST MidPoint inaccessible: {e}, fallback vers PostgreSQL")
+                    # Le fallback base de données est synchrone : exécuté hors de la boucle
+                    for user in await asyncio.to_thread(get_midpoint_service()._get_users_from_db):
+                        yield user
+                    return
+                logger.error(f"Erreur lecture des utilisateurs (offset {offset}): {e}")
+                raise
+
+            if parser.count < page_size:
+                return
+            offset += page_size
+
+    async def get_user_by_oid(self, oid: str) -> Optional[Dict]:
+        """Récupère un utilisateur par son OID (GET direct, sans lister l'annuaire)"""
+        try:
+            response = await self._get_client().get(
+                f"/ws/rest/users/{oid}",
+                params={"exclude": USER_SUMMARY_EXCLUDE}
+            )
+            if response.status_code == 200:
+                users = parse_users(response.text)
+                return users[0] if users else None
+            if response.status_code != 404:
+                logger.error(f"Erreur lecture utilisateur {oid}: {response.status_code}")
+            return None
+        except Exception as e:
+            logger.warning(f"API REST MidPoint inaccessible: {e}, fallback vers PostgreSQL")
+
+        return await asyncio.to_thread(get_midpoint_service()._get_user_from_db, oid)
+
+    async def create_user(self, user_data: Dict, role_oids: Optional[List[str]] = None) -> Optional[str]:
+        """Crée un utilisateur (assignations incluses) et retourne son OID"""
+        try:
+            response = await self._get_client().post(
+                "/ws/rest/users",
+                content=user_xml(user_data, role_oids)
+            )
+            if response.status_code in [200, 201, 202]:
+                logger.info(f"Utilisateur créé: {user_data.get('email')}")
+                oid = oid_from_location(response.headers.get("Location"))
+                if oid:
+                    return oid
+                # Réponse sans Location : recherche de secours
+                existing = await self.get_user_by_personal_number(user_data.get('personalNumber', ''))
+                return first_oid(existing['data'], "user") if existing else None
+            logger.error(f"Erreur création: {response.status_code} - {response.text}")
+            return None
+        except Exception as e:
+            logger.error(f"Erreur création utilisateur: {e}")
+            return None
+
+    async def upsert_user(self, user_data: Dict, role_oids: Optional[List[str]] = None) -> Dict:
+        """Crée ou met à jour un utilisateur avec ses assignations (une seule écriture)"""
+        role_oids = role_oids or []
+        existing_user = await self.get_user_by_personal_number(user_data.get('personalNumber', ''))
+
+        if not existing_user:
+            oid = await self.create_user(user_data, role_oids)
+            return {"success": oid is not None, "oid": oid, "created": True}
+
+        oid = first_oid(existing_user['data'], "user")
+        if not oid:
+            return {"success": False, "oid": None, "created": False}
+
+        success = True
+        if role_oids:
+            success = await self.modify_user(oid, assignments_modification_xml(role_oids, "add"))
+        return {"success": success, "oid": oid, "created": False}
+
+    async def modify_user(self, user_oid: str, modification_xml: str) -> bool:
+        """Applique un delta `objectModification` à un utilisateur"""
+        try:
+            response = await self._get_client().patch(
+                f"/ws/rest/users/{user_oid}",
+                content=modification_xml
+            )
+            if response.status_code in [200, 204]:
+                return True
+            logger.error(f"Erreur modification {user_oid}: {response.status_code}")
+            return False
+        except Exception as e:
+            logger.error(f"Erreur modification utilisateur: {e}")
+            return False
+
+    async def trigger_recompute(self, user_oid: str) -> bool:
+        """Déclenche le recompute d'un utilisateur pour appliquer les rôles"""
+        try:
+            response = await self._get_client().post(f"/ws/rest/users/{user_oid}/recompute")
+            return response.status_code in [200, 202, 204]
+        except Exception as e:
+            logger.error(f"Erreur recompute: {e}")
+            return False
+
+    # ========== Rôles ==========
+
+    async def find_role_oid_by_name(self, role_name: str) -> Optional[str]:
+        """Cherche l'OID d'un rôle par son nom"""
+        try:
+            response = await self._get_client().post(
+                "/ws/rest/roles/search",
+                content=equal_query("name", role_name)
+            )
+            if response.status_code == 200:
+                return first_oid(response.text, "role")
+        except Exception as e:
+            logger.error(f"Erreur recherche rôle {role_name}: {e}")
+        return None
+
+    async def get_all_roles(self) -> List[Dict]:
+        """Récupère tous les rôles depuis MidPoint"""
+        try:
+            response = await self._get_client().get("/ws/rest/roles")
+            if response.status_code != 200:
+                logger.error(f"Erreur récupération rôles: {response.status_code}")
+                return []
+            return parse_roles(response.text)
+        except Exception as e:
+            logger.error(f"Erreur connexion MidPoint: {e}")
+            return []
+
+    async def get_role_by_oid(self, oid: str) -> Optional[Dict]:
+        """Récupère un rôle spécifique par son OID"""
+        try:
+            response = await self._get_client().get(f"/ws/rest/roles/{oid}")
+            if response.status_code != 200:
+                return None
+            return parse_role(ET.fromstring(response.text))
+        except Exception as e:
+            logger.error(f"Erreur récupération rôle {oid}: {e}")
+            return None
+
+    async def get_role_members(self, role_oid: str) -> List[Dict]:
+        """Récupère les utilisateurs ayant ce rôle"""
+        try:
+            response = await self._get_client().post(
+                "/ws/rest/users/search",
+                content=role_members_query(role_oid)
+            )
+            if response.status_code != 200:
+                return []
+            return parse_members(response.text)
+        except Exception as e:
+            logger.error(f"Erreur recherche membres: {e}")
+            return []
+
+    async def get_role_member_counts(self) -> Dict[str, int]:
+        """
+        Nombre de membres de chaque rôle (OID → nombre d'utilisateurs).
+
+        Un seul parcours des utilisateurs pour tout le catalogue au lieu d'une
+        recherche par rôle : pages `/users/search` limitées aux assignations,
+        parsées de façon incrémentale au fil des fragments reçus. Le résultat
+        est gardé en cache quelques secondes.
+        """
+        if self._member_counts_fresh():
+            return self._member_counts
+
+        # Un seul parcours pour les requêtes simultanées : les suivantes
+        # attendent le verrou puis lisent le cache rempli par la première
+        async with self._member_counts_lock:
+            if self._member_counts_fresh():
+                return self._member_counts
+            return await self._count_role_members()
+
+    def _member_counts_fresh(self) -> bool:
+        """Cache des compteurs rempli depuis moins de `member_count_ttl` secondes"""
+        return (self._member_counts is not None
+                and time.monotonic() - self._member_counts_at < self.member_count_ttl)
+
+    def invalidate_member_counts(self) -> None:
+        """Vide le cache des compteurs de membres (recalculés au prochain accès)"""
+        self._member_counts = None
+        self._member_counts_at = 0.0
+
+    async def _count_role_members(self) -> Dict[str, int]:
+        """Parcourt les pages `/users/search` et met à jour le cache"""
+        counts: Dict[str, int] = {}
+        offset = 0
+        try:
+            while True:
+                parser = RoleMemberCounter(counts)
+                async with self._get_client().stream(
+                    "POST",
+                    "/ws/rest/users/search",
+                    params=ROLE_MEMBER_SEARCH_PARAMS,
+                    content=paged_query(offset, self.page_size)
+                ) as response:
+                    if response.status_code != 200:
+                        logger.error(f"Erreur comptage membres: HTTP {response.status_code}")
+                        return self._member_counts or {}
+                    async for chunk in response.aiter_bytes():
+                        parser.feed(chunk)
+                parser.close()
+
+                if parser.count < self.page_size:
+                    break
+                offset += self.page_size
+        except Exception as e:
+            logger.error(f"Erreur comptage membres: {e}")
+            return self._member_counts or {}
+
+        self._member_counts = counts
+        self._member_counts_at = time.monotonic()
+        return counts
+
+    async def assign_role_to_user(self, user_oid: str, role_oid: str) -> bool:
+        """Assigne un rôle à un utilisateur"""
+        success = await self.modify_user(user_oid, assignments_modification_xml([role_oid], "add"))
+        if success:
+            logger.info(f"Rôle {role_oid} assigné à {user_oid}")
+        return success
+
+    async def unassign_role_from_user(self, user_oid: str, role_oid: str) -> bool:
+        """Retire un rôle d'un utilisateur"""
+        return await self.modify_user(user_oid, assignments_modification_xml([role_oid], "delete"))
+
+
+# Singleton
+_async_midpoint_service: Optional[AsyncMidPointService] = None
+
+
+def get_async_midpoint_service() -> AsyncMidPointService:
+    """Retourne l'instance singleton du client MidPoint asynchrone"""
+    global _async_midpoint_service
+    if _async_midpoint_service is None:
+        from ..core.config import settings
+        _async_midpoint_service = AsyncMidPointService(
+            url=getattr(settings, 'MIDPOINT_URL', 'http://midpoint:8080/midpoint'),
+            username=getattr(settings, 'MIDPOINT_USERNAME', 'administrator'),
+            password=getattr(settings, 'MIDPOINT_PASSWORD', 'Test5ecr3t'),
+            timeout=settings.MIDPOINT_TIMEOUT,
+            http2=settings.MIDPOINT_HTTP2,
+            max_connections=settings.MIDPOINT_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.MIDPOINT_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=settings.MIDPOINT_POOL_KEEPALIVE_EXPIRY,
+            member_count_ttl=settings.MIDPOINT_ROLE_MEMBER_COUNT_TTL,
+            page_size=settings.MIDPOINT_PAGE_SIZE
+        )
+    return _async_midpoint_service
+
+
+async def close_async_midpoint_service() -> None:
+    """Ferme le pool HTTP du client asynchrone (arrêt de l'application)"""
+    if _async_midpoint_service is not None:
+        await _async_midpoint_service.close()
@@ -0,0 +1,86 @@
+"""
+Push direct vers MidPoint - Alternative au passage par le CSV RH
+
+Les employés modifiés sont envoyés à MidPoint sous forme d'upserts REST,
+par lots et avec un nombre borné d'appels simultanés : une embauche est
+visible dans MidPoint en quelques secondes, sans relancer la tâche d'import
+qui relit tout le fichier. Le chemin CSV + tâche reste utilisé pour les
+réconciliations complètes.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import logging
+
+from .midpoint_service import get_midpoint_service
+
+logger = logging.getLogger(__name__)
+
+# Nombre maximum d'erreurs détaillées dans le résultat
+MAX_REPORTED_ERRORS = 20
+
+
+class MidPointPushService:
+    """Upserts MidPoint par lots, concurrence bornée"""
+
+    def __init__(self, max_concurrency: int = 4, batch_size: int = 50):
+        """
+        Args:
+            max_concurrency: Appels MidPoint simultanés maximum
+            batch_size: Employés envoyés par lot
+        """
+        self.max_concurrency = max_concurrency
+        self.batch_size = batch_size
+
+    def _push_one(self, employee: Dict) -> Dict:
+        try:
+            return get_midpoint_service().upsert_user(employee, update_attributes=True)
+        except Exception as e:
+            return {"success": False, "oid": None, "created": False, "error": str(e)}
+
+    def push(self, employees: List[Dict]) -> Dict:
+        """
+        Crée ou met à jour les employés dans MidPoint
+
+        Returns:
+            Dict: created, updated, failed, errors, duration_seconds
+        """
+        start = time.monotonic()
+        stats = {"total": len(employees), "created": 0, "updated": 0, "failed": 0, "errors": []}
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="midpoint-push") as executor:
+            for i in range(0, len(employees), self.batch_size):
+                batch = employees[i:i + self.batch_size]
+                for employee, result in zip(batch, executor.map(self._push_one, batch)):
+                    if not result.get("success"):
+                        stats["failed"] += 1
+                        if len(stats["errors"]) < MAX_REPORTED_ERRORS:
+                            stats["errors"].append({
+                                "personalNumber": employee.get("personalNumber"),
+                                "error": result.get("error", "Upsert MidPoint échoué")
+                            })
+                    elif result.get("created"):
+                        stats["created"] += 1
+                    else:
+                        stats["updated"] += 1
+
+        stats["duration_seconds"] = round(time.monotonic() - start, 3)
+        logger.info(f"Push MidPoint: {stats['created']} créés, {stats['updated']} mis à jour, "
+                    f"{stats['failed']} échecs en {stats['duration_seconds']}s")
+        return stats
+
+
+# Singleton
+_push_service: Optional[MidPointPushService] = None
+
+
+def get_midpoint_push_service() -> MidPointPushService:
+    """Retourne l'instance singleton du service de push MidPoint"""
+    global _push_service
+    if _push_service is None:
+        from ..core.config import settings
+        _push_service = MidPointPushService(
+            max_concurrency=settings.MIDPOINT_PUSH_CONCURRENCY,
+            batch_size=settings.MIDPOINT_PUSH_BATCH_SIZE
+        )
+    return _push_service
@@ -0,0 +1,162 @@
+"""
+Lecture directe du dépôt MidPoint (PostgreSQL) - Fallback quand l'API REST est indisponible
+
+Connexion SQLAlchemy poolée, en lecture seule, avec curseur côté serveur :
+les utilisateurs sont lus par lots sans charger toute la table en mémoire.
+"""
+from typing import Dict, Iterator, NamedTuple, Optional
+import logging
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+USER_COLUMNS = """
+    oid,
+    nameorig,
+    COALESCE(emailaddress, '') AS emailaddress,
+    COALESCE(givennameorig, '') AS givennameorig,
+    COALESCE(familynameorig, '') AS familynameorig,
+    COALESCE(fullnameorig, '') AS fullnameorig
+"""
+
+USERS_QUERY = text(f"""
+    SELECT {USER_COLUMNS}
+    FROM m_user
+    WHERE nameorig != 'administrator'
+    ORDER BY nameorig
+""")
+
+USER_BY_OID_QUERY = text(f"""
+    SELECT {USER_COLUMNS}
+    FROM m_user
+    WHERE oid = :oid
+""")
+
+
+class MidPointUserRow(NamedTuple):
+    """Ligne typée de la table m_user"""
+    oid: str
+    name: str
+    email: str
+    given_name: str
+    family_name: str
+    full_name: str
+
+    def to_dict(self) -> Dict:
+        """Format identique aux utilisateurs lus via l'API REST"""
+        return {
+            'oid': self.oid,
+            'name': self.name,
+            'email': self.email or None,
+            'givenName': self.given_name,
+            'familyName': self.family_name,
+            'fullName': self.full_name,
+            'title': None,
+            'status': 'enabled'
+        }
+
+
+class MidPointRepositoryReader:
+    """Lecteur en lecture seule du dépôt PostgreSQL de MidPoint"""
+
+    def __init__(
+        self,
+        url: str,
+        pool_size: int = 2,
+        max_overflow: int = 2,
+        fetch_size: int = 500
+    ):
+        self.url = url
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.fetch_size = fetch_size
+        self._engine: Optional[Engine] = None
+
+    def _get_engine(self) -> Engine:
+        """Crée l'engine à la première utilisation (le driver reste optionnel)"""
+        if self._engine is None:
+            self._engine = create_engine(
+                self.url,
+                pool_size=self.pool_size,
+                max_overflow=self.max_overflow,
+                pool_pre_ping=True,
+                pool_recycle=1800,
+                execution_options={"postgresql_readonly": True}
+            )
+        return self._engine
+
+    @staticmethod
+    def _to_row(row) -> MidPointUserRow:
+        return MidPointUserRow(
+            oid=str(row.oid),
+            name=row.nameorig,
+            email=row.emailaddress,
+            given_name=row.givennameorig,
+            family_name=row.familynameorig,
+            full_name=row.fullnameorig
+        )
+
+    def iter_users(self) -> Iterator[MidPointUserRow]:
+        """Itère sur les utilisateurs via un curseur côté serveur"""
+        with self._get_engine().connect() as conn:
+            result = conn.execution_options(yield_per=self.fetch_size).execute(USERS_QUERY)
+            for row in result:
+                yield self._to_row(row)
+
+    def get_user(self, oid: str) -> Optional[MidPointUserRow]:
+        """Lit un utilisateur par son OID"""
+        with self._get_engine().connect() as conn:
+            row = conn.execute(USER_BY_OID_QUERY, {"oid": oid}).first()
+            return self._to_row(row) if row is not None else None
+
+    def close(self) -> None:
+        """Ferme le pool de connexions"""
+        if self._engine is not None:
+            self._engine.dispose()
+            self._engine = None
+
+
+def users_fallback_mode() -> str:
+    """Mode de fallback effectif : 'repository', 'docker' ou 'none'"""
+    from ..core.config import settings
+
+    mode = settings.MIDPOINT_USERS_FALLBACK
+    if mode == "auto":
+        return "repository" if settings.MIDPOINT_REPOSITORY_URL else "docker"
+    return mode
+
+
+# Singleton
+_repository_reader: Optional[MidPointRepositoryReader] = None
+
+
+def get_midpoint_repository() -> Optional[MidPointRepositoryReader]:
+    """
+    Retourne le lecteur du dépôt MidPoint, ou None si le fallback configuré
+    n'est pas la connexion directe (MIDPOINT_USERS_FALLBACK).
+    """
+    global _repository_reader
+    from ..core.config import settings
+
+    if users_fallback_mode() != "repository":
+        return None
+
+    if not settings.MIDPOINT_REPOSITORY_URL:
+        logger.error("MIDPOINT_USERS_FALLBACK=repository mais MIDPOINT_REPOSITORY_URL non défini")
+        return None
+
+    if _repository_reader is None:
+        _repository_reader = MidPointRepositoryReader(
+            url=settings.MIDPOINT_REPOSITORY_URL,
+            pool_size=settings.MIDPOINT_REPOSITORY_POOL_SIZE,
+            fetch_size=settings.MIDPOINT_PAGE_SIZE
+        )
+    return _repository_reader
+
+
+def close_midpoint_repository() -> None:
+    """Ferme le pool du lecteur (arrêt de l'application)"""
+    if _repository_reader is not None:
+        _repository_reader.close()
@@ -6,16 +6,16 @@ from typing import List, Dict, Optional
 import logging
 import xml.etree.ElementTree as ET
 from ..core.config import settings
+from .midpoint_xml import (
+    role_members_query,
+    assignments_modification_xml,
+    parse_roles,
+    parse_role,
+    parse_members,
+)
 
 logger = logging.getLogger(__name__)
 
-# Namespace MidPoint
-NS = {
-    'c': 'http://midpoint.evolveum.com/xml/ns/public/common/common-3',
-    't': 'http://prism.evolveum.com/xml/ns/public/types-3',
-    'q': 'http://prism.evolveum.com/xml/ns/public/query-3'
-}
-
 
 class MidPointRoleService:
     """Service pour gérer les rôles MidPoint"""
@@ -56,66 +56,11 @@ class MidPointRoleService:
     
     def _parse_roles_xml(self, xml_text: str) -> List[Dict]:
         """Parse la réponse XML MidPoint pour extraire les rôles"""
-        roles = []
-        try:
-            root = ET.fromstring(xml_text)
-            
-            # Chercher tous les éléments role
-            for role_elem in root.findall('.//c:role', NS) or root.findall('.//role', NS):
-                role = self._parse_single_role(role_elem)
-                if role:
-                    roles.append(role)
-            
-            # Si pas trouvé avec namespace, essayer sans
-            if not roles:
-                for role_elem in root.iter():
-                    if role_elem.tag.endswith('role'):
-                        role = self._parse_single_role(role_elem)
-                        if role:
-                            roles.append(role)
-                            
-        except ET.ParseError as e:
-            logger.error(f"Erreur parsing XML: {e}")
-        
-        return roles
+        return parse_roles(xml_text)
     
     def _parse_single_role(self, role_elem) -> Optional[Dict]:
         """Parse un élément role XML"""
-        try:
-            # Extraire OID
-            oid = role_elem.get('oid', '')
-            
-            # Helper pour trouver un élément avec ou sans namespace
-            def find_text(elem, tag):
-                for ns_prefix in ['c:', '']:
-                    found = elem.find(f'.//{ns_prefix}{tag}', NS if ns_prefix else {})
-                    if found is not None and found.text:
-                        return found.text
-                # Chercher sans namespace
-                for child in elem.iter():
-                    if child.tag.endswith(tag) and child.text:
-                        return child.text
-                return None
-            
-            name = find_text(role_elem, 'name') or 'Unknown'
-            
-            # Skip les rôles système
-            if name.startswith('Superuser') or name.startswith('End user'):
-                return None
-            
-            return {
-                'id': oid,
-                'oid': oid,
-                'name': name,
-                'displayName': find_text(role_elem, 'displayName') or name,
-                'description': find_text(role_elem, 'description') or '',
-                'riskLevel': find_text(role_elem, 'riskLevel') or 'low',
-                'requestable': find_text(role_elem, 'requestable') == 'true',
-                'source': 'midpoint'
-            }
-        except Exception as e:
-            logger.error(f"Erreur parsing role: {e}")
-            return None
+        return parse_role(role_elem)
     
     def get_role_by_oid(self, oid: str) -> Optional[Dict]:
         """Récupère un rôle spécifique par son OID"""
@@ -135,16 +80,7 @@ class MidPointRoleService:
     
     def get_role_members(self, role_oid: str) -> List[Dict]:
         """Récupère les utilisateurs ayant ce rôle"""
-        query = f"""<?xml version="1.0" encoding="UTF-8"?>
-        <q:query xmlns:q="http://prism.evolveum.com/xml/ns/public/query-3"
-                 xmlns:c="http://midpoint.evolveum.com/xml/ns/public/common/common-3">
-            <q:filter>
-                <q:ref>
-                    <q:path>assignment/targetRef</q:path>
-                    <q:value oid="{role_oid}" type="c:RoleType"/>
-                </q:ref>
-            </q:filter>
-        </q:query>"""
+        query = role_members_query(role_oid)
         
         try:
             with self._get_client() as client:
@@ -161,48 +97,11 @@ class MidPointRoleService:
     
     def _parse_users_xml(self, xml_text: str) -> List[Dict]:
         """Parse la réponse XML pour extraire les utilisateurs"""
-        users = []
-        try:
-            root = ET.fromstring(xml_text)
-            
-            for user_elem in root.iter():
-                if user_elem.tag.endswith('user'):
-                    oid = user_elem.get('oid', '')
-                    name = None
-                    email = None
-                    
-                    for child in user_elem.iter():
-                        if child.tag.endswith('name') and child.text:
-                            name = child.text
-                        if child.tag.endswith('emailAddress') and child.text:
-                            email = child.text
-                    
-                    if name:
-                        users.append({
-                            'oid': oid,
-                            'name': name,
-                            'email': email or ''
-                        })
-                        
-        except ET.ParseError:
-            pass
-        
-        return users
+        return parse_members(xml_text)
     
     def assign_role_to_user(self, user_oid: str, role_oid: str) -> bool:
         """Assigne un rôle à un utilisateur"""
-        assignment_xml = f"""<?xml version="1.0" encoding="UTF-8"?>
-        <objectModification xmlns="http://midpoint.evolveum.com/xml/ns/public/common/api-types-3"
-                           xmlns:c="http://midpoint.evolveum.com/xml/ns/public/common/common-3"
-                           xmlns:t="http://prism.evolveum.com/xml/ns/public/types-3">
-            <itemDelta>
-                <t:modificationType>add</t:modificationType>
-                <t:path>c:assignment</t:path>
-                <t:value>
-                    <c:targetRef oid="{role_oid}" type="c:RoleType"/>
-                </t:value>
-            </itemDelta>
-        </objectModification>"""
+        assignment_xml = assignments_modification_xml([role_oid], "add")
         
         try:
             with self._get_client() as client:
@@ -224,18 +123,7 @@ class MidPointRoleService:
     
     def unassign_role_from_user(self, user_oid: str, role_oid: str) -> bool:
         """Retire un rôle d'un utilisateur"""
-        unassignment_xml = f"""<?xml version="1.0" encoding="UTF-8"?>
-        <objectModification xmlns="http://midpoint.evolveum.com/xml/ns/public/common/api-types-3"
-                           xmlns:c="http://midpoint.evolveum.com/xml/ns/public/common/common-3"
-                           xmlns:t="http://prism.evolveum.com/xml/ns/public/types-3">
-            <itemDelta>
-                <t:modificationType>delete</t:modificationType>
-                <t:path>c:assignment</t:path>
-                <t:value>
-                    <c:targetRef oid="{role_oid}" type="c:RoleType"/>
-                </t:value>
-            </itemDelta>
-        </objectModification>"""
+        unassignment_xml = assignments_modification_xml([role_oid], "delete")
         
         try:
             with self._get_client() as client:
@@ -2,12 +2,50 @@
 Service MidPoint - Gestion des utilisateurs via API REST
 """
 import httpx
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Iterator
 import logging
+import threading
 import xml.etree.ElementTree as ET
 
+from .midpoint_xml import (
+    equal_query,
+    paged_query,
+    user_xml,
+    assignments_modification_xml,
+    user_modification_xml,
+    first_oid,
+    parse_users,
+    parse_roles,
+    parse_task,
+    UserStreamParser,
+)
+from .midpoint_repository import get_midpoint_repository, users_fallback_mode
+from .role_index import RoleIndex
+
 logger = logging.getLogger(__name__)
 
+# Éléments volumineux exclus lors de la lecture d'un utilisateur unique
+USER_SUMMARY_EXCLUDE = ["assignment", "roleMembershipRef", "linkRef", "credentials", "jpegPhoto"]
+
+# Statistiques d'exécution non renvoyées par défaut lors de la lecture d'une tâche
+TASK_STATS_INCLUDE = ["operationStats", "activityState"]
+
+
+def oid_from_location(location: Optional[str]) -> Optional[str]:
+    """Extrait l'OID de l'en-tête Location (`.../ws/rest/users/{oid}`)"""
+    if not location:
+        return None
+    return location.rstrip('/').rsplit('/', 1)[-1] or None
+
+
+def _http2_available() -> bool:
+    """HTTP/2 nécessite le paquet optionnel `h2` (httpx[http2])"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
 
 class MidPointService:
     """Service pour interagir avec l'API REST MidPoint"""
@@ -16,84 +54,191 @@ class MidPointService:
         self,
         url: str = "http://midpoint:8080/midpoint",
         username: str = "administrator",
-        password: str = "5ecr3t"
+        password: str = "5ecr3t",
+        timeout: float = 30.0,
+        http2: bool = True,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        role_index_ttl: float = 300.0,
+        role_index_negative_ttl: float = 60.0,
+        page_size: int = 500
     ):
         self.url = url
         self.username = username
         self.password = password
         self.auth = (username, password)
+        self.timeout = timeout
+        self.http2 = http2
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.page_size = page_size
+        self._client: Optional[httpx.Client] = None
+        self._client_lock = threading.Lock()
+        self.role_index = RoleIndex(
+            loader=self._fetch_roles,
+            search=self._search_role_oid,
+            ttl=role_index_ttl,
+            negative_ttl=role_index_negative_ttl
+        )
     
     def _get_client(self) -> httpx.Client:
-        """Crée un client HTTP configuré"""
-        return httpx.Client(
-            base_url=self.url,
-            auth=self.auth,
-            headers={"Content-Type": "application/xml"},
-            timeout=30.0
-        )
+        """
+        Retourne le client HTTP partagé (pool de connexions keep-alive).
+        
+        Le client est créé à la première utilisation puis réutilisé par tous
+        les appels : les connexions TCP/TLS restent ouvertes entre deux requêtes.
+        """
+        if self._client is None or self._client.is_closed:
+            with self._client_lock:
+                if self._client is None or self._client.is_closed:
+                    http2 = self.http2 and _http2_available()
+                    if self.http2 and not http2:
+                        logger.warning("Paquet 'h2' absent, client MidPoint en HTTP/1.1")
+                    self._client = httpx.Client(
+                        base_url=self.url,
+                        auth=self.auth,
+                        headers={"Content-Type": "application/xml"},
+                        timeout=self.timeout,
+                        limits=self.limits,
+                        http2=http2
+                    )
+        return self._client
+    
+    def close(self) -> None:
+        """Ferme le pool de connexions HTTP"""
+        with self._client_lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
     
     def test_connection(self) -> bool:
         """Teste la connexion à MidPoint"""
         try:
-            with self._get_client() as client:
-                response = client.get("/ws/rest/self")
-                return response.status_code == 200
+            client = self._get_client()
+            response = client.get("/ws/rest/self")
+            return response.status_code == 200
         except Exception as e:
             logger.error(f"Erreur connexion MidPoint: {e}")
             return False
     
     def get_user_by_personal_number(self, personal_number: str) -> Optional[Dict]:
         """Recherche un utilisateur par personalNumber"""
-        query = f"""<?xml version="1.0" encoding="UTF-8"?>
-        <q:query xmlns:q="http://prism.evolveum.com/xml/ns/public/query-3">
-            <q:filter>
-                <q:equal>
-                    <q:path>personalNumber</q:path>
-                    <q:value>{personal_number}</q:value>
-                </q:equal>
-            </q:filter>
-        </q:query>"""
+        query = equal_query("personalNumber", personal_number)
         
         try:
-            with self._get_client() as client:
-                response = client.post(
-                    "/ws/rest/users/search",
-                    content=query
-                )
-                if response.status_code == 200 and "<user" in response.text:
-                    return {"exists": True, "data": response.text}
-                return None
+            client = self._get_client()
+            response = client.post(
+                "/ws/rest/users/search",
+                content=query
+            )
+            if response.status_code == 200 and "<user" in response.text:
+                return {"exists": True, "data": response.text}
+            return None
         except Exception as e:
             logger.error(f"Erreur recherche utilisateur: {e}")
             return None
     
-    def create_user(self, user_data: Dict) -> bool:
-        """Crée un utilisateur dans MidPoint"""
-        user_xml = f"""<?xml version="1.0" encoding="UTF-8"?>
-        <user xmlns="http://midpoint.evolveum.com/xml/ns/public/common/common-3">
-            <name>{user_data.get('email', '').split('@')[0]}</name>
-            <givenName>{user_data.get('givenName', '')}</givenName>
-            <familyName>{user_data.get('familyName', '')}</familyName>
-            <emailAddress>{user_data.get('email', '')}</emailAddress>
-            <personalNumber>{user_data.get('personalNumber', '')}</personalNumber>
-            <title>{user_data.get('title', '')}</title>
-            <organization>{user_data.get('department', '')}</organization>
-            <activation>
-                <administrativeStatus>{'enabled' if user_data.get('status') == 'Active' else 'disabled'}</administrativeStatus>
-            </activation>
-        </user>"""
+    def get_user_by_oid(self, oid: str) -> Optional[Dict]:
+        """
+        Récupère un utilisateur par son OID (GET direct, sans lister l'annuaire).
+        
+        Retourne None si l'utilisateur n'existe pas ; si l'API REST est
+        injoignable, bascule sur la base MidPoint.
+        """
+        try:
+            client = self._get_client()
+            response = client.get(
+                f"/ws/rest/users/{oid}",
+                params={"exclude": USER_SUMMARY_EXCLUDE}
+            )
+            if response.status_code == 200:
+                users = parse_users(response.text)
+                return users[0] if users else None
+            if response.status_code != 404:
+                logger.error(f"Erreur lecture utilisateur {oid}: {response.status_code}")
+            return None
+        except Exception as e:
+            logger.warning(f"API REST MidPoint inaccessible: {e}, fallback vers PostgreSQL")
+        
+        return self._get_user_from_db(oid)
+    
+    def create_user(self, user_data: Dict, role_oids: Optional[List[str]] = None) -> Optional[str]:
+        """
+        Crée un utilisateur dans MidPoint et retourne son OID.
+        
+        Les rôles de `role_oids` sont assignés dans la même requête. L'OID est lu
+        dans l'en-tête `Location` de la réponse (None en cas d'échec).
+        """
+        body = user_xml(user_data, role_oids)
         
         try:
-            with self._get_client() as client:
-                response = client.post("/ws/rest/users", content=user_xml)
-                if response.status_code in [200, 201, 202]:
-                    logger.info(f"Utilisateur créé: {user_data.get('email')}")
-                    return True
-                else:
-                    logger.error(f"Erreur création: {response.status_code} - {response.text}")
-                    return False
+            client = self._get_client()
+            response = client.post("/ws/rest/users", content=body)
+            if response.status_code in [200, 201, 202]:
+                logger.info(f"Utilisateur créé: {user_data.get('email')}")
+                oid = oid_from_location(response.headers.get("Location"))
+                if oid:
+                    return oid
+                # Réponse sans Location (proxy, ancienne version) : recherche de secours
+                existing = self.get_user_by_personal_number(user_data.get('personalNumber', ''))
+                return first_oid(existing['data'], "user") if existing else None
+            else:
+                logger.error(f"Erreur création: {response.status_code} - {response.text}")
+                return None
         except Exception as e:
             logger.error(f"Erreur création utilisateur: {e}")
+            return None
+    
+    def upsert_user(
+        self,
+        user_data: Dict,
+        role_oids: Optional[List[str]] = None,
+        update_attributes: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Crée ou met à jour un utilisateur avec ses assignations de rôles.
+        
+        Une recherche par personalNumber puis une seule écriture : création avec
+        assignations incluses, ou delta d'ajout des assignations sur l'existant.
+        Avec `update_attributes`, le delta remplace aussi les attributs RH
+        (nom, email, poste, département, statut d'activation).
+        
+        Returns:
+            Dict: {"success", "oid", "created"}
+        """
+        role_oids = role_oids or []
+        existing_user = self.get_user_by_personal_number(user_data.get('personalNumber', ''))
+        
+        if not existing_user:
+            oid = self.create_user(user_data, role_oids)
+            return {"success": oid is not None, "oid": oid, "created": True}
+        
+        oid = first_oid(existing_user['data'], "user")
+        if not oid:
+            return {"success": False, "oid": None, "created": False}
+        
+        success = True
+        if update_attributes:
+            success = self.modify_user(oid, user_modification_xml(user_data, role_oids))
+        elif role_oids:
+            success = self.modify_user(oid, assignments_modification_xml(role_oids, "add"))
+        return {"success": success, "oid": oid, "created": False}
+    
+    def modify_user(self, user_oid: str, modification_xml: str) -> bool:
+        """Applique un delta `objectModification` à un utilisateur"""
+        try:
+            client = self._get_client()
+            response = client.patch(f"/ws/rest/users/{user_oid}", content=modification_xml)
+            if response.status_code in [200, 204]:
+                return True
+            logger.error(f"MidPoint Error: {response.status_code} - {response.text}")
+            return False
+        except Exception as e:
+            logger.error(f"Erreur modification utilisateur: {e}")
             return False
     
     def update_user(self, oid: str, user_data: Dict) -> bool:
@@ -102,26 +247,30 @@ class MidPointService:
         return True
 
     def _find_role_oid_by_name(self, role_name: str) -> Optional[str]:
-        """Cherche l'OID d'un rôle par son nom"""
-        query = f"""<q:query xmlns:q="http://prism.evolveum.com/xml/ns/public/query-3">
-            <q:filter>
-                <q:equal>
-                    <q:path>name</q:path>
-                    <q:value>{role_name}</q:value>
-                </q:equal>
-            </q:filter>
-        </q:query>"""
+        """Cherche l'OID d'un rôle par son nom (via l'index en mémoire)"""
+        return self.role_index.get_oid(role_name)
+
+    def _fetch_roles(self) -> Optional[List[Dict]]:
+        """Charge le catalogue complet des rôles (alimente l'index)"""
+        try:
+            client = self._get_client()
+            response = client.get("/ws/rest/roles")
+            if response.status_code == 200:
+                return parse_roles(response.text)
+            logger.error(f"Erreur récupération rôles: {response.status_code}")
+        except Exception as e:
+            logger.error(f"Erreur récupération rôles: {e}")
+        return None
+
+    def _search_role_oid(self, role_name: str) -> Optional[str]:
+        """Recherche unitaire d'un rôle par son nom"""
+        query = equal_query("name", role_name)
         
         try:
-            with self._get_client() as client:
-                response = client.post("/ws/rest/roles/search", content=query)
-                if response.status_code == 200:
-                    root = ET.fromstring(response.text)
-                    # Namespace map
-                    ns = {'c': 'http://midpoint.evolveum.com/xml/ns/public/common/common-3'}
-                    role = root.find(".//c:role", ns)
-                    if role is not None:
-                        return role.get('oid')
+            client = self._get_client()
+            response = client.post("/ws/rest/roles/search", content=query)
+            if response.status_code == 200:
+                return first_oid(response.text, "role")
         except Exception as e:
             logger.error(f"Erreur recherche rôle {role_name}: {e}")
         return None
@@ -131,6 +280,9 @@ class MidPointService:
         Orchestration complète : Crée/Update User + Assigne les rôles.
         Remplace les appels directs aux APIs finales.
         
+        Les rôles sont résolus via l'index en mémoire, puis l'utilisateur est
+        créé avec ses assignations (ou modifié s'il existe) en une seule écriture.
+        
         Args:
             user_data: Données utilisateur (email, nom, etc.)
             assignments: Liste des noms de rôles/apps (ex: 'Mattermost', 'Role-Developer')
@@ -141,57 +293,10 @@ class MidPointService:
             "midpoint_oid": None
         }
         
-        # 1. Gestion de l'identité (User)
-        existing_user = self.get_user_by_personal_number(user_data.get('personalNumber', ''))
-        user_oid = None
-        
-        if existing_user:
-            # Récupérer l'OID depuis le XML (parsing rapide)
-            try:
-                root = ET.fromstring(existing_user['data'])
-                # L'objet retourné par search est une liste d'objets, ou l'objet lui-même selon setup
-                # Souvent <object><user oid="...">...</object>
-                user_node = root.find(".//{http://midpoint.evolveum.com/xml/ns/public/common/common-3}user")
-                if user_node is not None:
-                    user_oid = user_node.get('oid')
-            except:
-                pass
-            results['actions'].append("User check: Found")
-        else:
-            # Créer l'utilisateur
-            # Note: create_user actuel retourne bool, on va l'utiliser tel quel, 
-            # mais idéalement il faudrait l'OID. On refait une recherche après.
-            if self.create_user(user_data):
-                results['actions'].append("User creation: Success")
-                # Récupérer l'OID nouvellement créé
-                new_user = self.get_user_by_personal_number(user_data.get('personalNumber', ''))
-                if new_user:
-                     root = ET.fromstring(new_user['data'])
-                     user_node = root.find(".//{http://midpoint.evolveum.com/xml/ns/public/common/common-3}user")
-                     if user_node is not None:
-                        user_oid = user_node.get('oid')
-            else:
-                results['success'] = False
-                results['actions'].append("User creation: Failed")
-                return results
-
-        results['midpoint_oid'] = user_oid
-
-        if not user_oid:
-            results['success'] = False
-            results['actions'].append("Error: Could not retrieve User OID")
-            return results
-
-        # 2. Assignation des rôles
-        modifications_xml = """<objectModification xmlns="http://prism.evolveum.com/xml/ns/public/types-3" 
-                                   xmlns:c="http://midpoint.evolveum.com/xml/ns/public/common/common-3">"""
-        
-        has_assignments = False
+        # 1. Résolution des rôles
+        role_oids = []
         for app_name in assignments:
             # Mapping Simple: On suppose que le Role MidPoint s'appelle comme l'App ou a un préfixe
-            # Pour ce projet, on va standardiser sur le nom de l'app si pas de prefix trouvé
-            # ou essayer de trouver "Role-{app_name}"
-            
             # Stratégie de recherche de rôle
             role_candidates = [f"Role - {app_name}", f"App - {app_name}", app_name]
             role_oid = None
@@ -202,84 +307,164 @@ class MidPointService:
                     break
             
             if role_oid:
-                modifications_xml += f"""
-                <itemDelta>
-                    <t:modificationType>add</t:modificationType>
-                    <t:path>assignment</t:path>
-                    <t:value>
-                        <c:assignment>
-                            <c:targetRef oid="{role_oid}" type="c:RoleType"/>
-                        </c:assignment>
-                    </t:value>
-                </itemDelta>"""
-                has_assignments = True
+                role_oids.append(role_oid)
                 results['actions'].append(f"Prepared assignment: {app_name} (OID: {role_oid})")
             else:
                 # Log mais ne pas bloquer tout
                 logger.warning(f"Rôle pour '{app_name}' introuvable dans MidPoint. Candidats testés: {role_candidates}")
                 results['actions'].append(f"Warning: Role not found for {app_name}")
-
-        modifications_xml += "</objectModification>"
-
-        # 3. Envoyer la modification
-        if has_assignments:
-            try:
-                with self._get_client() as client:
-                    resp = client.post(f"/ws/rest/users/{user_oid}", content=modifications_xml)
-                    if resp.status_code in [200, 204]:
-                         results['actions'].append("Assignments execution: Success")
-                    else:
-                         results['success'] = False
-                         logger.error(f"MidPoint Error: {resp.text}")
-                         results['actions'].append(f"Assignments execution: Failed ({resp.status_code})")
-            except Exception as e:
+        
+        # 2. Création ou mise à jour de l'identité avec ses assignations
+        upsert = self.upsert_user(user_data, role_oids)
+        results['midpoint_oid'] = upsert['oid']
+        
+        if upsert['created']:
+            if not upsert['success']:
+                results['success'] = False
+                results['actions'].append("User creation: Failed")
+                return results
+            results['actions'].append("User creation: Success")
+        else:
+            if not upsert['oid']:
                 results['success'] = False
-                results['actions'].append(f"Assignments exception: {str(e)}")
+                results['actions'].append("Error: Could not retrieve User OID")
+                return results
+            results['actions'].append("User check: Found")
+        
+        if role_oids:
+            if upsert['success']:
+                results['actions'].append("Assignments execution: Success")
+            else:
+                results['success'] = False
+                results['actions'].append("Assignments execution: Failed")
         
         return results
-        # TODO: Implémenter la mise à jour via PATCH
-        return True
     
     def trigger_recompute(self, user_oid: str) -> bool:
         """Déclenche le recompute d'un utilisateur pour appliquer les rôles"""
         try:
-            with self._get_client() as client:
-                response = client.post(f"/ws/rest/users/{user_oid}/recompute")
-                return response.status_code in [200, 202, 204]
+            client = self._get_client()
+            response = client.post(f"/ws/rest/users/{user_oid}/recompute")
+            return response.status_code in [200, 202, 204]
         except Exception as e:
             logger.error(f"Erreur recompute: {e}")
             return False
     
     def trigger_hr_import_task(self) -> bool:
-        """Déclenche la tâche d'import HR CSV"""
-        task_oid = "10000000-0000-0000-5555-000000000001"
+        """Déclenche la tâche d'import HR CSV (sans attendre sa fin)"""
+        from ..core.config import settings
+        if self.run_task(settings.MIDPOINT_HR_IMPORT_TASK_OID):
+            logger.info("Tâche HR Import déclenchée")
+            return True
+        return False
+    
+    def run_task(self, task_oid: str) -> bool:
+        """Lance immédiatement une tâche MidPoint (`/tasks/{oid}/run`)"""
         try:
-            with self._get_client() as client:
-                response = client.post(f"/ws/rest/tasks/{task_oid}/run")
-                if response.status_code in [200, 202]:
-                    logger.info("Tâche HR Import déclenchée")
-                    return True
-                return False
+            client = self._get_client()
+            response = client.post(f"/ws/rest/tasks/{task_oid}/run")
+            if response.status_code in [200, 202, 204]:
+                return True
+            logger.error(f"MidPoint Error: {response.status_code} - {response.text}")
+            return False
         except Exception as e:
             logger.error(f"Erreur déclenchement tâche: {e}")
             return False
     
-    def get_all_users(self) -> List[Dict]:
-        """Récupère tous les utilisateurs depuis MidPoint (via PostgreSQL en fallback)"""
+    def get_task(self, task_oid: str) -> Optional[Dict]:
+        """
+        État d'une tâche MidPoint : exécution, résultat, progression et
+        compteurs d'objets traités (voir `parse_task`)
+        """
         try:
-            # Essayer l'API REST d'abord
-            with self._get_client() as client:
-                response = client.get("/ws/rest/users")
-                if response.status_code == 200:
-                    return self._parse_users_xml(response.text)
+            client = self._get_client()
+            response = client.get(
+                f"/ws/rest/tasks/{task_oid}",
+                params={"include": TASK_STATS_INCLUDE}
+            )
+            if response.status_code == 200:
+                return parse_task(response.text)
+            logger.error(f"Erreur lecture tâche {task_oid}: {response.status_code}")
         except Exception as e:
-            logger.warning(f"API REST MidPoint inaccessible: {e}, fallback vers PostgreSQL")
+            logger.error(f"Erreur lecture tâche {task_oid}: {e}")
+        return None
+    
+    def get_all_users(self) -> List[Dict]:
+        """Récupère tous les utilisateurs depuis MidPoint (via PostgreSQL en fallback)"""
+        return list(self.iter_users())
+    
+    def iter_users(self, page_size: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Itère sur les utilisateurs MidPoint page par page.
+        
+        Chaque page (`offset`/`maxSize`) est lue en streaming et parsée de façon
+        incrémentale : les utilisateurs sont produits au fil de l'eau sans
+        charger la réponse complète en mémoire.
+        
+        API REST inaccessible dès la première page : repli sur PostgreSQL.
+        Une erreur après des utilisateurs déjà produits est relevée (la liste
+        serait tronquée).
+        """
+        page_size = page_size or self.page_size
+        offset = 0
         
-        # Fallback: Charger directement depuis PostgreSQL
-        return self._get_users_from_db()
+        while True:
+            parser = UserStreamParser()
+            try:
+                client = self._get_client()
+                with client.stream(
+                    "POST",
+                    "/ws/rest/users/search",
+                    content=paged_query(offset, page_size)
+                ) as response:
+                    if response.status_code != 200:
+                        raise httpx.HTTPStatusError(
+                            f"HTTP {response.status_code}",
+                            request=response.request,
+                            response=response
+                        )
+                    for chunk in response.iter_bytes():
+                        yield from parser.feed(chunk)
+                parser.close()
+            except Exception as e:
+                if offset == 0 and parser.count == 0:
+                    # Fallback: Charger directement depuis PostgreSQL
+                    logger.warning(f"API REST MidPoint inaccessible: {e}, fallback vers PostgreSQL")
+                    yield from self._iter_users_from_db()
+                    return
+                logger.error(f"Erreur lecture des utilisateurs (offset {offset}): {e}")
+                raise
+            
+            if parser.count < page_size:
+                return
+            offset += page_size
     
     def _get_users_from_db(self) -> List[Dict]:
         """Charge les utilisateurs directement depuis la base PostgreSQL de MidPoint"""
+        return list(self._iter_users_from_db())
+    
+    def _iter_users_from_db(self) -> Iterator[Dict]:
+        """
+        Fallback base de données, selon MIDPOINT_USERS_FALLBACK :
+        connexion poolée en lecture seule ('repository'), ancien accès via
+        `docker exec psql` ('docker') ou aucun ('none').
+        """
+        mode = users_fallback_mode()
+        if mode == "repository":
+            repository = get_midpoint_repository()
+            if repository is None:
+                return
+            try:
+                for row in repository.iter_users():
+                    yield row.to_dict()
+                logger.info("Utilisateurs chargés depuis le dépôt MidPoint")
+            except Exception as e:
+                logger.error(f"Erreur lecture dépôt MidPoint: {e}")
+        elif mode == "docker":
+            yield from self._get_users_from_docker()
+    
+    def _get_users_from_docker(self) -> List[Dict]:
+        """Charge les utilisateurs via `docker exec psql` (déploiement docker-compose local)"""
         import subprocess
         import json
         
@@ -331,43 +516,21 @@ class MidPointService:
             logger.error(f"Erreur chargement PostgreSQL: {e}")
             return []
     
+    def _get_user_from_db(self, oid: str) -> Optional[Dict]:
+        """Charge un utilisateur depuis la base PostgreSQL de MidPoint"""
+        repository = get_midpoint_repository()
+        if repository is not None:
+            try:
+                row = repository.get_user(oid)
+                return row.to_dict() if row else None
+            except Exception as e:
+                logger.error(f"Erreur lecture dépôt MidPoint: {e}")
+                return None
+        return next((u for u in self._iter_users_from_db() if u['oid'] == oid), None)
+    
     def _parse_users_xml(self, xml_text: str) -> List[Dict]:
         """Parse la réponse XML pour extraire les utilisateurs"""
-        users = []
-        try:
-            # Supprimer le namespace pour faciliter le parsing
-            xml_text_clean = xml_text.replace(' xmlns="http://midpoint.evolveum.com/xml/ns/public/common/common-3"', '')
-            root = ET.fromstring(xml_text_clean)
-            
-            for user_elem in root.findall('.//user'):
-                oid = user_elem.get('oid', '')
-                name_elem = user_elem.find('name')
-                email_elem = user_elem.find('emailAddress')
-                given_elem = user_elem.find('givenName')
-                family_elem = user_elem.find('familyName')
-                title_elem = user_elem.find('title')
-                status_elem = user_elem.find('.//administrativeStatus')
-                
-                user = {
-                    'oid': oid,
-                    'name': name_elem.text if name_elem is not None else '',
-                    'email': email_elem.text if email_elem is not None else None,
-                    'givenName': given_elem.text if given_elem is not None else '',
-                    'familyName': family_elem.text if family_elem is not None else '',
-                    'title': title_elem.text if title_elem is not None else None,
-                    'status': status_elem.text if status_elem is not None else 'unknown'
-                }
-                
-                # Skip superuser et administrator
-                if user['name'] not in ['administrator', 'superuser']:
-                    users.append(user)
-                    
-        except ET.ParseError as e:
-            logger.error(f"Erreur parsing XML: {e}")
-        except Exception as e:
-            logger.error(f"Erreur parsing utilisateurs: {e}")
-        
-        return users
+        return parse_users(xml_text)
 
 
 # Singleton
@@ -382,6 +545,20 @@ def get_midpoint_service() -> MidPointService:
         _midpoint_service = MidPointService(
             url=getattr(settings, 'MIDPOINT_URL', 'http://midpoint:8080/midpoint'),
             username=getattr(settings, 'MIDPOINT_USERNAME', 'administrator'),
-            password=getattr(settings, 'MIDPOINT_PASSWORD', 'Test5ecr3t')
+            password=getattr(settings, 'MIDPOINT_PASSWORD', 'Test5ecr3t'),
+            timeout=settings.MIDPOINT_TIMEOUT,
+            http2=settings.MIDPOINT_HTTP2,
+            max_connections=settings.MIDPOINT_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.MIDPOINT_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=settings.MIDPOINT_POOL_KEEPALIVE_EXPIRY,
+            role_index_ttl=settings.MIDPOINT_ROLE_INDEX_TTL,
+            role_index_negative_ttl=settings.MIDPOINT_ROLE_INDEX_NEGATIVE_TTL,
+            page_size=settings.MIDPOINT_PAGE_SIZE
         )
     return _midpoint_service
+
+
+def close_midpoint_service() -> None:
+    """Ferme le pool HTTP du singleton MidPoint (arrêt de l'application)"""
+    if _midpoint_service is not None:
+        _midpoint_service.close()
@@ -0,0 +1,222 @@
+"""
+Suivi des tâches MidPoint - Lancement d'une tâche et attente de sa fin
+
+`/tasks/{oid}/run` rend la main immédiatement : la fin réelle de l'import est
+détectée en scrutant la tâche (horodatage de fin de run, état d'exécution,
+statut du résultat). L'API REST MidPoint n'offre pas de long-poll ; la
+scrutation s'espace donc progressivement (backoff ×1.5, plafonné), sans
+dépasser la moitié du temps restant estimé quand le total attendu est connu.
+
+Une seule exécution suivie à la fois : un second lancement est refusé tant
+que la tâche tourne (côté gateway ou déjà démarrée dans MidPoint). Un suivi
+interrompu par son délai peut être repris (`wait_for_run`) avec les repères
+renvoyés dans le résultat (`previous_finish`, `started_at`).
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+import logging
+
+from .midpoint_service import get_midpoint_service
+
+logger = logging.getLogger(__name__)
+
+# Statuts MidPoint (OperationResultStatusType) considérés comme un succès
+SUCCESS_STATUSES = ("success", "warning", "handled_error", "not_applicable")
+
+# Lectures de la tâche en échec consécutives avant abandon du suivi
+MAX_READ_FAILURES = 5
+
+
+class MidPointTaskTracker:
+    """Lance une tâche MidPoint et attend sa fin en mesurant le débit"""
+
+    def __init__(
+        self,
+        midpoint=None,
+        poll_interval: float = 1.0,
+        poll_interval_max: float = 15.0,
+        timeout: float = 3600.0
+    ):
+        """
+        Args:
+            midpoint: Client MidPointService (singleton par défaut)
+            poll_interval: Premier intervalle de scrutation (secondes)
+            poll_interval_max: Intervalle maximum après backoff
+            timeout: Durée maximale de suivi (la tâche n'est pas interrompue)
+        """
+        self.midpoint = midpoint or get_midpoint_service()
+        self.poll_interval = poll_interval
+        self.poll_interval_max = poll_interval_max
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self.current: Optional[Dict] = None  # Dernier état observé du run suivi
+
+    def is_running(self) -> bool:
+        """Un run est-il en cours de suivi par la gateway ?"""
+        return self._lock.locked()
+
+    def _busy(self) -> Dict:
+        return {
+            "success": False,
+            "running": True,
+            "error": "Une exécution de la tâche est déjà en cours",
+            "task": self.current
+        }
+
+    def run_and_wait(self, task_oid: str, timeout: Optional[float] = None) -> Dict:
+        """
+        Lance la tâche et bloque jusqu'à sa fin (ou `timeout`)
+
+        Returns:
+            Dict: success, running (refus pour chevauchement), timeout,
+            result_status, processed, errors, objects_per_second,
+            duration_seconds, task (+ previous_finish, started_at si timeout)
+        """
+        if not self._lock.acquire(blocking=False):
+            return self._busy()
+        try:
+            return self._run_and_wait(task_oid, timeout or self.timeout)
+        finally:
+            self._lock.release()
+
+    def wait_for_run(
+        self,
+        task_oid: str,
+        previous_finish: Optional[str],
+        started_at: str,
+        timeout: Optional[float] = None
+    ) -> Dict:
+        """
+        Reprend le suivi d'un run déjà lancé (après un `timeout`)
+
+        Args:
+            previous_finish: Horodatage de fin du run précédent le lancement
+            started_at: Lancement du run suivi (ISO), base de la durée
+        """
+        if not self._lock.acquire(blocking=False):
+            return self._busy()
+        try:
+            self.current = None
+            return self._wait(task_oid, previous_finish, datetime.fromisoformat(started_at),
+                              timeout or self.timeout)
+        finally:
+            self._lock.release()
+
+    def _run_and_wait(self, task_oid: str, timeout: float) -> Dict:
+        before = self.midpoint.get_task(task_oid)
+        if before is None:
+            return {"success": False, "error": f"Tâche MidPoint {task_oid} illisible"}
+        if before["execution_state"] == "running":
+            return {
+                "success": False,
+                "running": True,
+                "error": "La tâche est déjà en cours d'exécution dans MidPoint",
+                "task": before
+            }
+
+        started_at = datetime.now()
+        if not self.midpoint.run_task(task_oid):
+            return {"success": False, "error": "Échec déclenchement de la tâche"}
+        logger.info(f"⏳ Tâche {before.get('name') or task_oid} lancée, attente de fin")
+
+        self.current = {**before, "started_at": started_at.isoformat()}
+        return self._wait(task_oid, before["last_run_finish"], started_at, timeout)
+
+    def _wait(self, task_oid: str, previous_finish: Optional[str], started_at: datetime, timeout: float) -> Dict:
+        """Scrute la tâche jusqu'à la fin du run lancé à `started_at`"""
+        start = time.monotonic()
+        interval = self.poll_interval
+        read_failures = 0
+        marks = {"previous_finish": previous_finish, "started_at": started_at.isoformat()}
+
+        while True:
+            time.sleep(interval)
+            elapsed = time.monotonic() - start
+            task = self.midpoint.get_task(task_oid)
+
+            if task is None:
+                read_failures += 1
+                if read_failures >= MAX_READ_FAILURES:
+                    if self.current is None:
+                        return {"success": False, "error": "Tâche MidPoint illisible"}
+                    return self._result(self.current, started_at, error="Tâche MidPoint illisible")
+            else:
+                read_failures = 0
+                self.current = {**task, "started_at": started_at.isoformat()}
+                if self._finished(previous_finish, task):
+                    break
+
+            if elapsed >= timeout and self.current is not None:
+                logger.warning(f"Tâche {task_oid} toujours en cours après {elapsed:.0f}s d'attente")
+                return {**self._result(self.current, started_at, timeout=True), **marks}
+
+            interval = self._next_interval(interval, self.current or {}, elapsed)
+
+        result = self._result(task, started_at)
+        logger.info(f"{'✅' if result['success'] else '❌'} Tâche {task.get('name') or task_oid} terminée "
+                    f"({task['result_status']}): {result['processed']} objets, {result['errors']} erreurs "
+                    f"en {result['duration_seconds']}s ({result['objects_per_second']} obj/s)")
+        return result
+
+    @staticmethod
+    def _finished(previous_finish: Optional[str], task: Dict) -> bool:
+        """Le run lancé est terminé : nouvel horodatage de fin et tâche arrêtée"""
+        return (
+            task["execution_state"] != "running"
+            and task["last_run_finish"] is not None
+            and task["last_run_finish"] != previous_finish
+            and task["result_status"] != "in_progress"
+        )
+
+    def _next_interval(self, interval: float, task: Dict, elapsed: float) -> float:
+        """Backoff ×1.5, ramené à la moitié du temps restant estimé"""
+        interval = min(interval * 1.5, self.poll_interval_max)
+        expected, progress = task.get("expected_total"), task.get("progress", 0)
+        if expected and progress and elapsed > 0 and expected > progress:
+            remaining = (expected - progress) / (progress / elapsed)
+            interval = min(interval, remaining / 2)
+        return max(interval, self.poll_interval)
+
+    @staticmethod
+    def _result(
+        task: Dict,
+        started_at: datetime,
+        timeout: bool = False,
+        error: Optional[str] = None
+    ) -> Dict:
+        duration = (datetime.now() - started_at).total_seconds()
+        counted = task["success_count"] + task["failure_count"]
+        processed = counted or task["progress"]
+        finished = not timeout and error is None
+        result = {
+            "success": finished and task["result_status"] in SUCCESS_STATUSES and task["failure_count"] == 0,
+            "timeout": timeout,
+            "result_status": task["result_status"],
+            "processed": processed,
+            "errors": task["failure_count"],
+            "objects_per_second": round(processed / duration, 2) if duration > 0 else None,
+            "duration_seconds": round(duration, 3),
+            "task": task
+        }
+        if error:
+            result["error"] = error
+        return result
+
+
+# Singleton
+_task_tracker: Optional[MidPointTaskTracker] = None
+
+
+def get_midpoint_task_tracker() -> MidPointTaskTracker:
+    """Retourne l'instance singleton du suivi des tâches MidPoint"""
+    global _task_tracker
+    if _task_tracker is None:
+        from ..core.config import settings
+        _task_tracker = MidPointTaskTracker(
+            poll_interval=settings.MIDPOINT_TASK_POLL_INTERVAL,
+            poll_interval_max=settings.MIDPOINT_TASK_POLL_INTERVAL_MAX,
+            timeout=settings.MIDPOINT_TASK_TIMEOUT
+        )
+    return _task_tracker
@@ -0,0 +1,483 @@
+"""
+Helpers XML MidPoint - Requêtes et parsing partagés par les clients sync et async
+"""
+from typing import Dict, List, Optional
+from xml.sax.saxutils import escape, quoteattr
+import logging
+import xml.etree.ElementTree as ET
+
+logger = logging.getLogger(__name__)
+
+# Namespace MidPoint
+NS = {
+    'c': 'http://midpoint.evolveum.com/xml/ns/public/common/common-3',
+    't': 'http://prism.evolveum.com/xml/ns/public/types-3',
+    'q': 'http://prism.evolveum.com/xml/ns/public/query-3'
+}
+
+# Comptes techniques jamais exposés dans les listes d'utilisateurs
+SYSTEM_USERS = ('administrator', 'superuser')
+
+# Options de la recherche du comptage des membres : seules les assignations
+# (assignment/targetRef) sont lues, les éléments volumineux sont exclus
+ROLE_MEMBER_SEARCH_PARAMS = {
+    "include": "assignment",
+    "exclude": [
+        "jpegPhoto", "credentials", "extension", "linkRef",
+        "roleMembershipRef", "operationExecution", "trigger",
+    ],
+}
+
+
+# ========== Construction des requêtes ==========
+
+def equal_query(path: str, value: str) -> str:
+    """Requête de recherche `<q:equal>` sur un chemin simple"""
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+        <q:query xmlns:q="http://prism.evolveum.com/xml/ns/public/query-3">
+            <q:filter>
+                <q:equal>
+                    <q:path>{path}</q:path>
+                    <q:value>{escape(str(value))}</q:value>
+                </q:equal>
+            </q:filter>
+        </q:query>"""
+
+
+def role_members_query(role_oid: str) -> str:
+    """Requête des utilisateurs ayant une assignation vers un rôle"""
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+        <q:query xmlns:q="http://prism.evolveum.com/xml/ns/public/query-3"
+                 xmlns:c="http://midpoint.evolveum.com/xml/ns/public/common/common-3">
+            <q:filter>
+                <q:ref>
+                    <q:path>assignment/targetRef</q:path>
+                    <q:value oid={quoteattr(role_oid)} type="c:RoleType"/>
+                </q:ref>
+            </q:filter>
+        </q:query>"""
+
+
+def user_xml(user_data: Dict, role_oids: Optional[List[str]] = None) -> str:
+    """Objet `<user>` MidPoint à partir des données RH normalisées (assignations incluses)"""
+    email = user_data.get('email', '') or ''
+    status = 'enabled' if user_data.get('status') == 'Active' else 'disabled'
+    assignments = "".join(f"""
+            <assignment>
+                <targetRef oid={quoteattr(oid)} type="RoleType"/>
+            </assignment>""" for oid in role_oids or [])
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+        <user xmlns="http://midpoint.evolveum.com/xml/ns/public/common/common-3">
+            <name>{escape(email.split('@')[0])}</name>
+            <givenName>{escape(str(user_data.get('givenName', '')))}</givenName>
+            <familyName>{escape(str(user_data.get('familyName', '')))}</familyName>
+            <emailAddress>{escape(email)}</emailAddress>
+            <personalNumber>{escape(str(user_data.get('personalNumber', '')))}</personalNumber>
+            <title>{escape(str(user_data.get('title', '')))}</title>
+            <organization>{escape(str(user_data.get('department', '')))}</organization>
+            <activation>
+                <administrativeStatus>{status}</administrativeStatus>
+            </activation>{assignments}
+        </user>"""
+
+
+def assignments_modification_xml(role_oids: List[str], modification_type: str = "add") -> str:
+    """Delta `objectModification` ajoutant/retirant des assignations de rôles"""
+    deltas = "".join(f"""
+            <itemDelta>
+                <t:modificationType>{modification_type}</t:modificationType>
+                <t:path>c:assignment</t:path>
+                <t:value>
+                    <c:targetRef oid={quoteattr(oid)} type="c:RoleType"/>
+                </t:value>
+            </itemDelta>""" for oid in role_oids)
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+        <objectModification xmlns="http://midpoint.evolveum.com/xml/ns/public/common/api-types-3"
+                           xmlns:c="http://midpoint.evolveum.com/xml/ns/public/common/common-3"
+                           xmlns:t="http://prism.evolveum.com/xml/ns/public/types-3">{deltas}
+        </objectModification>"""
+
+
+# Attributs RH poussés sur un utilisateur existant : (clé RH, chemin MidPoint)
+USER_ATTRIBUTE_PATHS = [
+    ('givenName', 'c:givenName'),
+    ('familyName', 'c:familyName'),
+    ('email', 'c:emailAddress'),
+    ('title', 'c:title'),
+    ('department', 'c:organization'),
+]
+
+
+def user_modification_xml(user_data: Dict, role_oids: Optional[List[str]] = None) -> str:
+    """Delta `objectModification` remplaçant les attributs RH (et ajoutant des assignations)"""
+    status = 'enabled' if user_data.get('status') == 'Active' else 'disabled'
+    values = [(path, escape(str(user_data.get(key) or ''))) for key, path in USER_ATTRIBUTE_PATHS]
+    values.append(('c:activation/c:administrativeStatus', status))
+    deltas = "".join(f"""
+            <itemDelta>
+                <t:modificationType>replace</t:modificationType>
+                <t:path>{path}</t:path>
+                <t:value>{value}</t:value>
+            </itemDelta>""" for path, value in values)
+    deltas += "".join(f"""
+            <itemDelta>
+                <t:modificationType>add</t:modificationType>
+                <t:path>c:assignment</t:path>
+                <t:value>
+                    <c:targetRef oid={quoteattr(oid)} type="c:RoleType"/>
+                </t:value>
+            </itemDelta>""" for oid in role_oids or [])
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+        <objectModification xmlns="http://midpoint.evolveum.com/xml/ns/public/common/api-types-3"
+                           xmlns:c="http://midpoint.evolveum.com/xml/ns/public/common/common-3"
+                           xmlns:t="http://prism.evolveum.com/xml/ns/public/types-3">{deltas}
+        </objectModification>"""
+
+
+# ========== Parsing des réponses ==========
+
+def first_oid(xml_text: str, tag: str) -> Optional[str]:
+    """OID du premier objet `<c:{tag}>` (ou de la racine) d'une réponse"""
+    try:
+        root = ET.fromstring(xml_text)
+    except ET.ParseError as e:
+        logger.error(f"Erreur parsing XML: {e}")
+        return None
+    if root.tag == f"{{{NS['c']}}}{tag}":
+        return root.get('oid')
+    node = root.find(f".//c:{tag}", NS)
+    return node.get('oid') if node is not None else None
+
+
+def parse_users(xml_text: str) -> List[Dict]:
+    """Parse une liste d'utilisateurs MidPoint (hors comptes système)"""
+    users = []
+    try:
+        # Supprimer le namespace pour faciliter le parsing
+        xml_text_clean = xml_text.replace(f' xmlns="{NS["c"]}"', '')
+        root = ET.fromstring(xml_text_clean)
+
+        user_elems = [root] if root.tag == 'user' else root.findall('.//user')
+        for user_elem in user_elems:
+            user = parse_user(user_elem)
+            if user['name'] not in SYSTEM_USERS:
+                users.append(user)
+
+    except ET.ParseError as e:
+        logger.error(f"Erreur parsing XML: {e}")
+    except Exception as e:
+        logger.error(f"Erreur parsing utilisateurs: {e}")
+
+    return users
+
+
+def parse_user(user_elem: ET.Element) -> Dict:
+    """Parse un élément `<user>` sans namespace"""
+    def text(tag: str) -> Optional[str]:
+        found = user_elem.find(tag)
+        return found.text if found is not None else None
+
+    return {
+        'oid': user_elem.get('oid', ''),
+        'name': text('name') or '',
+        'email': text('emailAddress'),
+        'givenName': text('givenName') or '',
+        'familyName': text('familyName') or '',
+        'title': text('title'),
+        'status': text('.//administrativeStatus') or 'unknown'
+    }
+
+
+def parse_roles(xml_text: str) -> List[Dict]:
+    """Parse la réponse XML MidPoint pour extraire les rôles"""
+    roles = []
+    try:
+        root = ET.fromstring(xml_text)
+
+        # Chercher tous les éléments role
+        for role_elem in root.findall('.//c:role', NS) or root.findall('.//role', NS):
+            role = parse_role(role_elem)
+            if role:
+                roles.append(role)
+
+        # Si pas trouvé avec namespace, essayer sans
+        if not roles:
+            for role_elem in root.iter():
+                if role_elem.tag.endswith('role'):
+                    role = parse_role(role_elem)
+                    if role:
+                        roles.append(role)
+
+    except ET.ParseError as e:
+        logger.error(f"Erreur parsing XML: {e}")
+
+    return roles
+
+
+def parse_role(role_elem: ET.Element) -> Optional[Dict]:
+    """Parse un élément role XML"""
+    try:
+        # Extraire OID
+        oid = role_elem.get('oid', '')
+
+        # Helper pour trouver un élément avec ou sans namespace
+        def find_text(elem, tag):
+            for ns_prefix in ['c:', '']:
+                found = elem.find(f'.//{ns_prefix}{tag}', NS if ns_prefix else {})
+                if found is not None and found.text:
+                    return found.text
+            # Chercher sans namespace
+            for child in elem.iter():
+                if child.tag.endswith(tag) and child.text:
+                    return child.text
+            return None
+
+        name = find_text(role_elem, 'name') or 'Unknown'
+
+        # Skip les rôles système
+        if name.startswith('Superuser') or name.startswith('End user'):
+            return None
+
+        return {
+            'id': oid,
+            'oid': oid,
+            'name': name,
+            'displayName': find_text(role_elem, 'displayName') or name,
+            'description': find_text(role_elem, 'description') or '',
+            'riskLevel': find_text(role_elem, 'riskLevel') or 'low',
+            'requestable': find_text(role_elem, 'requestable') == 'true',
+            'source': 'midpoint'
+        }
+    except Exception as e:
+        logger.error(f"Erreur parsing role: {e}")
+        return None
+
+
+def parse_members(xml_text: str) -> List[Dict]:
+    """Parse une liste d'utilisateurs en format compact (oid, name, email)"""
+    users = []
+    try:
+        root = ET.fromstring(xml_text)
+
+        for user_elem in root.iter():
+            if user_elem.tag.endswith('user'):
+                oid = user_elem.get('oid', '')
+                name = None
+                email = None
+
+                for child in user_elem.iter():
+                    if child.tag.endswith('name') and child.text:
+                        name = child.text
+                    if child.tag.endswith('emailAddress') and child.text:
+                        email = child.text
+
+                if name:
+                    users.append({
+                        'oid': oid,
+                        'name': name,
+                        'email': email or ''
+                    })
+
+    except ET.ParseError:
+        pass
+
+    return users
+
+
+def _local_name(tag: str) -> str:
+    """Nom d'un élément sans son namespace"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _assigned_role_oids(user_elem: ET.Element) -> set:
+    """OID des rôles assignés directement (`assignment/targetRef` de type RoleType)"""
+    role_oids = set()
+    for assignment in user_elem:
+        if _local_name(assignment.tag) != 'assignment':
+            continue
+        for target in assignment:
+            if (_local_name(target.tag) == 'targetRef'
+                    and (target.get('type') or '').endswith('RoleType')
+                    and target.get('oid')):
+                role_oids.add(target.get('oid'))
+    return role_oids
+
+
+def _int(text: Optional[str]) -> int:
+    try:
+        return int(text or 0)
+    except ValueError:
+        return 0
+
+
+def parse_task(xml_text: str) -> Optional[Dict]:
+    """
+    État d'une tâche MidPoint (`GET /ws/rest/tasks/{oid}`).
+
+    Compatible 4.0-4.3 (`executionStatus`, `operationStats/iterativeTaskInformation`)
+    et 4.4+ (`executionState`, `activityState/.../itemProcessingStatistics`).
+    """
+    try:
+        root = ET.fromstring(xml_text)
+    except ET.ParseError as e:
+        logger.error(f"Erreur parsing XML: {e}")
+        return None
+
+    task = {
+        "oid": root.get('oid'),
+        "name": None,
+        "execution_state": None,
+        "result_status": None,
+        "progress": 0,
+        "expected_total": None,
+        "last_run_start": None,
+        "last_run_finish": None,
+        "success_count": 0,
+        "failure_count": 0,
+    }
+    fields = {
+        'executionState': "execution_state",
+        'executionStatus': "execution_state",
+        'resultStatus': "result_status",
+        'lastRunStartTimestamp': "last_run_start",
+        'lastRunFinishTimestamp': "last_run_finish",
+    }
+
+    # Champs de premier niveau uniquement (les sous-activités ont les leurs)
+    for child in root:
+        name = _local_name(child.tag)
+        if name == 'name':
+            task["name"] = (child.text or '').strip() or None
+        elif name in fields and task[fields[name]] is None:
+            task[fields[name]] = (child.text or '').strip() or None
+        elif name == 'progress':
+            task["progress"] = _int(child.text)
+        elif name == 'expectedTotal':
+            task["expected_total"] = _int(child.text)
+
+    for elem in root.iter():
+        name = _local_name(elem.tag)
+        if name == 'totalSuccessCount':
+            task["success_count"] += _int(elem.text)
+        elif name == 'totalFailureCount':
+            task["failure_count"] += _int(elem.text)
+        elif name == 'processed':
+            outcome = next(
+                (e.text for e in elem.iter() if _local_name(e.tag) == 'outcome' and e.text and e.text.strip()),
+                None
+            )
+            count = next((_int(e.text) for e in elem if _local_name(e.tag) == 'count'), 0)
+            if outcome == 'success':
+                task["success_count"] += count
+            elif outcome == 'failure':
+                task["failure_count"] += count
+
+    return task
+
+
+def paged_query(offset: int, max_size: int, order_by: str = "name") -> str:
+    """Requête sans filtre avec pagination MidPoint (offset/maxSize)"""
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+        <q:query xmlns:q="http://prism.evolveum.com/xml/ns/public/query-3">
+            <q:paging>
+                <q:orderBy>{order_by}</q:orderBy>
+                <q:offset>{int(offset)}</q:offset>
+                <q:maxSize>{int(max_size)}</q:maxSize>
+            </q:paging>
+        </q:query>"""
+
+
+def _is_user_element(elem: ET.Element) -> bool:
+    """`<user>` ou `<object xsi:type="c:UserType">` selon le format de liste"""
+    name = _local_name(elem.tag)
+    if name == 'user':
+        return True
+    xsi_type = elem.get('{http://www.w3.org/2001/XMLSchema-instance}type') or ''
+    return name == 'object' and xsi_type.endswith('UserType')
+
+
+def user_record(user_elem: ET.Element) -> Dict:
+    """Enregistrement compact d'un utilisateur (namespaces ignorés)"""
+    values: Dict[str, Optional[str]] = {}
+    for child in user_elem:
+        tag = _local_name(child.tag)
+        if tag == 'activation':
+            for item in child:
+                if _local_name(item.tag) == 'administrativeStatus':
+                    values['administrativeStatus'] = item.text
+        else:
+            values[tag] = child.text
+
+    return {
+        'oid': user_elem.get('oid', ''),
+        'name': values.get('name') or '',
+        'email': values.get('emailAddress'),
+        'givenName': values.get('givenName') or '',
+        'familyName': values.get('familyName') or '',
+        'title': values.get('title'),
+        'status': values.get('administrativeStatus') or 'unknown'
+    }
+
+
+class UserStreamParser:
+    """
+    Parser XML incrémental d'une liste d'utilisateurs MidPoint.
+
+    Les octets sont fournis au fil de l'eau (`feed`) et chaque utilisateur
+    complet est restitué puis libéré : la mémoire reste constante quelle que
+    soit la taille de la réponse.
+    """
+
+    def __init__(self):
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._root: Optional[ET.Element] = None
+        self._depth = 0
+        self.count = 0  # Utilisateurs lus, comptes système inclus
+
+    def feed(self, data: bytes) -> List[Dict]:
+        """Ajoute un fragment et retourne les utilisateurs complétés"""
+        self._parser.feed(data)
+        users = []
+        for event, elem in self._parser.read_events():
+            if event == "start":
+                if self._root is None:
+                    self._root = elem
+                self._depth += 1
+                continue
+
+            self._depth -= 1
+            # Objets de premier niveau (ou la racine pour un GET unitaire)
+            if self._depth <= 1 and _is_user_element(elem):
+                self.count += 1
+                user = self._record(elem)
+                if user is not None:
+                    users.append(user)
+                elem.clear()
+                if self._root is not None and elem is not self._root:
+                    self._root.clear()
+        return users
+
+    def _record(self, user_elem: ET.Element) -> Optional[Dict]:
+        """Utilisateur restitué pour un élément complet (None : ignoré)"""
+        user = user_record(user_elem)
+        return user if user['name'] not in SYSTEM_USERS else None
+
+    def close(self) -> None:
+        self._parser.close()
+
+
+class RoleMemberCounter(UserStreamParser):
+    """
+    Compte les membres de chaque rôle au fil d'une liste d'utilisateurs lue
+    par fragments. `counts` peut être partagé entre les pages d'une même
+    recherche.
+    """
+
+    def __init__(self, counts: Optional[Dict[str, int]] = None):
+        super().__init__()
+        self.counts = counts if counts is not None else {}
+
+    def _record(self, user_elem: ET.Element) -> Optional[Dict]:
+        for oid in _assigned_role_oids(user_elem):
+            self.counts[oid] = self.counts.get(oid, 0) + 1
+        return None
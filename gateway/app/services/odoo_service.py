@@ -1,8 +1,18 @@
 """
 Service Odoo - Récupération des employés via XML-RPC API
+
+Mode incrémental : seuls les employés dont `write_date` est postérieur au
+watermark mémorisé sont relus (archivés compris) ; une relecture complète
+périodique rattrape les suppressions.
+
+L'uid est authentifié une seule fois puis mis en cache (ré-authentification
+sur AccessDenied). Les appels passent par un transport poolé et thread-safe,
+XML-RPC ou JSON-RPC selon ODOO_TRANSPORT (voir odoo_transport).
 """
-import xmlrpc.client
-from typing import List, Dict, Optional
+import threading
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import List, Dict, Iterator, Optional
 import logging
 import os
 
@@ -10,8 +20,26 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 
+from .odoo_transport import OdooAccessDenied, create_transport
+from .employee_fingerprint import employee_fingerprint, load_csv_index
+from .csv_export import csv_write_lock, write_employees_csv
+
 logger = logging.getLogger(__name__)
 
+EMPLOYEE_FIELDS = [
+    'id', 'name', 'work_email', 'job_title',
+    'department_id', 'parent_id', 'active', 'write_date'
+]
+
+
+@dataclass
+class EmployeeChanges:
+    """Employés relus depuis Odoo pour un consommateur donné"""
+    state_name: str
+    mode: str  # "full" (employés actifs) | "delta" (modifiés, archivés compris)
+    employees: List[Dict]
+    watermark: Optional[str]
+
 
 class OdooService:
     """Service pour interagir avec l'API Odoo"""
@@ -21,80 +49,156 @@ class OdooService:
         url: str = None,
         db: str = None,
         username: str = None,
-        password: str = None
+        password: str = None,
+        incremental: bool = True,
+        full_reconcile_interval: float = 86400.0,
+        page_size: int = 500,
+        pool_size: int = 4,
+        transport: str = "xmlrpc",
+        csv_delta_path: Optional[str] = None,
+        ping_timeout: float = 5.0
     ):
         # Utiliser les variables d'environnement ou les valeurs par défaut
         self.url = url or os.getenv("ODOO_URL", "http://localhost:8069")
         self.db = db or os.getenv("ODOO_DB", "odoo")
         self.username = username or os.getenv("ODOO_USERNAME", "admin")
         self.password = password or os.getenv("ODOO_PASSWORD", "admin")
+        self.incremental = incremental
+        self.full_reconcile_interval = full_reconcile_interval
+        self.page_size = page_size
+        self.csv_delta_path = csv_delta_path
+        self.ping_timeout = ping_timeout
         self.uid: Optional[int] = None
-        self.common = None
-        self.models = None
+        self.transport = create_transport(transport, self.url, pool_size=pool_size)
+        self._auth_lock = threading.Lock()
     
-    def connect(self) -> bool:
-        """Établit la connexion à Odoo"""
-        try:
-            self.common = xmlrpc.client.ServerProxy(f"{self.url}/xmlrpc/2/common")
-            self.uid = self.common.authenticate(self.db, self.username, self.password, {})
-            
-            if not self.uid:
-                logger.error("Échec d'authentification Odoo")
+    def connect(self, force: bool = False) -> bool:
+        """
+        Établit la connexion à Odoo
+        
+        L'uid est mis en cache : les appels suivants ne coûtent rien tant
+        que `force` n'est pas demandé (ou qu'un AccessDenied n'a pas invalidé l'uid).
+        """
+        if self.uid and not force:
+            return True
+        
+        with self._auth_lock:
+            if self.uid and not force:
+                return True
+            try:
+                uid = self.transport.authenticate(self.db, self.username, self.password)
+                
+                if not uid:
+                    logger.error("Échec d'authentification Odoo")
+                    self.uid = None
+                    return False
+                
+                self.uid = uid
+                logger.info(f"Connecté à Odoo (uid={self.uid})")
+                return True
+            except Exception as e:
+                logger.error(f"Erreur connexion Odoo: {e}")
                 return False
-            
-            self.models = xmlrpc.client.ServerProxy(f"{self.url}/xmlrpc/2/object")
-            logger.info(f"Connecté à Odoo (uid={self.uid})")
+    
+    def ping(self) -> bool:
+        """
+        Vérifie qu'Odoo répond (`common.version()`, délai `ping_timeout`)
+        
+        Contrairement à `connect()`, ne s'appuie pas sur l'uid en cache :
+        à utiliser pour les health checks et les statuts.
+        """
+        try:
+            self.transport.version(self.ping_timeout)
             return True
         except Exception as e:
-            logger.error(f"Erreur connexion Odoo: {e}")
+            logger.warning(f"Odoo injoignable: {e}")
             return False
     
+    def execute_kw(self, model: str, method: str, args: List, kwargs: Optional[Dict] = None):
+        """
+        Appelle `model.method` via le transport (lève en cas d'erreur)
+        
+        Un AccessDenied (session invalidée, mot de passe changé) déclenche
+        une ré-authentification puis un seul nouvel essai.
+        """
+        for attempt in range(2):
+            if not self.connect(force=attempt > 0):
+                raise ConnectionError("Connexion Odoo échouée")
+            try:
+                return self.transport.execute_kw(
+                    self.db, self.uid, self.password,
+                    model, method, args, kwargs or {}
+                )
+            except OdooAccessDenied:
+                if attempt:
+                    raise
+                logger.warning("Accès refusé par Odoo, ré-authentification")
+                self.uid = None
+    
+    def close(self) -> None:
+        """Ferme les connexions du transport (arrêt de l'application)"""
+        self.transport.close()
+    
+    @staticmethod
+    def _transform_employee(emp: Dict) -> Dict:
+        """Transforme un hr.employee Odoo au format attendu"""
+        # Séparer prénom/nom
+        name_parts = emp.get('name', '').split(' ', 1)
+        first_name = name_parts[0] if name_parts else ''
+        last_name = name_parts[1] if len(name_parts) > 1 else ''
+        
+        # Département
+        dept = emp.get('department_id')
+        dept_name = dept[1] if dept else 'Unknown'
+        
+        return {
+            'personalNumber': 1000 + emp['id'],
+            'givenName': first_name,
+            'familyName': last_name,
+            'email': emp.get('work_email') or f"{first_name.lower()}.{last_name.lower()}@example.com",
+            'department': dept_name,
+            'title': emp.get('job_title') or 'Employee',
+            'status': 'Active' if emp.get('active') else 'Inactive'
+        }
+    
+    def _iter_raw_employees(self, domain: List, context: Optional[Dict] = None) -> Iterator[Dict]:
+        """
+        Lit les hr.employee du domaine page par page (lève en cas d'erreur)
+        
+        Un seul appel `search_read` par page, trié par id. La page suivante
+        reprend après le dernier id lu plutôt que par offset : un employé
+        archivé pendant la lecture ne décale pas les pages suivantes.
+        """
+        kwargs = {'fields': EMPLOYEE_FIELDS, 'limit': self.page_size, 'order': 'id'}
+        if context:
+            kwargs['context'] = context
+        
+        last_id = 0
+        while True:
+            page = self.execute_kw(
+                'hr.employee', 'search_read',
+                [domain + [['id', '>', last_id]]],
+                kwargs
+            )
+            yield from page
+            if len(page) < self.page_size:
+                return
+            last_id = page[-1]['id']
+    
+    def iter_employees(self) -> Iterator[Dict]:
+        """
+        Itère sur les employés actifs d'Odoo, transformés au format attendu
+        
+        Les employés sont lus par pages de `page_size` : la mémoire reste
+        bornée quelle que soit la taille de la base RH. Lève en cas d'erreur.
+        """
+        for emp in self._iter_raw_employees([['active', '=', True]]):
+            yield self._transform_employee(emp)
+    
     def get_employees(self) -> List[Dict]:
         """Récupère tous les employés actifs depuis Odoo"""
-        if not self.models:
-            if not self.connect():
-                return []
-        
         try:
-            # Recherche des employés
-            employee_ids = self.models.execute_kw(
-                self.db, self.uid, self.password,
-                'hr.employee', 'search',
-                [[['active', '=', True]]]
-            )
-            
-            # Lecture des données
-            employees = self.models.execute_kw(
-                self.db, self.uid, self.password,
-                'hr.employee', 'read',
-                [employee_ids],
-                {'fields': [
-                    'id', 'name', 'work_email', 'job_title',
-                    'department_id', 'parent_id', 'active'
-                ]}
-            )
-            
-            # Transformation au format attendu
-            result = []
-            for emp in employees:
-                # Séparer prénom/nom
-                name_parts = emp.get('name', '').split(' ', 1)
-                first_name = name_parts[0] if name_parts else ''
-                last_name = name_parts[1] if len(name_parts) > 1 else ''
-                
-                # Département
-                dept = emp.get('department_id')
-                dept_name = dept[1] if dept else 'Unknown'
-                
-                result.append({
-                    'personalNumber': 1000 + emp['id'],
-                    'givenName': first_name,
-                    'familyName': last_name,
-                    'email': emp.get('work_email') or f"{first_name.lower()}.{last_name.lower()}@example.com",
-                    'department': dept_name,
-                    'title': emp.get('job_title') or 'Employee',
-                    'status': 'Active' if emp.get('active') else 'Inactive'
-                })
+            result = list(self.iter_employees())
             
             logger.info(f"Récupéré {len(result)} employés depuis Odoo")
             return result
@@ -102,43 +206,215 @@ class OdooService:
         except Exception as e:
             logger.error(f"Erreur récupération employés: {e}")
             return []
+    
+    def get_employees_by_ids(self, employee_ids: List[int]) -> List[Dict]:
+        """
+        Lit un lot d'employés par ID en un seul `search_read` (archivés compris)
+        
+        Les IDs inexistants (employé supprimé) sont simplement absents du
+        résultat. Lève en cas d'erreur.
+        """
+        if not employee_ids:
+            return []
+        return [
+            self._transform_employee(emp)
+            for emp in self._iter_raw_employees(
+                [['id', 'in', list(employee_ids)]],
+                context={'active_test': False}
+            )
+        ]
+    
+    def _needs_full_reconcile(self, state: Optional[Dict]) -> bool:
+        """Relecture complète si pas de watermark ou dernière relecture trop ancienne"""
+        if not self.incremental or not state or not state.get("watermark"):
+            return True
+        last_full = state.get("last_full_sync_at")
+        if last_full is None:
+            return True
+        return (datetime.utcnow() - last_full).total_seconds() >= self.full_reconcile_interval
+    
+    def get_employee_changes(self, state_name: str, force_full: bool = False) -> Optional[EmployeeChanges]:
+        """
+        Récupère les employés modifiés depuis le watermark du consommateur `state_name`.
+        
+        En mode "delta", les employés archivés sont inclus (status 'Inactive')
+        pour que le consommateur puisse les retirer. Le watermark n'est
+        enregistré qu'après traitement, via `commit_changes`.
+        
+        Returns:
+            EmployeeChanges, ou None en cas d'erreur Odoo
+        """
+        from .sync_state import get_sync_state
+        
+        if not self.connect():
+            return None
+        
+        state = get_sync_state(state_name)
+        full = force_full or self._needs_full_reconcile(state)
+        
+        watermark = (state or {}).get("watermark")
+        employees = []
+        try:
+            if full:
+                raw_employees = self._iter_raw_employees([['active', '=', True]])
+            else:
+                # `>=` : les enregistrements écrits dans la même seconde que le
+                # watermark sont relus (traitement idempotent)
+                raw_employees = self._iter_raw_employees(
+                    [['write_date', '>=', state["watermark"]]],
+                    context={'active_test': False}
+                )
+            for emp in raw_employees:
+                if emp.get('write_date') and (watermark is None or emp['write_date'] > watermark):
+                    watermark = emp['write_date']
+                employees.append(self._transform_employee(emp))
+        except Exception as e:
+            logger.error(f"Erreur récupération employés: {e}")
+            return None
+        
+        mode = "full" if full else "delta"
+        logger.info(f"Récupéré {len(employees)} employés depuis Odoo ({mode}, {state_name})")
+        return EmployeeChanges(
+            state_name=state_name,
+            mode=mode,
+            employees=employees,
+            watermark=watermark
+        )
+    
+    def commit_changes(self, changes: EmployeeChanges) -> None:
+        """Enregistre le watermark une fois les changements traités"""
+        from .sync_state import save_sync_state
+        save_sync_state(changes.state_name, changes.watermark, full=changes.mode == "full")
 
-    def update_csv(self, file_path: str = "/data/hr/hr_clean.csv") -> Dict:
-        """Met à jour le fichier CSV avec les données d'Odoo"""
-        employees = self.get_employees()
-        if not employees:
+    def update_csv(
+        self,
+        file_path: str = "/data/hr/hr_clean.csv",
+        force_full: bool = False,
+        full_read: Optional[EmployeeChanges] = None
+    ) -> Dict:
+        """
+        Met à jour le fichier CSV avec les données d'Odoo
+        
+        En mode incrémental, seuls les employés modifiés depuis la dernière
+        mise à jour sont relus et fusionnés dans le fichier existant.
+        L'index d'empreintes (`<fichier>.index.json`) permet d'ignorer les
+        employés inchangés ; l'écriture elle-même (atomique, triée, ignorée
+        si le contenu est identique) est confiée à csv_export.
+        
+        Sous `csv_write_lock` : le watermark, le fichier et l'index sont lus
+        et remplacés sans écrivain concurrent (webhooks, autres exports).
+        
+        `full_read` : relecture complète déjà faite pour un autre consommateur
+        (push MidPoint), réutilisée au lieu de relire Odoo.
+        """
+        try:
+            with csv_write_lock(file_path):
+                return self._update_csv(file_path, force_full, full_read)
+        except OSError as e:
+            logger.error(f"Erreur verrou CSV: {e}")
+            return {"success": False, "message": str(e)}
+    
+    def _update_csv(self, file_path: str, force_full: bool, full_read: Optional[EmployeeChanges] = None) -> Dict:
+        from pathlib import Path
+        
+        state_name = f"odoo.csv:{file_path}"
+        if full_read is not None:
+            changes = replace(full_read, state_name=state_name)
+        else:
+            changes = self.get_employee_changes(
+                state_name,
+                force_full=force_full or not Path(file_path).exists()
+            )
+        if changes is None or (changes.mode == "full" and not changes.employees):
             # Si on échoue, on renvoie une erreur mais on ne vide pas le CSV
             return {"success": False, "message": "Aucun employé récupéré d'Odoo ou erreur de connexion"}
+        
+        try:
+            if changes.mode == "full":
+                # Odoo est la source de vérité : le fichier reflète l'ensemble relu
+                result = self._csv_result(
+                    file_path, "full",
+                    write_employees_csv(file_path, changes.employees, delta_path=self.csv_delta_path)
+                )
+            else:
+                result = self._merge_into_csv(file_path, changes.employees)
+            self.commit_changes(changes)
+            return result
             
-        import csv
+        except Exception as e:
+            logger.error(f"Erreur écriture CSV: {e}")
+            return {"success": False, "message": str(e)}
+    
+    def merge_csv(self, employees: List[Dict], file_path: str = "/data/hr/hr_clean.csv") -> Dict:
+        """
+        Fusionne dans le CSV des employés déjà lus (webhooks), sans relire Odoo
+        
+        Le watermark de `update_csv` n'avance pas : sa prochaine exécution
+        relira ces employés et les trouvera inchangés dans l'index.
+        """
         from pathlib import Path
         
         try:
-            # Essayer de créer le dossier si nécessaire
-            path = Path(file_path)
-            if not path.parent.exists():
-                try:
-                    path.parent.mkdir(parents=True, exist_ok=True)
-                except PermissionError:
-                    logger.warning(f"Impossible de créer le dossier pour {file_path}, tentative d'écriture directe.")
-
-            fieldnames = ["personalNumber", "givenName", "familyName", "email", "department", "title", "status"]
-            
-            # Écriture du fichier (Écrasement complet car Odoo est la source de vérité)
-            with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                for emp in employees:
-                    # Filtrer les clés pour correspondre aux colonnes du CSV
-                    row = {k: emp.get(k) for k in fieldnames}
-                    writer.writerow(row)
-            
-            logger.info(f"Mise à jour réussie de {file_path} avec {len(employees)} employés")
-            return {"success": True, "count": len(employees), "message": f"Fichier {file_path} mis à jour avec succès"}
-            
+            with csv_write_lock(file_path):
+                if not Path(file_path).exists():
+                    return self._update_csv(file_path, force_full=True)
+                return self._merge_into_csv(file_path, employees)
         except Exception as e:
             logger.error(f"Erreur écriture CSV: {e}")
             return {"success": False, "message": str(e)}
+    
+    def _merge_into_csv(self, file_path: str, employees: List[Dict]) -> Dict:
+        """
+        Fusionne des employés modifiés dans le CSV existant (lève en cas d'erreur)
+        
+        Les actifs sont ajoutés ou remplacés, les archivés retirés ; seuls
+        comptent ceux dont l'empreinte diffère de l'index.
+        """
+        import csv
+        
+        index = load_csv_index(file_path)
+        modified = [
+            emp for emp in employees
+            if (emp.get("status") == "Active"
+                and index["records"].get(str(emp["personalNumber"])) != employee_fingerprint(emp))
+            or (emp.get("status") != "Active" and str(emp["personalNumber"]) in index["records"])
+        ]
+        if not modified and index["snapshot"]:
+            return {
+                "success": True,
+                "count": len(index["records"]),
+                "changed": 0,
+                "mode": "delta",
+                "unchanged": True,
+                "message": "Aucun changement depuis la dernière mise à jour"
+            }
+        
+        with open(file_path, newline='', encoding='utf-8') as csvfile:
+            rows = {row["personalNumber"]: row for row in csv.DictReader(csvfile)}
+        for emp in modified:
+            key = str(emp["personalNumber"])
+            if emp.get("status") == "Active":
+                rows[key] = emp
+            else:
+                rows.pop(key, None)
+        
+        return self._csv_result(
+            file_path, "delta",
+            write_employees_csv(file_path, list(rows.values()), delta_path=self.csv_delta_path)
+        )
+    
+    @staticmethod
+    def _csv_result(file_path: str, mode: str, result: Dict) -> Dict:
+        return {
+            "success": True,
+            "count": result["count"],
+            "changed": result["changed"] + result["removed"],
+            "mode": mode,
+            "unchanged": not result["written"],
+            "delta_path": result["delta_path"],
+            "message": f"Fichier {file_path} mis à jour avec succès" if result["written"]
+                       else f"Fichier {file_path} déjà à jour"
+        }
 
 
 # Singleton
@@ -149,5 +425,20 @@ def get_odoo_service() -> OdooService:
     """Retourne l'instance singleton du service Odoo"""
     global _odoo_service
     if _odoo_service is None:
-        _odoo_service = OdooService()
+        from ..core.config import settings
+        _odoo_service = OdooService(
+            incremental=settings.ODOO_INCREMENTAL_SYNC,
+            full_reconcile_interval=settings.ODOO_FULL_RECONCILE_INTERVAL,
+            page_size=settings.ODOO_PAGE_SIZE,
+            pool_size=settings.ODOO_PROXY_POOL_SIZE,
+            transport=settings.ODOO_TRANSPORT,
+            csv_delta_path=settings.HR_CSV_DELTA_PATH,
+            ping_timeout=settings.ODOO_PING_TIMEOUT
+        )
     return _odoo_service
+
+
+def close_odoo_service() -> None:
+    """Ferme les connexions vers Odoo (arrêt de l'application)"""
+    if _odoo_service is not None:
+        _odoo_service.close()
@@ -12,15 +12,25 @@ Note: Utilise les rôles de MidPoint via role_mapper
 import logging
 from typing import List, Dict, Optional
 from datetime import datetime
+from sqlalchemy import insert, update
 from sqlalchemy.orm import Session
 
 from .odoo_service import get_odoo_service
 from .audit_service import get_audit_service
+from .employee_fingerprint import employee_fingerprint
 from ..database.models import ProvisionedUser, ProvisioningOperation, OperationStatus as UserStatus
 from ..core.role_mapper import get_role_details, get_applications_for_job_title
 
 logger = logging.getLogger(__name__)
 
+# Taille des tranches de la lecture des utilisateurs existants (clause IN)
+BULK_CHUNK_SIZE = 500
+
+
+def _user_status(employee: Dict) -> UserStatus:
+    """Statut local d'un employé Odoo ("Active" / "Inactive", casse indifférente)"""
+    return UserStatus.SUCCESS if str(employee.get("status", "")).lower() == "active" else UserStatus.FAILED
+
 
 class OdooSyncService:
     """Service pour synchroniser les utilisateurs Odoo vers Aegis Gateway"""
@@ -30,9 +40,16 @@ class OdooSyncService:
         self.odoo = get_odoo_service()
         self.audit = get_audit_service(db)
         
-    def sync_all_employees(self) -> Dict:
+    def sync_all_employees(self, force_full: bool = False) -> Dict:
         """
-        Synchronise tous les employés d'Odoo vers la base Aegis
+        Synchronise les employés d'Odoo vers la base Aegis
+        
+        Incrémental : seuls les employés modifiés depuis la dernière sync
+        sont relus. Lors d'une relecture complète (périodique ou `force_full`),
+        les utilisateurs issus d'Odoo qui n'y figurent plus sont désactivés.
+        
+        Les écritures sont ensemblistes (voir `_sync_employees_bulk`) et
+        passent dans une seule transaction.
         
         Returns:
             Dict: Statistiques de synchronisation
@@ -54,43 +71,71 @@ class OdooSyncService:
                 "skipped": 0
             }
         
-        # 2. Récupérer tous les employés
-        employees = self.odoo.get_employees()
+        # 2. Récupérer les employés modifiés (ou tous, en relecture complète)
+        changes = self.odoo.get_employee_changes("odoo.sync", force_full=force_full)
+        
+        if changes is None:
+            self.audit.log_sync_failed("Odoo", "Lecture des employés Odoo échouée")
+            return {
+                "success": False,
+                "error": "Lecture des employés Odoo échouée",
+                "created": 0,
+                "updated": 0,
+                "skipped": 0
+            }
+        
+        employees = changes.employees
         
         if not employees:
-            logger.warning("⚠️ Aucun employé trouvé dans Odoo")
+            if changes.mode == "delta":
+                self.odoo.commit_changes(changes)
+            else:
+                logger.warning("⚠️ Aucun employé trouvé dans Odoo")
             self.audit.log_sync_completed("Odoo", 0, 0, 0)
             return {
                 "success": True,
+                "mode": changes.mode,
                 "created": 0,
                 "updated": 0,
                 "skipped": 0,
-                "message": "Aucun employé dans Odoo"
+                "message": "Aucun employé dans Odoo" if changes.mode == "full"
+                           else "Aucun changement depuis la dernière synchronisation"
             }
         
-        logger.info(f"📊 {len(employees)} employés récupérés depuis Odoo")
+        logger.info(f"📊 {len(employees)} employés récupérés depuis Odoo ({changes.mode})")
         
-        # 3. Synchroniser chaque employé
+        # 3. Synchroniser les employés en une transaction
         stats = {
             "created": 0,
             "updated": 0,
             "skipped": 0,
+            "deactivated": 0,
             "errors": []
         }
         
-        for emp in employees:
-            try:
-                result = self._sync_employee(emp)
-                stats[result] += 1
-            except Exception as e:
-                logger.error(f"❌ Erreur sync {emp.get('email')}: {e}")
-                stats["errors"].append({
-                    "email": emp.get("email"),
-                    "error": str(e)
-                })
+        try:
+            stats.update(self._sync_employees_bulk(employees))
+            
+            # 4. Relecture complète : désactiver les employés disparus d'Odoo
+            if changes.mode == "full":
+                stats["deactivated"] = self._deactivate_missing({emp.get("email") for emp in employees})
+            
+            # 5. Commit final
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"❌ Erreur synchronisation: {e}")
+            self.audit.log_sync_failed("Odoo", str(e))
+            return {
+                "success": False,
+                "error": str(e),
+                "created": 0,
+                "updated": 0,
+                "skipped": 0
+            }
         
-        # 4. Commit final
-        self.db.commit()
+        # Le watermark n'avance qu'une fois la transaction validée
+        self.odoo.commit_changes(changes)
         
         # Log audit : fin de sync
         self.audit.log_sync_completed(
@@ -105,224 +150,199 @@ class OdooSyncService:
         
         return {
             "success": True,
-            "total": len(employees),
-            **stats
-        }
-        
-        return {
-            "success": True,
+            "mode": changes.mode,
             "total": len(employees),
             **stats
         }
     
-    def _sync_employee(self, employee: Dict) -> str:
+    def _sync_employees_bulk(self, employees: List[Dict]) -> Dict:
         """
-        Synchronise un employé spécifique
+        Synchronise un lot d'employés de façon ensembliste (sans commit)
+        
+        Les utilisateurs existants sont lus en une requête par tranche, le
+        diff est calculé en mémoire, puis créations, mises à jour, opérations
+        et logs d'audit sont écrits par des INSERT/UPDATE groupés. Un
+        utilisateur dont l'empreinte (content_hash) est inchangée est ignoré
+        sans comparer ses champs.
         
-        Args:
-            employee: Données employé depuis Odoo
-            
         Returns:
-            str: "created", "updated", ou "skipped"
+            Dict: Compteurs created / updated / skipped
         """
-        email = employee.get("email")
-        
-        if not email:
-            logger.warning(f"⚠️ Employé sans email: {employee.get('givenName')} {employee.get('familyName')}")
-            return "skipped"
-        
-        # Chercher si l'utilisateur existe déjà
-        existing_user = self.db.query(ProvisionedUser).filter(
-            ProvisionedUser.email == email
-        ).first()
-        
-        if existing_user:
-            # Mise à jour si nécessaire
-            return self._update_user(existing_user, employee)
-        else:
-            # Création
-            return self._create_user(employee)
-    
-    def _create_user(self, employee: Dict) -> str:
-        """Crée un nouvel utilisateur dans la base Aegis"""
-        
-        # Récupérer le job_title et chercher le rôle correspondant dans MidPoint
-        job_title = employee.get("title", "")
-        role_details = get_role_details(job_title) if job_title else None
-        
-        # Déterminer le statut
-        status = UserStatus.SUCCESS if employee.get("status") == "active" else UserStatus.FAILED
-        
-        # Créer l'utilisateur
-        user = ProvisionedUser(
-            email=employee["email"],
-            first_name=employee.get("givenName", ""),
-            last_name=employee.get("familyName", ""),
-            job_title=job_title,
-            department=employee.get("department", ""),
-            role=role_details.get('name') if role_details else job_title,  # Nom du rôle MidPoint ou job_title
-            status=status,
-            source="odoo_sync",  # Important : marqueur de source
-            created_at=datetime.utcnow()
-        )
-        
-        self.db.add(user)
-        self.db.flush()  # Pour obtenir l'ID
-        
-        # Créer une opération de provisioning pour apparaître dans le Dashboard
-        operation = ProvisioningOperation(
-            user_id=user.id,
-            status=UserStatus.SUCCESS.value,
-            trigger="odoo_sync",
-            started_at=datetime.utcnow(),
-            completed_at=datetime.utcnow(),
-            total_actions=1,
-            successful_actions=1,
-            failed_actions=0
-        )
-        
-        self.db.add(operation)
-        
-        # Log d'audit pour la création
-        user_name = f"{employee.get('givenName', '')} {employee.get('familyName', '')}"
-        self.audit.log_user_created(
-            user_email=employee["email"],
-            user_name=user_name.strip(),
-            source="Odoo"
-        )
+        stats = {"created": 0, "updated": 0, "skipped": 0}
         
-        logger.info(f"✨ Créé: {employee['email']} ({job_title} → {mapped_role.value if mapped_role else 'N/A'})")
-        
-        return "created"
-    
-    def _update_user(self, existing_user: ProvisionedUser, employee: Dict) -> str:
-        """Met à jour un utilisateur existant"""
-        
-        updated = False
-        
-        # Vérifier les changements
-        if existing_user.first_name != employee.get("givenName", ""):
-            existing_user.first_name = employee.get("givenName", "")
-            updated = True
-            
-        if existing_user.last_name != employee.get("familyName", ""):
-            existing_user.last_name = employee.get("familyName", "")
-            updated = True
-        
-        job_title = employee.get("title", "")
-        if existing_user.job_title != job_title:
-            existing_user.job_title = job_title
-            # Re-mapper le rôle si le titre change - chercher dans MidPoint
-            role_details = get_role_details(job_title) if job_title else None
-            if role_details:
-                existing_user.role = role_details.get('name')
-            updated = True
-        
-        if existing_user.department != employee.get("department", ""):
-            existing_user.department = employee.get("department", "")
-            updated = True
-        
-        # Vérifier le statut
-        new_status = UserStatus.SUCCESS if employee.get("status") == "active" else UserStatus.FAILED
-        if existing_user.status != new_status:
-            existing_user.status = new_status
-            updated = True
-        
-        if updated:
-            existing_user.last_modified = datetime.utcnow()
+        # Un enregistrement par email (le dernier l'emporte)
+        by_email: Dict[str, Dict] = {}
+        for emp in employees:
+            if not emp.get("email"):
+                logger.warning(f"⚠️ Employé sans email: {emp.get('givenName')} {emp.get('familyName')}")
+                stats["skipped"] += 1
+                continue
+            by_email[emp["email"]] = emp
+        
+        # Utilisateurs existants
+        emails = list(by_email)
+        existing = {}
+        for i in range(0, len(emails), BULK_CHUNK_SIZE):
+            rows = self.db.query(
+                ProvisionedUser.id,
+                ProvisionedUser.email,
+                ProvisionedUser.first_name,
+                ProvisionedUser.last_name,
+                ProvisionedUser.job_title,
+                ProvisionedUser.department,
+                ProvisionedUser.status,
+                ProvisionedUser.content_hash
+            ).filter(ProvisionedUser.email.in_(emails[i:i + BULK_CHUNK_SIZE])).all()
+            existing.update((row.email, row) for row in rows)
+        
+        # Rôle MidPoint par intitulé de poste (une résolution par intitulé)
+        role_names: Dict[str, Optional[str]] = {}
+        
+        def role_for(job_title: str) -> Optional[str]:
+            if job_title not in role_names:
+                role_details = get_role_details(job_title) if job_title else None
+                role_names[job_title] = role_details.get('name') if role_details else None
+            return role_names[job_title]
+        
+        now = datetime.utcnow()
+        creates: List[Dict] = []
+        updates: List[Dict] = []
+        updated_ids: List[int] = []
+        hash_only: List[Dict] = []
+        audit_entries: List[Dict] = []
+        
+        for email, emp in by_email.items():
+            content_hash = employee_fingerprint(emp)
+            row = existing.get(email)
+            if row is not None and row.content_hash == content_hash:
+                stats["skipped"] += 1
+                continue
             
-            # Créer une opération pour la mise à jour
-            operation = ProvisioningOperation(
-                user_id=existing_user.id,
-                status=UserStatus.SUCCESS.value,
-                trigger="odoo_sync",
-                started_at=datetime.utcnow(),
-                completed_at=datetime.utcnow(),
-                total_actions=1,
-                successful_actions=1,
-                failed_actions=0
-            )
+            job_title = emp.get("title", "")
+            status = _user_status(emp).value
+            user_name = f"{emp.get('givenName', '')} {emp.get('familyName', '')}".strip()
             
-            self.db.add(operation)
+            if row is None:
+                creates.append({
+                    "email": email,
+                    "first_name": emp.get("givenName", ""),
+                    "last_name": emp.get("familyName", ""),
+                    "job_title": job_title,
+                    "department": emp.get("department", ""),
+                    "role": role_for(job_title) or job_title,  # Nom du rôle MidPoint ou job_title
+                    "status": status,
+                    "source": "odoo_sync",  # Important : marqueur de source
+                    "content_hash": content_hash,
+                    "created_at": now,
+                    "last_modified": now,
+                    "updated_at": now
+                })
+                audit_entries.append(self.audit.user_created_entry(email, user_name, source="Odoo"))
+                continue
             
-            # Log d'audit pour la mise à jour
-            user_name = f"{employee.get('givenName', '')} {employee.get('familyName', '')}"
-            self.audit.log_user_updated(
-                user_email=employee['email'],
-                user_name=user_name.strip(),
-                changes={"updated": True}
-            )
+            changes = {}
+            if row.first_name != emp.get("givenName", ""):
+                changes["first_name"] = emp.get("givenName", "")
+            if row.last_name != emp.get("familyName", ""):
+                changes["last_name"] = emp.get("familyName", "")
+            if row.job_title != job_title:
+                changes["job_title"] = job_title
+                # Re-mapper le rôle si le titre change
+                role_name = role_for(job_title)
+                if role_name:
+                    changes["role"] = role_name
+            if row.department != emp.get("department", ""):
+                changes["department"] = emp.get("department", "")
+            if row.status != status:
+                changes["status"] = status
             
-            logger.info(f"🔄 Mis à jour: {employee['email']}")
-            return "updated"
-        else:
-            return "skipped"
-    
-    def sync_single_employee(self, employee_id: int) -> Dict:
-        """
-        Synchronise un seul employé depuis Odoo (pour webhook)
-        
-        Args:
-            employee_id: ID de l'employé dans Odoo
+            if not changes:
+                # Empreinte absente ou calculée sur d'autres champs : mémorisée sans opération
+                hash_only.append({"id": row.id, "content_hash": content_hash})
+                stats["skipped"] += 1
+                continue
             
-        Returns:
-            Dict: Résultat de la synchronisation
-        """
-        logger.info(f"🔄 Synchronisation employé Odoo ID: {employee_id}")
-        
-        if not self.odoo.connect():
-            return {
-                "success": False,
-                "error": "Connexion Odoo échouée"
+            updates.append({
+                "id": row.id, **changes, "content_hash": content_hash,
+                "last_modified": now, "updated_at": now
+            })
+            updated_ids.append(row.id)
+            audit_entries.append(self.audit.user_updated_entry(email, user_name, changes={"updated": True}))
+        
+        # Écritures groupées
+        created_ids: List[int] = []
+        if creates:
+            result = self.db.execute(insert(ProvisionedUser).returning(ProvisionedUser.id), creates)
+            created_ids = list(result.scalars())
+        if updates:
+            self.db.execute(update(ProvisionedUser), updates)
+        if hash_only:
+            self.db.execute(update(ProvisionedUser), hash_only)
+        
+        # Une opération par utilisateur créé ou mis à jour (Dashboard)
+        operations = [
+            {
+                "user_id": user_id,
+                "status": UserStatus.SUCCESS.value,
+                "trigger": "odoo_sync",
+                "started_at": now,
+                "completed_at": now,
+                "total_actions": 1,
+                "successful_actions": 1,
+                "failed_actions": 0
             }
-        
-        # Récupérer l'employé spécifique depuis Odoo
+            for user_id in created_ids + updated_ids
+        ]
+        if operations:
+            self.db.execute(insert(ProvisioningOperation), operations)
+        
+        self.audit.log_bulk(audit_entries)
+        
+        stats["created"] = len(creates)
+        stats["updated"] = len(updates)
+        logger.info(f"📦 Écriture groupée: {len(creates)} créés, {len(updates)} mis à jour, "
+                    f"{len(operations)} opérations, {len(audit_entries)} logs d'audit")
+        return stats
+    
+    def sync_employees(self, employees: List[Dict]) -> Dict:
+        """Synchronise des employés déjà lus depuis Odoo (une transaction)"""
         try:
-            employee_data = self.odoo.models.execute_kw(
-                self.odoo.db, self.odoo.uid, self.odoo.password,
-                'hr.employee', 'read',
-                [[employee_id]],
-                {'fields': [
-                    'id', 'name', 'work_email', 'job_title',
-                    'department_id', 'parent_id', 'active'
-                ]}
-            )
-            
-            if not employee_data:
-                return {
-                    "success": False,
-                    "error": f"Employé {employee_id} non trouvé"
-                }
-            
-            emp = employee_data[0]
-            
-            # Transformer au format attendu
-            transformed = {
-                "personalNumber": str(emp['id']),
-                "givenName": emp['name'].split()[0] if emp['name'] else "",
-                "familyName": " ".join(emp['name'].split()[1:]) if emp['name'] else "",
-                "email": emp.get('work_email', ''),
-                "department": emp['department_id'][1] if emp.get('department_id') else "",
-                "title": emp.get('job_title', ''),
-                "status": "active" if emp.get('active') else "inactive"
-            }
-            
-            # Synchroniser
-            result = self._sync_employee(transformed)
+            stats = self._sync_employees_bulk(employees)
             self.db.commit()
-            
-            return {
-                "success": True,
-                "action": result,
-                "employee": transformed
-            }
-            
         except Exception as e:
-            logger.error(f"❌ Erreur sync employé {employee_id}: {e}")
-            return {
-                "success": False,
-                "error": str(e)
-            }
+            self.db.rollback()
+            logger.error(f"❌ Erreur sync employés: {e}")
+            return {"success": False, "error": str(e)}
+        
+        return {
+            "success": True,
+            "found": len(employees),
+            **stats
+        }
+    
+    def _deactivate_missing(self, odoo_emails: set) -> int:
+        """
+        Désactive les utilisateurs issus d'Odoo absents de la relecture complète
+        
+        L'empreinte est effacée : elle décrit l'état actif, un employé qui
+        réapparaît dans Odoo doit être comparé champ à champ et réactivé.
+        """
+        inactive = UserStatus.FAILED.value
+        missing = self.db.query(ProvisionedUser).filter(
+            ProvisionedUser.source == "odoo_sync",
+            ProvisionedUser.status != inactive
+        ).all()
+        
+        count = 0
+        for user in missing:
+            if user.email in odoo_emails:
+                continue
+            user.status = inactive
+            user.content_hash = None
+            user.last_modified = datetime.utcnow()
+            count += 1
+            logger.info(f"🚫 Désactivé (absent d'Odoo): {user.email}")
+        return count
 
 
 def get_odoo_sync_service(db: Session) -> OdooSyncService:
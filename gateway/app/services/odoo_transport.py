@@ -0,0 +1,194 @@
+"""
+Transports RPC vers Odoo - XML-RPC (par défaut) ou JSON-RPC
+
+Les deux transports exposent la même interface (`authenticate`, `execute_kw`,
+`version`, `close`) et signalent une session invalide par `OdooAccessDenied`, ce qui
+permet à OdooService de passer de l'un à l'autre via ODOO_TRANSPORT.
+
+- XML-RPC : pool borné de `ServerProxy`, un proxy par thread à la fois.
+- JSON-RPC : endpoint `/jsonrpc` sur un client httpx poolé (thread-safe) ;
+  décodage JSON natif et réponses plus compactes que XML-RPC.
+"""
+import itertools
+import queue
+import threading
+import xmlrpc.client
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+import logging
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+TRANSPORTS = ("xmlrpc", "jsonrpc")
+
+
+class OdooAccessDenied(Exception):
+    """uid/mot de passe refusé par Odoo (ré-authentification nécessaire)"""
+
+
+class OdooRpcError(Exception):
+    """Erreur applicative renvoyée par Odoo en JSON-RPC"""
+
+
+def _is_access_denied(fault: xmlrpc.client.Fault) -> bool:
+    """Fault levée par Odoo quand l'uid/mot de passe n'est plus valide"""
+    text = str(fault.faultString)
+    return fault.faultCode == 3 or "AccessDenied" in text or "Access Denied" in text
+
+
+class _TimeoutMixin:
+    """Délai de socket des connexions ouvertes par un transport xmlrpc.client"""
+    timeout: float
+
+    def make_connection(self, host):
+        connection = super().make_connection(host)
+        connection.timeout = self.timeout
+        return connection
+
+
+class _TimeoutTransport(_TimeoutMixin, xmlrpc.client.Transport):
+    def __init__(self, timeout: float):
+        super().__init__()
+        self.timeout = timeout
+
+
+class _TimeoutSafeTransport(_TimeoutMixin, xmlrpc.client.SafeTransport):
+    def __init__(self, timeout: float):
+        super().__init__()
+        self.timeout = timeout
+
+
+class ProxyPool:
+    """Pool borné de ServerProxy : un proxy n'est utilisé que par un thread à la fois"""
+
+    def __init__(self, url: str, size: int = 4):
+        self.url = url
+        self._idle: "queue.LifoQueue[xmlrpc.client.ServerProxy]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def checkout(self):
+        """Emprunte un proxy (bloque si tous sont utilisés)"""
+        with self._slots:
+            try:
+                proxy = self._idle.get_nowait()
+            except queue.Empty:
+                proxy = xmlrpc.client.ServerProxy(self.url, allow_none=True)
+            try:
+                yield proxy
+            except xmlrpc.client.Fault:
+                # Erreur applicative : la connexion reste utilisable
+                self._idle.put(proxy)
+                raise
+            except Exception:
+                # Erreur de transport : le proxy est abandonné
+                proxy("close")()
+                raise
+            self._idle.put(proxy)
+
+    def close(self) -> None:
+        """Ferme les connexions des proxys inutilisés"""
+        while True:
+            try:
+                self._idle.get_nowait()("close")()
+            except queue.Empty:
+                return
+
+
+class XmlRpcTransport:
+    """Transport XML-RPC (`/xmlrpc/2/common` et `/xmlrpc/2/object`)"""
+
+    def __init__(self, url: str, pool_size: int = 4):
+        self.url = url
+        self.pool = ProxyPool(f"{url}/xmlrpc/2/object", size=pool_size)
+
+    def authenticate(self, db: str, username: str, password: str) -> Any:
+        common = xmlrpc.client.ServerProxy(f"{self.url}/xmlrpc/2/common")
+        try:
+            return common.authenticate(db, username, password, {})
+        finally:
+            common("close")()
+
+    def version(self, timeout: float) -> Dict:
+        """`common.version()` : ne nécessite pas d'authentification"""
+        transport_class = _TimeoutSafeTransport if self.url.startswith("https") else _TimeoutTransport
+        common = xmlrpc.client.ServerProxy(f"{self.url}/xmlrpc/2/common", transport=transport_class(timeout))
+        try:
+            return common.version()
+        finally:
+            common("close")()
+
+    def execute_kw(
+        self, db: str, uid: int, password: str,
+        model: str, method: str, args: List, kwargs: Dict
+    ) -> Any:
+        try:
+            with self.pool.checkout() as proxy:
+                return proxy.execute_kw(db, uid, password, model, method, args, kwargs)
+        except xmlrpc.client.Fault as fault:
+            if _is_access_denied(fault):
+                raise OdooAccessDenied(fault.faultString) from fault
+            raise
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+class JsonRpcTransport:
+    """Transport JSON-RPC (`/jsonrpc`) sur un client HTTP poolé"""
+
+    def __init__(self, url: str, pool_size: int = 4, timeout: float = 60.0):
+        self.url = url
+        self.client = httpx.Client(
+            base_url=url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+        self._ids = itertools.count(1)
+
+    def _call(self, service: str, method: str, *args, timeout: Optional[float] = None) -> Any:
+        payload = {
+            "jsonrpc": "2.0",
+            "method": "call",
+            "params": {"service": service, "method": method, "args": list(args)},
+            "id": next(self._ids),
+        }
+        extra = {"timeout": timeout} if timeout is not None else {}
+        response = self.client.post("/jsonrpc", json=payload, **extra)
+        response.raise_for_status()
+        data = response.json()
+
+        error = data.get("error")
+        if error:
+            details = error.get("data") or {}
+            message = details.get("message") or error.get("message", "Erreur Odoo")
+            if "AccessDenied" in details.get("name", ""):
+                raise OdooAccessDenied(message)
+            raise OdooRpcError(message)
+        return data.get("result")
+
+    def authenticate(self, db: str, username: str, password: str) -> Any:
+        return self._call("common", "authenticate", db, username, password, {})
+
+    def version(self, timeout: float) -> Dict:
+        return self._call("common", "version", timeout=timeout)
+
+    def execute_kw(
+        self, db: str, uid: int, password: str,
+        model: str, method: str, args: List, kwargs: Dict
+    ) -> Any:
+        return self._call("object", "execute_kw", db, uid, password, model, method, args, kwargs)
+
+    def close(self) -> None:
+        self.client.close()
+
+
+def create_transport(kind: str, url: str, pool_size: int = 4):
+    """Instancie le transport `kind` ("xmlrpc" ou "jsonrpc")"""
+    if kind not in TRANSPORTS:
+        logger.warning(f"ODOO_TRANSPORT inconnu '{kind}', utilisation de xmlrpc")
+    if kind == "jsonrpc":
+        return JsonRpcTransport(url, pool_size=pool_size)
+    return XmlRpcTransport(url, pool_size=pool_size)
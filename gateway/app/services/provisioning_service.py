@@ -4,6 +4,7 @@ Provisioning Service - Phase 2 Core IAM
 Orchestre le provisioning multi-applications avec gestion d'erreur et rollback.
 Ce service coordonne les connectors et enregistre toutes les opérations dans la DB.
 """
+from contextlib import nullcontext
 from datetime import datetime
 from typing import List, Dict, Optional, Any
 from sqlalchemy.orm import Session
@@ -17,7 +18,7 @@ from app.database.models import (
     ActionStatus
 )
 from app.core.role_mapper import get_provisioning_plan
-from app.services.midpoint_service import MidPointService
+from app.services.midpoint_service import get_midpoint_service
 
 logger = logging.getLogger(__name__)
 
@@ -32,13 +33,20 @@ class ProvisioningService:
     - N'appelle plus directement les connecteurs applicatifs
     """
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, target_limits: Optional[Dict[str, Any]] = None):
         """
         Initialise le service de provisioning.
+        
+        Args:
+            target_limits: Sémaphores bornant les appels simultanés par cible
+                (ex: {"midpoint": BoundedSemaphore(4)}), tenus uniquement
+                pendant l'appel distant
         """
         self.db = db
-        # Les connecteurs directs sont obsolètes. On utilise MidPointService.
-        self.midpoint_service = MidPointService()
+        self.target_limits = target_limits or {}
+        # Les connecteurs directs sont obsolètes. On utilise MidPointService
+        # (singleton partagé : pool de connexions HTTP réutilisé entre requêtes).
+        self.midpoint_service = get_midpoint_service()
         
     def register_connector(self, app_name: str, connector: Any):
         """DEPRECATED: Les connecteurs ne sont plus utilisés par Aegis."""
@@ -99,10 +107,11 @@ class ProvisioningService:
             target_apps = plan['applications']
             logger.info(f"Delegating provisioning for {user_data['email']} to MidPoint. Targets: {target_apps}")
             
-            mp_result = self.midpoint_service.provision_user_with_assignments(
-                user_data=user_data,
-                assignments=target_apps
-            )
+            with self.target_limits.get("midpoint") or nullcontext():
+                mp_result = self.midpoint_service.provision_user_with_assignments(
+                    user_data=user_data,
+                    assignments=target_apps
+                )
             
             # 7. Enregistrement des résultats (Audit)
             for action_desc in mp_result['actions']:
@@ -127,6 +136,8 @@ class ProvisioningService:
             if mp_result['success']:
                 operation.status = OperationStatus.SUCCESS.value
                 user.status = "synced"
+                # Statut modifié hors synchronisation Odoo : empreinte périmée
+                user.content_hash = None
             else:
                 operation.status = OperationStatus.FAILED.value
                 operation.failed_actions += 1 # Mark global failure
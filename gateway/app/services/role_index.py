@@ -0,0 +1,91 @@
+"""
+Index des rôles MidPoint - Résolution nom → OID en mémoire
+
+Le catalogue complet est chargé en un seul appel (`GET /ws/rest/roles`) puis
+conservé pendant un TTL. Les noms absents sont mémorisés (cache négatif) pour
+ne pas relancer une recherche à chaque utilisateur provisionné.
+"""
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RoleIndex:
+    """Cache nom de rôle → OID avec TTL, invalidation et cache négatif"""
+
+    def __init__(
+        self,
+        loader: Callable[[], Optional[List[Dict]]],
+        search: Optional[Callable[[str], Optional[str]]] = None,
+        ttl: float = 300.0,
+        negative_ttl: float = 60.0
+    ):
+        """
+        Args:
+            loader: Charge tous les rôles (liste de dicts avec 'name' et 'oid'),
+                None en cas d'échec
+            search: Recherche unitaire d'un rôle par nom, utilisée pour un nom
+                absent de l'index (rôle créé depuis le dernier chargement)
+            ttl: Durée de validité de l'index complet (secondes)
+            negative_ttl: Durée de mémorisation d'un nom introuvable (secondes)
+        """
+        self.loader = loader
+        self.search = search
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._oids: Dict[str, str] = {}
+        self._missing: Dict[str, float] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _is_fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    def _refresh(self) -> None:
+        """Recharge l'index complet si le TTL est expiré"""
+        if self._is_fresh():
+            return
+        with self._lock:
+            if self._is_fresh():
+                return
+            roles = self.loader()
+            if roles is None:
+                # MidPoint indisponible : on garde l'index précédent
+                logger.warning("Chargement de l'index des rôles impossible")
+                return
+            self._oids = {r['name']: r['oid'] for r in roles if r.get('name') and r.get('oid')}
+            self._missing = {}
+            self._loaded_at = time.monotonic()
+            logger.info(f"Index des rôles chargé: {len(self._oids)} rôles")
+
+    def get_oid(self, name: str) -> Optional[str]:
+        """Retourne l'OID du rôle `name`, ou None s'il n'existe pas"""
+        self._refresh()
+
+        oid = self._oids.get(name)
+        if oid:
+            return oid
+
+        missing_since = self._missing.get(name)
+        if missing_since is not None and time.monotonic() - missing_since < self.negative_ttl:
+            return None
+
+        oid = self.search(name) if self.search else None
+        with self._lock:
+            if oid:
+                self._oids[name] = oid
+                self._missing.pop(name, None)
+            else:
+                self._missing[name] = time.monotonic()
+        return oid
+
+    def invalidate(self) -> None:
+        """Vide l'index (rechargé au prochain accès)"""
+        with self._lock:
+            self._oids = {}
+            self._missing = {}
+            self._loaded_at = None
+        logger.info("Index des rôles invalidé")
@@ -1,14 +1,16 @@
 """
 Service de Synchronisation - Orchestre le flux Odoo → CSV → MidPoint
 """
-import csv
-import os
-from typing import Dict, List, Optional
+from typing import Dict, Optional
 from datetime import datetime
 import logging
+import threading
 
-from .odoo_service import get_odoo_service
+from ..core.config import settings
+from .odoo_service import EmployeeChanges, get_odoo_service
 from .midpoint_service import get_midpoint_service
+from .midpoint_push_service import get_midpoint_push_service
+from .midpoint_task_tracker import get_midpoint_task_tracker
 
 logger = logging.getLogger(__name__)
 
@@ -21,67 +23,161 @@ class SyncService:
     def __init__(self):
         self.odoo = get_odoo_service()
         self.midpoint = get_midpoint_service()
+        self.task_tracker = get_midpoint_task_tracker()
         self.last_sync: Optional[datetime] = None
         self.sync_stats: Dict = {}
+        self._full_sync_lock = threading.Lock()
     
-    def export_odoo_to_csv(self) -> Dict:
-        """Exporte les employés Odoo vers le fichier CSV"""
+    def export_odoo_to_csv(self, force_full: bool = False, full_read: Optional[EmployeeChanges] = None) -> Dict:
+        """
+        Exporte les employés Odoo vers le fichier CSV
+        
+        Incrémental : seuls les employés modifiés depuis le dernier export
+        sont relus (relecture complète périodique ou si `force_full`).
+        Une relecture complète déjà faite (`full_read`) est réutilisée.
+        """
         logger.info("Début export Odoo → CSV")
         
-        # Récupérer les employés depuis Odoo
-        employees = self.odoo.get_employees()
+        result = self.odoo.update_csv(CSV_PATH, force_full=force_full, full_read=full_read)
         
-        if not employees:
+        if not result.get("success"):
             return {
                 "success": False,
-                "error": "Aucun employé récupéré depuis Odoo",
+                "error": result.get("message", "Aucun employé récupéré depuis Odoo"),
                 "count": 0
             }
         
-        # Écrire le CSV
-        try:
-            os.makedirs(os.path.dirname(CSV_PATH), exist_ok=True)
-            
-            with open(CSV_PATH, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=[
-                    'personalNumber', 'givenName', 'familyName',
-                    'email', 'department', 'title', 'status'
-                ])
-                writer.writeheader()
-                writer.writerows(employees)
-            
-            logger.info(f"CSV exporté: {len(employees)} employés")
-            return {
-                "success": True,
-                "count": len(employees),
-                "path": CSV_PATH
-            }
-            
-        except Exception as e:
-            logger.error(f"Erreur écriture CSV: {e}")
-            return {
-                "success": False,
-                "error": str(e),
-                "count": 0
-            }
+        logger.info(f"CSV exporté: {result['count']} employés ({result['mode']})")
+        return {
+            "success": True,
+            "count": result["count"],
+            "changed": result.get("changed", 0),
+            "unchanged": result.get("unchanged", False),
+            "mode": result["mode"],
+            "path": CSV_PATH
+        }
     
-    def trigger_midpoint_import(self) -> Dict:
-        """Déclenche l'import MidPoint depuis le CSV"""
+    def trigger_midpoint_import(self, wait: bool = True, timeout: Optional[float] = None) -> Dict:
+        """
+        Déclenche l'import MidPoint depuis le CSV
+        
+        Args:
+            wait: Attend la fin de la tâche et renvoie ses métriques (objets
+                traités, erreurs, débit, durée réelle). Refusé si un import
+                est déjà en cours.
+            timeout: Attente maximum (MIDPOINT_TASK_TIMEOUT par défaut) ; au-delà
+                l'import continue, le résultat porte `timeout` et le suivi
+                est confié au job "midpoint.import.wait" (`import_job_id`)
+        """
         logger.info("Déclenchement import MidPoint")
         
-        success = self.midpoint.trigger_hr_import_task()
+        if not wait:
+            success = self.midpoint.trigger_hr_import_task()
+            return {
+                "success": success,
+                "message": "Tâche d'import déclenchée" if success else "Échec déclenchement"
+            }
+        
+        result = self.task_tracker.run_and_wait(settings.MIDPOINT_HR_IMPORT_TASK_OID, timeout=timeout)
+        if result.get("timeout"):
+            result["import_job_id"] = self._defer_import_tracking(result)
+        return self._describe_import(result)
+    
+    @staticmethod
+    def _defer_import_tracking(result: Dict) -> int:
+        """Planifie la reprise du suivi d'un import dont l'attente a expiré"""
+        from .job_queue import get_job_queue
+        job, _ = get_job_queue().enqueue("midpoint.import.wait", {
+            "previous_finish": result["previous_finish"],
+            "started_at": result["started_at"]
+        }, coalesce=True)
+        return job["id"]
+    
+    def track_midpoint_import(
+        self,
+        previous_finish: Optional[str],
+        started_at: str,
+        timeout: Optional[float] = None
+    ) -> Dict:
+        """
+        Reprend le suivi d'un import dont l'attente a expiré
         
+        Le résultat final remplace l'étape d'import de la dernière
+        synchronisation complète (statistiques de `get_status`).
+        """
+        result = self._describe_import(self.task_tracker.wait_for_run(
+            settings.MIDPOINT_HR_IMPORT_TASK_OID, previous_finish, started_at, timeout=timeout
+        ))
+        if not result.get("timeout") and not result.get("running") and self.sync_stats.get("import_pending"):
+            for step in self.sync_stats["steps"]:
+                if step["step"] == "midpoint_import":
+                    step["result"] = result
+            self.sync_stats["import_pending"] = False
+            self.sync_stats["success"] = all(
+                step["result"].get("success") for step in self.sync_stats["steps"]
+            )
+        return result
+    
+    @staticmethod
+    def _describe_import(result: Dict) -> Dict:
+        if result.get("running"):
+            result["message"] = "Import MidPoint déjà en cours"
+        elif result.get("timeout"):
+            result["message"] = "Import MidPoint toujours en cours à la fin de l'attente, suivi en arrière-plan"
+        elif "error" in result:
+            result["message"] = result["error"]
+        else:
+            result["message"] = (f"Import terminé ({result['result_status']}): "
+                                 f"{result['processed']} objets, {result['errors']} erreurs")
+        return result
+    
+    def get_import_task_status(self) -> Dict:
+        """État courant de la tâche d'import HR dans MidPoint"""
+        task = self.midpoint.get_task(settings.MIDPOINT_HR_IMPORT_TASK_OID)
         return {
-            "success": success,
-            "message": "Tâche d'import déclenchée" if success else "Échec déclenchement"
+            "tracking": self.task_tracker.is_running(),
+            "task": task,
+            "current_run": self.task_tracker.current if self.task_tracker.is_running() else None
         }
     
-    def full_sync(self) -> Dict:
+    def full_sync(
+        self,
+        force: bool = False,
+        import_timeout: Optional[float] = None,
+        full_read: Optional[EmployeeChanges] = None
+    ) -> Dict:
         """
         Synchronisation complète :
         1. Export Odoo → CSV
         2. Trigger MidPoint Import Task
+        
+        Si l'empreinte du CSV est inchangée et que la dernière synchronisation
+        a réussi, l'import MidPoint n'est pas relancé (sauf `force`).
+        
+        La durée rapportée couvre l'import MidPoint jusqu'à sa fin réelle ;
+        une synchronisation est refusée (`running`) si une autre est en cours.
+        Un import encore en cours après `import_timeout` n'est pas un échec :
+        le résultat porte `import_pending` (suivi via `track_midpoint_import`).
+        `full_read` : employés déjà relus en totalité, exportés sans relire Odoo.
         """
+        if not self._full_sync_lock.acquire(blocking=False):
+            logger.warning("Synchronisation complète déjà en cours, demande refusée")
+            return {
+                "success": False,
+                "running": True,
+                "error": "Synchronisation complète déjà en cours"
+            }
+        try:
+            return self._full_sync(force, import_timeout, full_read)
+        finally:
+            self._full_sync_lock.release()
+    
+    def _full_sync(
+        self,
+        force: bool,
+        import_timeout: Optional[float],
+        full_read: Optional[EmployeeChanges]
+    ) -> Dict:
         logger.info("=== Début synchronisation complète ===")
         start_time = datetime.now()
         
@@ -91,7 +187,7 @@ class SyncService:
         }
         
         # Étape 1: Export Odoo → CSV
-        export_result = self.export_odoo_to_csv()
+        export_result = self.export_odoo_to_csv(force_full=force, full_read=full_read)
         results["steps"].append({
             "step": "odoo_export",
             "result": export_result
@@ -102,16 +198,31 @@ class SyncService:
             results["error"] = "Échec export Odoo"
             return results
         
-        # Étape 2: Import MidPoint
-        import_result = self.trigger_midpoint_import()
+        # Étape 2: Import MidPoint (inutile si le CSV n'a pas changé)
+        if export_result.get("unchanged") and self.sync_stats.get("success") and not force:
+            logger.info("CSV inchangé depuis la dernière synchronisation, import MidPoint ignoré")
+            import_result = {
+                "success": True,
+                "skipped": True,
+                "message": "CSV inchangé, import non relancé"
+            }
+        else:
+            import_result = self.trigger_midpoint_import(timeout=import_timeout)
         results["steps"].append({
             "step": "midpoint_import",
             "result": import_result
         })
         
-        # Résultat final
+        if import_result.get("running"):
+            results["running"] = True
+        results["import_pending"] = bool(import_result.get("timeout"))
+        if results["import_pending"]:
+            results["import_job_id"] = import_result["import_job_id"]
+        
+        # Résultat final (un import encore en cours n'est pas un échec)
         results["success"] = all(
-            step["result"].get("success") for step in results["steps"]
+            step["result"].get("success") or step["result"].get("timeout")
+            for step in results["steps"]
         )
         results["duration_seconds"] = (datetime.now() - start_time).total_seconds()
         
@@ -121,10 +232,49 @@ class SyncService:
         logger.info(f"=== Synchronisation terminée: {'OK' if results['success'] else 'ÉCHEC'} ===")
         return results
     
+    def push_changes(self, import_timeout: Optional[float] = None) -> Dict:
+        """
+        Push direct vers MidPoint des employés modifiés depuis le dernier push
+        
+        Les changements sont envoyés en upserts REST (voir midpoint_push_service).
+        Première exécution ou réconciliation périodique : synchronisation
+        complète via le CSV et la tâche d'import. Le CSV est aussi mis à jour
+        pour qu'un import ultérieur ne ramène pas d'anciennes valeurs.
+        
+        Args:
+            import_timeout: Attente maximum de l'import en mode complet
+        """
+        logger.info("=== Début push Odoo → MidPoint ===")
+        changes = self.odoo.get_employee_changes("midpoint.push")
+        
+        if changes is None:
+            return {"success": False, "error": "Lecture des employés Odoo échouée"}
+        
+        if changes.mode == "full":
+            # Employés déjà relus en totalité : l'export CSV les réutilise
+            result = self.full_sync(import_timeout=import_timeout, full_read=changes)
+            if result.get("success"):
+                self.odoo.commit_changes(changes)
+            return {"success": result.get("success", False), "mode": "full", "full_sync": result}
+        
+        push_result = get_midpoint_push_service().push(changes.employees)
+        csv_result = self.export_odoo_to_csv()
+        
+        # Le watermark n'avance que si tous les employés ont été poussés
+        if push_result["failed"] == 0:
+            self.odoo.commit_changes(changes)
+        
+        return {
+            "success": push_result["failed"] == 0 and csv_result.get("success", False),
+            "mode": "delta",
+            "push": push_result,
+            "csv": csv_result
+        }
+    
     def get_status(self) -> Dict:
         """Retourne le statut du service de synchronisation"""
         return {
-            "odoo_connected": self.odoo.connect(),
+            "odoo_connected": self.odoo.ping(),
             "midpoint_connected": self.midpoint.test_connection(),
             "last_sync": self.last_sync.isoformat() if self.last_sync else None,
             "last_sync_stats": self.sync_stats
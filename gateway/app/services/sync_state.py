@@ -0,0 +1,51 @@
+"""
+Points de reprise des synchronisations incrémentales
+
+Chaque consommateur (export CSV, sync base locale...) mémorise son propre
+watermark, ainsi que la date de sa dernière relecture complète.
+"""
+from datetime import datetime
+from typing import Dict, Optional
+import logging
+
+from ..database.connection import SessionLocal
+from ..database.models import SyncState
+
+logger = logging.getLogger(__name__)
+
+
+def get_sync_state(name: str) -> Optional[Dict]:
+    """Retourne le point de reprise `name`, ou None s'il n'existe pas"""
+    db = SessionLocal()
+    try:
+        state = db.query(SyncState).filter(SyncState.name == name).first()
+        if state is None:
+            return None
+        return {
+            "watermark": state.watermark,
+            "last_full_sync_at": state.last_full_sync_at,
+            "updated_at": state.updated_at,
+        }
+    finally:
+        db.close()
+
+
+def save_sync_state(name: str, watermark: Optional[str], full: bool = False) -> None:
+    """Enregistre le watermark (et la date de relecture complète si `full`)"""
+    db = SessionLocal()
+    try:
+        state = db.query(SyncState).filter(SyncState.name == name).first()
+        if state is None:
+            state = SyncState(name=name)
+            db.add(state)
+        if watermark:
+            state.watermark = watermark
+        if full:
+            state.last_full_sync_at = datetime.utcnow()
+        state.updated_at = datetime.utcnow()
+        db.commit()
+    except Exception as e:
+        logger.error(f"Erreur enregistrement du point de reprise {name}: {e}")
+        db.rollback()
+    finally:
+        db.close()
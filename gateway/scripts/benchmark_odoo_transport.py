@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark des transports Odoo : XML-RPC vs JSON-RPC
+
+Compare, pour une réponse `search_read` de N hr.employee (10 000 par défaut) :
+- la taille de la réponse sur le réseau (octets) ;
+- le temps de décodage côté gateway (xmlrpc.client.loads vs json.loads).
+
+Avec --live, lit en plus tous les employés d'une instance Odoo réelle via
+OdooService avec chacun des deux transports (temps total, pagination incluse).
+
+Usage:
+    python scripts/benchmark_odoo_transport.py
+    python scripts/benchmark_odoo_transport.py --records 10000 --repeat 5
+    python scripts/benchmark_odoo_transport.py --live
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+import xmlrpc.client
+from pathlib import Path
+
+# Ajouter le répertoire parent au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+DEPARTMENTS = ["IT", "RH", "Finance", "Ventes", "Support"]
+TITLES = ["Developer", "Manager", "Analyst", "Consultant", "Support Engineer"]
+
+
+def print_section(title):
+    """Affiche un titre de section."""
+    print(f"\n{'='*70}")
+    print(f"  {title}")
+    print(f"{'='*70}\n")
+
+
+def make_employees(count: int) -> list:
+    """Génère `count` hr.employee au format renvoyé par search_read"""
+    return [
+        {
+            "id": i,
+            "name": f"Prénom{i} Nom{i}",
+            "work_email": f"prenom{i}.nom{i}@example.com",
+            "job_title": TITLES[i % len(TITLES)],
+            "department_id": [i % len(DEPARTMENTS) + 1, DEPARTMENTS[i % len(DEPARTMENTS)]],
+            "parent_id": [1, "Direction"] if i % 7 else False,
+            "active": True,
+            "write_date": "2026-01-15 08:30:00",
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def measure(decode, payload, repeat: int) -> float:
+    """Temps médian de décodage (secondes)"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        decode(payload)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def benchmark_decode(count: int, repeat: int):
+    """Compare taille et temps de décodage des deux formats de réponse"""
+    print_section(f"Décodage d'une réponse search_read de {count} employés")
+
+    employees = make_employees(count)
+    xml_body = xmlrpc.client.dumps((employees,), methodresponse=True, allow_none=True).encode("utf-8")
+    json_body = json.dumps({"jsonrpc": "2.0", "id": 1, "result": employees}).encode("utf-8")
+
+    xml_time = measure(lambda body: xmlrpc.client.loads(body.decode("utf-8")), xml_body, repeat)
+    json_time = measure(json.loads, json_body, repeat)
+
+    print(f"{'Transport':<10} {'Octets':>12} {'Décodage (ms)':>15}")
+    print(f"{'xmlrpc':<10} {len(xml_body):>12,} {xml_time * 1000:>15.1f}")
+    print(f"{'jsonrpc':<10} {len(json_body):>12,} {json_time * 1000:>15.1f}")
+    print(f"\n📊 JSON-RPC : {len(xml_body) / len(json_body):.1f}x moins d'octets, "
+          f"décodage {xml_time / json_time:.1f}x plus rapide")
+
+
+def benchmark_live(repeat: int):
+    """Lit tous les employés d'Odoo avec chaque transport"""
+    from app.core.config import settings
+    from app.services.odoo_service import OdooService
+
+    print_section(f"Lecture des employés depuis {settings.ODOO_URL}")
+
+    for transport in ("xmlrpc", "jsonrpc"):
+        odoo = OdooService(
+            url=settings.ODOO_URL,
+            db=settings.ODOO_DB,
+            username=settings.ODOO_USERNAME,
+            password=settings.ODOO_PASSWORD,
+            page_size=settings.ODOO_PAGE_SIZE,
+            transport=transport
+        )
+        if not odoo.connect():
+            print(f"❌ {transport}: connexion Odoo impossible")
+            continue
+
+        timings = []
+        count = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            count = sum(1 for _ in odoo.iter_employees())
+            timings.append(time.perf_counter() - start)
+        odoo.close()
+
+        print(f"✅ {transport:<8} {count} employés en {statistics.median(timings) * 1000:.0f} ms (médiane)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark XML-RPC vs JSON-RPC pour Odoo")
+    parser.add_argument("--records", type=int, default=10000, help="Nombre d'employés simulés")
+    parser.add_argument("--repeat", type=int, default=5, help="Répétitions par mesure")
+    parser.add_argument("--live", action="store_true", help="Mesure aussi contre l'instance Odoo configurée")
+    args = parser.parse_args()
+
+    benchmark_decode(args.records, args.repeat)
+    if args.live:
+        benchmark_live(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Vérification des plans d'exécution des requêtes du dashboard et de l'audit
+
+Appelle les vrais endpoints (stats, utilisateurs, opérations, audit) et la
+désactivation des absents Odoo sur une base SQLite neuve, enregistre chaque
+SELECT émis puis l'analyse avec EXPLAIN QUERY PLAN. Échoue (code 1) si une
+requête filtrée ou triée parcourt une table entière ("SCAN <table>" sans
+index) ou trie dans une table temporaire ("USE TEMP B-TREE").
+
+Les tables sont alimentées (--rows) puis analysées (ANALYZE) pour que le
+planificateur raisonne sur des volumes réalistes.
+
+Usage:
+    python scripts/check_query_plans.py
+    python scripts/check_query_plans.py --rows 20000 --verbose
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Ajouter le répertoire parent au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Base temporaire : à définir avant l'import de l'application
+_tmp_dir = tempfile.TemporaryDirectory(prefix="aegis-plans-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp_dir.name}/plans.db"
+os.environ["JOB_QUEUE_ENABLED"] = "false"
+
+from sqlalchemy import event, insert, text  # noqa: E402
+
+from app.database.connection import engine, SessionLocal  # noqa: E402
+from app.database.models import (  # noqa: E402
+    init_db, ProvisionedUser, ProvisioningOperation, ProvisioningAction, AuditLog
+)
+
+LEVELS = ["INFO", "WARNING", "ERROR", "CRITICAL"]
+ACTIONS = ["USER_CREATED", "USER_UPDATED", "SYNC_COMPLETED", "SYNC_FAILED", "LOGIN"]
+STATUSES = ["success", "failed", "partial", "in_progress"]
+DEPARTMENTS = ["IT", "RH", "Finance", "Ventes", "Support"]
+
+# Requêtes d'application à vérifier : (nom, méthode, chemin)
+ENDPOINTS = [
+    ("stats", "GET", "/api/v1/stats"),
+    ("users par source", "GET", "/api/v1/users?source=odoo_sync"),
+    ("users par département", "GET", "/api/v1/users?department=IT"),
+    ("opérations récentes", "GET", "/api/v1/operations/recent?limit=10"),
+    ("détail opération", "GET", "/api/v1/operations/1"),
+    ("audit", "GET", "/api/v1/audit?limit=50"),
+    ("audit par niveau", "GET", "/api/v1/audit?level=ERROR"),
+    ("audit par action", "GET", "/api/v1/audit?action=SYNC_FAILED"),
+    ("audit stats", "GET", "/api/v1/audit/stats"),
+    ("audit actions", "GET", "/api/v1/audit/actions"),
+]
+
+
+def print_section(title):
+    """Affiche un titre de section."""
+    print(f"\n{'='*70}")
+    print(f"  {title}")
+    print(f"{'='*70}\n")
+
+
+def seed(rows: int) -> None:
+    """Alimente les tables puis met à jour les statistiques du planificateur"""
+    now = datetime.utcnow()
+    rnd = random.Random(42)
+    users = [
+        {
+            "email": f"user{i}@example.com", "first_name": f"P{i}", "last_name": f"N{i}",
+            "department": DEPARTMENTS[i % len(DEPARTMENTS)],
+            "source": "odoo_sync" if i % 3 else "api", "status": rnd.choice(STATUSES),
+        }
+        for i in range(1, rows // 10 + 1)
+    ]
+    operations = [
+        {
+            "user_id": rnd.randint(1, len(users)), "status": rnd.choice(STATUSES),
+            "started_at": now - timedelta(minutes=i),
+        }
+        for i in range(rows)
+    ]
+    actions = [
+        {
+            "operation_id": i // 3 + 1, "action_type": "create_account", "application": "MidPoint",
+            "target_user": "user@example.com", "status": "success",
+            "executed_at": now - timedelta(seconds=i),
+        }
+        for i in range(rows * 3)
+    ]
+    logs = [
+        {
+            "timestamp": now - timedelta(seconds=i), "action": rnd.choice(ACTIONS), "actor": "system",
+            "target": f"user{i % 1000}@example.com", "message": "Chargement", "level": rnd.choice(LEVELS),
+        }
+        for i in range(rows)
+    ]
+
+    with engine.begin() as conn:
+        for model, values in (
+            (ProvisionedUser, users), (ProvisioningOperation, operations),
+            (ProvisioningAction, actions), (AuditLog, logs),
+        ):
+            conn.execute(insert(model), values)
+        conn.execute(text("ANALYZE"))
+
+
+def capture_statements() -> list:
+    """Enregistre les SELECT émis pendant les appels d'application"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services.odoo_sync_service import OdooSyncService
+
+    captured = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and not executemany:
+            captured.append((current[0], statement, parameters))
+
+    current = [""]
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        with TestClient(app) as client:
+            for name, method, path in ENDPOINTS:
+                current[0] = name
+                response = client.request(method, path)
+                if response.status_code >= 400:
+                    print(f"⚠️  {name}: HTTP {response.status_code}")
+
+        current[0] = "désactivation absents Odoo"
+        db = SessionLocal()
+        try:
+            OdooSyncService(db)._deactivate_missing({"user1@example.com"})
+            db.rollback()
+        finally:
+            db.close()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return captured
+
+
+def problems(statement: str, plan: list) -> list:
+    """Parcours complets ou tris temporaires d'une requête filtrée/triée"""
+    issues = []
+    filtered = re.search(r"\b(WHERE|ORDER BY|GROUP BY)\b", statement, re.IGNORECASE)
+    for detail in plan:
+        if filtered and re.fullmatch(r"SCAN \w+", detail):
+            issues.append(detail)
+        if "USE TEMP B-TREE" in detail:
+            issues.append(detail)
+    return issues
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vérifie les plans d'exécution (EXPLAIN QUERY PLAN)")
+    parser.add_argument("--rows", type=int, default=10000, help="Opérations et logs d'audit générés")
+    parser.add_argument("--verbose", action="store_true", help="Affiche le plan de chaque requête")
+    args = parser.parse_args()
+
+    init_db()
+    seed(args.rows)
+    statements = capture_statements()
+
+    print_section(f"Plans de {len(statements)} requêtes ({args.rows} lignes)")
+
+    failures = 0
+    with engine.connect() as conn:
+        for name, statement, parameters in statements:
+            plan = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+            issues = problems(statement, plan)
+            failures += bool(issues)
+            status = "❌" if issues else "✅"
+            print(f"{status} {name}: {' | '.join(plan)}")
+            if args.verbose or issues:
+                print(f"     {' '.join(statement.split())[:200]}")
+
+    engine.dispose()
+    _tmp_dir.cleanup()
+
+    if failures:
+        print(f"\n❌ {failures} requête(s) sans index adapté")
+        sys.exit(1)
+    print("\n✅ Toutes les requêtes utilisent un index")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test de charge des écritures SQLite de la gateway
+
+Plusieurs threads écrivent en parallèle des logs d'audit (AuditService.log :
+un commit par ligne, comme les routes et webhooks) pendant que d'autres
+threads lisent la table. Deux profils sont comparés sur une base neuve :
+
+- baseline : engine d'origine (journal rollback, synchronous=FULL, aucune
+  sérialisation des écritures) ;
+- tuned    : engine de l'application (WAL, PRAGMA de performance, porte
+  d'écriture unique) - voir app/database/connection.py.
+
+Usage:
+    python scripts/load_test_sqlite_writes.py
+    python scripts/load_test_sqlite_writes.py --writers 16 --ops 500 --readers 4
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Ajouter le répertoire parent au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.database.connection import create_db_engine
+from app.database.models import Base, AuditLog
+from app.services.audit_service import AuditService
+
+
+def print_section(title):
+    """Affiche un titre de section."""
+    print(f"\n{'='*70}")
+    print(f"  {title}")
+    print(f"{'='*70}\n")
+
+
+def baseline_engine(url: str):
+    """Engine tel que créé avant le profil SQLite"""
+    return create_engine(url, connect_args={"check_same_thread": False})
+
+
+def run_profile(name: str, engine, writers: int, ops: int, readers: int) -> dict:
+    """Lance la charge sur `engine` et renvoie les métriques"""
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    stop = threading.Event()
+    reads = [0]
+
+    def writer(worker: int):
+        db = Session()
+        try:
+            for i in range(ops):
+                start = time.perf_counter()
+                try:
+                    AuditService(db).log(
+                        action="LOAD_TEST",
+                        actor=f"writer-{worker}",
+                        message=f"Écriture {i}",
+                        target=f"user{i}@example.com",
+                        details={"worker": worker, "op": i}
+                    )
+                except Exception as e:
+                    db.rollback()
+                    with lock:
+                        errors.append(str(e).splitlines()[0])
+                    continue
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+        finally:
+            db.close()
+
+    def reader():
+        db = Session()
+        try:
+            while not stop.is_set():
+                db.execute(select(func.count(AuditLog.id))).scalar()
+                db.rollback()
+                with lock:
+                    reads[0] += 1
+        finally:
+            db.close()
+
+    reader_threads = [threading.Thread(target=reader) for _ in range(readers)]
+    writer_threads = [threading.Thread(target=writer, args=(w,)) for w in range(writers)]
+    for t in reader_threads:
+        t.start()
+
+    start = time.perf_counter()
+    for t in writer_threads:
+        t.start()
+    for t in writer_threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    for t in reader_threads:
+        t.join()
+    engine.dispose()
+
+    latencies.sort()
+    return {
+        "profile": name,
+        "writes": len(latencies),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "writes_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0.0,
+        "reads_per_second": reads[0] / elapsed if elapsed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge des écritures SQLite (avant/après profil)")
+    parser.add_argument("--writers", type=int, default=8, help="Threads écrivains")
+    parser.add_argument("--ops", type=int, default=200, help="Écritures (commits) par écrivain")
+    parser.add_argument("--readers", type=int, default=2, help="Threads lecteurs simultanés")
+    args = parser.parse_args()
+
+    print_section(f"{args.writers} écrivains x {args.ops} commits, {args.readers} lecteurs")
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="aegis-load-") as tmp:
+        for name, factory in (("baseline", baseline_engine), ("tuned", create_db_engine)):
+            url = f"sqlite:///{tmp}/{name}.db"
+            print(f"⏳ Profil {name}...")
+            results.append(run_profile(name, factory(url), args.writers, args.ops, args.readers))
+
+    print(f"\n{'Profil':<10} {'Écritures/s':>12} {'p50 (ms)':>10} {'p95 (ms)':>10} "
+          f"{'Erreurs':>8} {'Lectures/s':>11}")
+    for r in results:
+        print(f"{r['profile']:<10} {r['writes_per_second']:>12.0f} {r['p50_ms']:>10.2f} "
+              f"{r['p95_ms']:>10.2f} {r['errors']:>8} {r['reads_per_second']:>11.0f}")
+    for r in results:
+        if r["first_error"]:
+            print(f"\n❌ {r['profile']}: {r['first_error']}")
+
+    baseline, tuned = results
+    if baseline["writes_per_second"]:
+        print(f"\n📊 Débit d'écriture x{tuned['writes_per_second'] / baseline['writes_per_second']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Migrations de la base Aegis Gateway (DATABASE_URL de la configuration)
+
+Commandes :
+    status    État de chaque migration (schéma et données)
+    upgrade   Crée les tables absentes et applique les migrations de schéma
+    backfill  Exécute ou reprend les migrations de données par lots
+
+Usage:
+    python scripts/migrate.py status
+    python scripts/migrate.py upgrade
+    python scripts/migrate.py backfill --batch-size 500 --throttle 0.2
+    python scripts/migrate.py backfill --version 0003 --max-seconds 60
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+from app.database.models import init_db
+from app.database.migrations import get_migration_status, run_data_migrations
+
+
+def print_section(title):
+    """Affiche un titre de section."""
+    print(f"\n{'='*70}")
+    print(f"  {title}")
+    print(f"{'='*70}\n")
+
+
+STATUS_ICONS = {"done": "✅", "running": "⏳", "failed": "❌", "pending": "⏸️ "}
+
+
+def show_status():
+    print_section(f"Migrations - {settings.DATABASE_URL}")
+    for m in get_migration_status():
+        line = f"{STATUS_ICONS.get(m['status'], '?')} {m['version']} [{m['kind']}] {m['name']} - {m['status']}"
+        if m["kind"] == "data" and m["status"] != "pending":
+            line += f" ({m['processed']} lignes, id > {m['checkpoint']})"
+        print(line)
+        if m["error"]:
+            print(f"     {m['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrations de schéma et de données")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="État des migrations")
+    sub.add_parser("upgrade", help="Applique les migrations de schéma")
+    backfill = sub.add_parser("backfill", help="Exécute les migrations de données")
+    backfill.add_argument("--version", help="Uniquement cette migration")
+    backfill.add_argument("--batch-size", type=int, default=settings.MIGRATION_BATCH_SIZE,
+                          help="Lignes par transaction")
+    backfill.add_argument("--throttle", type=float, default=settings.MIGRATION_THROTTLE,
+                          help="Pause entre deux lots (secondes)")
+    backfill.add_argument("--max-seconds", type=float, default=None,
+                          help="Arrêt après ce délai (reprise au prochain lancement)")
+    args = parser.parse_args()
+
+    # Les migrations de schéma précèdent toujours les backfills
+    init_db()
+
+    if args.command == "backfill":
+        print_section("Migrations de données")
+        result = run_data_migrations(
+            version=args.version,
+            batch_size=args.batch_size,
+            throttle=args.throttle,
+            max_seconds=args.max_seconds
+        )
+        for m in result["migrations"]:
+            print(f"{STATUS_ICONS.get(m['status'], '⏳')} {m['version']}: {m['status']}, "
+                  f"{m['processed']} lignes, {m['batches']} lots, id > {m['checkpoint']}")
+        if not result["migrations"]:
+            print("Aucune migration de données en attente")
+        if not result["success"]:
+            sys.exit(1)
+
+    show_status()
+
+
+if __name__ == "__main__":
+    main()
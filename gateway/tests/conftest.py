@@ -0,0 +1,33 @@
+"""
+Configuration pytest - Base SQLite temporaire partagée par les tests
+
+Les variables d'environnement sont fixées avant tout import de `app` :
+l'engine est créé à l'import de app.database.connection.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+_tmp_dir = tempfile.TemporaryDirectory(prefix="aegis-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp_dir.name}/test.db"
+os.environ["JOB_QUEUE_ENABLED"] = "false"
+os.environ["DEBUG"] = "false"
+
+from app.database.connection import engine  # noqa: E402
+from app.database.models import Base, init_db  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def clean_db():
+    """Tables vides avant chaque test"""
+    init_db()
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            if table.name != "schema_migrations":
+                conn.execute(table.delete())
+    yield
@@ -0,0 +1,76 @@
+import threading
+import time
+
+import pytest
+
+from app.database.connection import SessionLocal
+from app.database.models import ProvisionedUser
+from app.services import provisioning_service
+from app.services.batch_provisioning_service import BatchProvisioningService
+
+
+class FakeMidPoint:
+    """Enregistre le nombre maximum d'appels simultanés"""
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def provision_user_with_assignments(self, user_data, assignments):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+        return {"success": True, "actions": ["Success"], "midpoint_oid": "oid"}
+
+
+@pytest.fixture
+def midpoint(monkeypatch):
+    fake = FakeMidPoint()
+    monkeypatch.setattr(provisioning_service, "get_midpoint_service", lambda: fake)
+    monkeypatch.setattr(provisioning_service, "get_provisioning_plan",
+                        lambda user_data: {"applications": ["GitLab"], "total_actions": 1})
+    return fake
+
+
+def _user(email: str) -> dict:
+    return {"email": email, "first_name": "Prénom", "last_name": "Nom", "job_title": "Dev"}
+
+
+def _wait(batch, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while batch.finished_at is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert batch.finished_at is not None
+
+
+def test_duplicate_emails_are_rejected(midpoint):
+    service = BatchProvisioningService(max_workers=2)
+    try:
+        with pytest.raises(ValueError, match="alice@example.com"):
+            service.submit([_user("alice@example.com"), _user("bob@example.com"), _user("Alice@Example.com")])
+        assert service._batches == {}
+    finally:
+        service.shutdown()
+
+
+def test_midpoint_limit_only_bounds_remote_calls(midpoint):
+    service = BatchProvisioningService(max_workers=4, target_limits={"midpoint": 2})
+    try:
+        batch = service.submit([_user(f"user{i}@example.com") for i in range(8)])
+        _wait(batch)
+    finally:
+        service.shutdown()
+
+    assert batch.to_dict()["successful"] == 8
+    assert midpoint.max_active == 2
+    assert service.target_limits["midpoint"]._value == 2  # sémaphore libéré
+
+    db = SessionLocal()
+    try:
+        assert db.query(ProvisionedUser).count() == 8
+    finally:
+        db.close()
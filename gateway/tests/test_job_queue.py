@@ -0,0 +1,63 @@
+"""Tests de la file de jobs persistante"""
+import threading
+import time
+
+from app.services.job_queue import JobQueue
+
+
+def test_lease_renewed_while_handler_outlives_it():
+    """Un handler plus long que le bail n'est ni repris ni exécuté deux fois"""
+    runs = []
+    lock = threading.Lock()
+
+    def slow_handler(payload):
+        with lock:
+            runs.append(threading.current_thread().name)
+        time.sleep(1.2)
+        return {"success": True}
+
+    queue = JobQueue(
+        handlers={"slow": slow_handler},
+        workers=2,
+        poll_interval=0.05,
+        lease_seconds=0.3,
+        heartbeat_interval=0.1,
+        max_concurrency={"slow": 2}
+    )
+    job, _ = queue.enqueue("slow")
+    queue.start()
+    try:
+        deadline = time.monotonic() + 5
+        while queue.get(job["id"])["status"] != "succeeded" and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        queue.stop()
+
+    final = queue.get(job["id"])
+    assert final["status"] == "succeeded"
+    assert final["attempts"] == 1
+    assert len(runs) == 1
+
+
+def test_expired_lease_result_is_not_overwritten():
+    """Un worker qui a perdu son bail n'écrase pas l'état du job repris"""
+    queue = JobQueue(handlers={"noop": lambda payload: {"success": True}}, lease_seconds=60)
+    job, _ = queue.enqueue("noop")
+
+    from sqlalchemy import update
+    from app.database.connection import SessionLocal, engine
+    from app.database.models import Job
+
+    db = SessionLocal()
+    try:
+        claimed = queue._claim(db)
+        owner = claimed.lease_owner
+        # Bail expiré : un autre worker a repris le job
+        with engine.begin() as conn:
+            conn.execute(update(Job).where(Job.id == job["id"]).values(lease_owner="autre-worker"))
+        assert not queue._finish(db, claimed, owner, status="succeeded")
+    finally:
+        db.close()
+
+    final = queue.get(job["id"])
+    assert final["status"] == "running"
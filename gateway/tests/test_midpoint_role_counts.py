@@ -0,0 +1,97 @@
+import asyncio
+
+import httpx
+
+from app.services.midpoint_async_service import AsyncMidPointService
+from app.services.midpoint_xml import RoleMemberCounter
+
+C = "http://midpoint.evolveum.com/xml/ns/public/common/common-3"
+XSI = "http://www.w3.org/2001/XMLSchema-instance"
+
+
+def _user(index: int, role_oids) -> str:
+    assignments = "".join(
+        f'<assignment><targetRef oid="{oid}" type="c:RoleType"/></assignment>' for oid in role_oids
+    )
+    return f'<user oid="u{index}"><name>user{index}</name>{assignments}</user>'
+
+
+def _object(index: int, role_oids) -> str:
+    """Format `<object xsi:type="c:UserType">` des listes /users/search"""
+    assignments = "".join(
+        f'<assignment><targetRef oid="{oid}" type="c:RoleType"/></assignment>' for oid in role_oids
+    )
+    return f'<object oid="u{index}" xsi:type="c:UserType"><name>user{index}</name>{assignments}</object>'
+
+
+def _list(items) -> str:
+    return f'<objectListType xmlns="{C}" xmlns:c="{C}" xmlns:xsi="{XSI}">{"".join(items)}</objectListType>'
+
+
+def _count(xml: bytes, chunk_size: int) -> RoleMemberCounter:
+    counter = RoleMemberCounter()
+    for i in range(0, len(xml), chunk_size):
+        assert counter.feed(xml[i:i + chunk_size]) == []
+    counter.close()
+    return counter
+
+
+def test_role_member_counter_accepts_both_list_formats():
+    users = _list([_user(1, ["r1", "r2"]), _user(2, ["r1"])]).encode()
+    objects = _list([_object(1, ["r1", "r2"]), _object(2, ["r1"])]).encode()
+
+    assert _count(users, 1024).counts == {"r1": 2, "r2": 1}
+    assert _count(objects, 1024).counts == {"r1": 2, "r2": 1}
+
+
+def test_role_member_counter_is_independent_of_chunking():
+    xml = _list([_object(i, ["r1"] if i % 2 else ["r1", "r2", "r2"]) for i in range(50)]).encode()
+    counter = _count(xml, 37)
+
+    assert counter.count == 50
+    assert counter.counts == _count(xml, len(xml)).counts == {"r1": 50, "r2": 25}
+
+
+def _paged_midpoint(total: int, requests: list) -> httpx.MockTransport:
+    """MidPoint simulé : `total` utilisateurs servis par offset/maxSize"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        body = request.content.decode()
+        offset = int(body.split("<q:offset>")[1].split("<")[0])
+        size = int(body.split("<q:maxSize>")[1].split("<")[0])
+        items = [_object(i, ["r1"] if i % 3 else ["r1", "r2"]) for i in range(offset, min(offset + size, total))]
+        return httpx.Response(200, text=_list(items))
+    return httpx.MockTransport(handler)
+
+
+def test_async_service_pages_user_search():
+    requests = []
+    service = AsyncMidPointService(page_size=4)
+    service._client = httpx.AsyncClient(base_url="http://midpoint", transport=_paged_midpoint(8, requests))
+
+    assert asyncio.run(service.get_role_member_counts()) == {"r1": 8, "r2": 3}
+    # Page pleine puis page vide
+    assert len(requests) == 3
+
+
+def test_concurrent_counts_share_one_pass_until_invalidated():
+    requests = []
+    paged = _paged_midpoint(6, requests)
+
+    async def slow_handler(request: httpx.Request) -> httpx.Response:
+        # Réponse lente : les requêtes simultanées se chevauchent
+        await asyncio.sleep(0.05)
+        return paged.handler(request)
+
+    service = AsyncMidPointService(page_size=4)
+    service._client = httpx.AsyncClient(base_url="http://midpoint", transport=httpx.MockTransport(slow_handler))
+
+    async def read_concurrently():
+        return await asyncio.gather(*[service.get_role_member_counts() for _ in range(5)])
+
+    assert asyncio.run(read_concurrently()) == [{"r1": 6, "r2": 2}] * 5
+    assert len(requests) == 2
+
+    service.invalidate_member_counts()
+    asyncio.run(service.get_role_member_counts())
+    assert len(requests) == 4
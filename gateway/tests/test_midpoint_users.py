@@ -0,0 +1,51 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.routers.midpoint import _users_as_json, _users_as_ndjson
+from app.services.midpoint_async_service import AsyncMidPointService
+
+C = "http://midpoint.evolveum.com/xml/ns/public/common/common-3"
+
+
+def _failing_second_page(request: httpx.Request) -> httpx.Response:
+    """Première page pleine (2 utilisateurs), erreur MidPoint sur la suivante"""
+    if "<q:offset>0<" not in request.content.decode():
+        return httpx.Response(500, text="erreur")
+    users = "".join(f'<user oid="u{i}"><name>user{i}</name></user>' for i in range(2))
+    return httpx.Response(200, text=f'<objectListType xmlns="{C}">{users}</objectListType>')
+
+
+def _service() -> AsyncMidPointService:
+    service = AsyncMidPointService(page_size=2)
+    service._client = httpx.AsyncClient(base_url="http://midpoint", transport=httpx.MockTransport(_failing_second_page))
+    return service
+
+
+async def _collect(chunks) -> str:
+    return "".join([chunk async for chunk in chunks])
+
+
+def test_iter_users_raises_after_first_page():
+    async def read():
+        return [user async for user in _service().iter_users()]
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(read())
+
+
+def test_truncated_json_listing_reports_error():
+    body = json.loads(asyncio.run(_collect(_users_as_json(_service().iter_users()))))
+
+    assert body["status"] == "error"
+    assert body["truncated"] is True
+    assert body["count"] == 2 and len(body["users"]) == 2
+
+
+def test_truncated_ndjson_listing_ends_with_error_line():
+    lines = asyncio.run(_collect(_users_as_ndjson(_service().iter_users()))).splitlines()
+
+    assert len(lines) == 3
+    assert "error" in json.loads(lines[-1])
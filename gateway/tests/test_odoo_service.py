@@ -0,0 +1,101 @@
+import csv
+import socket
+import threading
+import time
+
+import pytest
+
+from app.services.csv_export import write_employees_csv
+from app.services.odoo_service import EmployeeChanges, OdooService
+from app.services.sync_state import get_sync_state
+
+
+def _closed_port_url() -> str:
+    """URL d'un port local sans serveur (connexion refusée)"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+@pytest.mark.parametrize("transport", ["xmlrpc", "jsonrpc"])
+def test_ping_ignores_cached_uid(transport):
+    odoo = OdooService(url=_closed_port_url(), transport=transport, ping_timeout=1.0)
+    odoo.uid = 2  # uid mis en cache avant la panne
+
+    assert odoo.connect() is True
+    assert odoo.ping() is False
+    odoo.close()
+
+
+def test_merge_csv_uses_given_employees_without_reading_odoo(tmp_path):
+    csv_path = str(tmp_path / "hr_clean.csv")
+    employees = [
+        OdooService._transform_employee({"id": i, "name": f"P{i} N{i}", "work_email": f"e{i}@example.com",
+                                         "job_title": "Dev", "department_id": [1, "IT"], "active": True})
+        for i in (1, 2, 3)
+    ]
+    write_employees_csv(csv_path, employees)
+
+    odoo = OdooService(url=_closed_port_url(), ping_timeout=1.0)
+    renamed = {**employees[0], "title": "Lead"}
+    archived = {**employees[1], "status": "Inactive"}
+    result = odoo.merge_csv([renamed, archived, employees[2]], csv_path)
+    odoo.close()
+
+    assert result["success"] and result["changed"] == 2
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        rows = {row["personalNumber"]: row for row in csv.DictReader(f)}
+    assert set(rows) == {"1001", "1003"}
+    assert rows["1001"]["title"] == "Lead"
+
+
+def test_update_csv_reuses_full_read_without_reading_odoo(tmp_path):
+    csv_path = str(tmp_path / "hr_clean.csv")
+    employees = [
+        OdooService._transform_employee({"id": i, "name": f"P{i} N{i}", "work_email": f"e{i}@example.com",
+                                         "job_title": "Dev", "department_id": [1, "IT"], "active": True})
+        for i in (1, 2)
+    ]
+    full_read = EmployeeChanges(state_name="midpoint.push", mode="full",
+                                employees=employees, watermark="2026-01-01 00:00:00")
+
+    # Odoo injoignable : seule la relecture fournie peut alimenter le CSV
+    odoo = OdooService(url=_closed_port_url(), ping_timeout=1.0)
+    result = odoo.update_csv(csv_path, full_read=full_read)
+    odoo.close()
+
+    assert result["success"] and result["mode"] == "full"
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        assert {row["personalNumber"] for row in csv.DictReader(f)} == {"1001", "1002"}
+    assert get_sync_state(f"odoo.csv:{csv_path}")["watermark"] == "2026-01-01 00:00:00"
+    assert get_sync_state("midpoint.push") is None
+
+
+def test_concurrent_csv_merges_keep_both_changes(tmp_path, monkeypatch):
+    from app.services import odoo_service
+
+    csv_path = str(tmp_path / "hr_clean.csv")
+    employees = [
+        OdooService._transform_employee({"id": i, "name": f"P{i} N{i}", "work_email": f"e{i}@example.com",
+                                         "job_title": "Dev", "department_id": [1, "IT"], "active": True})
+        for i in (1, 2, 3)
+    ]
+    write_employees_csv(csv_path, employees[:1])
+
+    # Écriture ralentie : sans verrou, les deux fusions lisent le même fichier
+    def slow_write(*args, **kwargs):
+        time.sleep(0.2)
+        return write_employees_csv(*args, **kwargs)
+    monkeypatch.setattr(odoo_service, "write_employees_csv", slow_write)
+
+    odoo = OdooService(url=_closed_port_url(), ping_timeout=1.0)
+    threads = [threading.Thread(target=odoo.merge_csv, args=([emp], csv_path)) for emp in employees[1:]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    odoo.close()
+
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        assert {row["personalNumber"] for row in csv.DictReader(f)} == {"1001", "1002", "1003"}
@@ -0,0 +1,66 @@
+from app.database.connection import SessionLocal
+from app.database.models import ProvisionedUser, OperationStatus
+from app.services.odoo_service import OdooService
+from app.services.odoo_sync_service import OdooSyncService
+
+
+def _employee(employee_id: int, active: bool) -> dict:
+    """Employé au format produit par OdooService (status 'Active' / 'Inactive')"""
+    return OdooService._transform_employee({
+        "id": employee_id,
+        "name": f"Prenom{employee_id} Nom{employee_id}",
+        "work_email": f"emp{employee_id}@example.com",
+        "job_title": "Developer",
+        "department_id": [1, "IT"],
+        "active": active,
+    })
+
+
+def _statuses() -> dict:
+    db = SessionLocal()
+    try:
+        return dict(db.query(ProvisionedUser.email, ProvisionedUser.status).all())
+    finally:
+        db.close()
+
+
+def test_odoo_status_is_stored_case_insensitively():
+    db = SessionLocal()
+    try:
+        result = OdooSyncService(db).sync_employees([_employee(1, True), _employee(2, False)])
+    finally:
+        db.close()
+
+    assert result["success"] and result["created"] == 2
+    assert _statuses() == {
+        "emp1@example.com": OperationStatus.SUCCESS.value,
+        "emp2@example.com": OperationStatus.FAILED.value,
+    }
+
+
+def test_reactivated_employee_status_is_updated():
+    db = SessionLocal()
+    try:
+        OdooSyncService(db).sync_employees([_employee(1, False)])
+        result = OdooSyncService(db).sync_employees([_employee(1, True)])
+    finally:
+        db.close()
+
+    assert result["updated"] == 1
+    assert _statuses()["emp1@example.com"] == OperationStatus.SUCCESS.value
+
+
+def test_employee_back_after_deactivation_is_reactivated():
+    db = SessionLocal()
+    try:
+        OdooSyncService(db).sync_employees([_employee(1, True)])
+        OdooSyncService(db)._deactivate_missing(set())
+        db.commit()
+        assert _statuses()["emp1@example.com"] == OperationStatus.FAILED.value
+
+        result = OdooSyncService(db).sync_employees([_employee(1, True)])
+    finally:
+        db.close()
+
+    assert result["updated"] == 1 and result["skipped"] == 0
+    assert _statuses()["emp1@example.com"] == OperationStatus.SUCCESS.value